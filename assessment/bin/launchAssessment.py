@@ -3,21 +3,33 @@
 __author__ = 'Frederic Escudie'
 __copyright__ = 'Copyright (C) 2018 CHU Toulouse'
 __license__ = 'GNU General Public License'
-__version__ = '2.1.0'
+__version__ = '2.7.2'
 
 from anacore.bed import getAreas
+from anacore.msi.base import Status
 from anacore.msi.reportIO import ReportIO
 from anacore.sv import HashedSVIO
 import argparse
+import copy
 import hashlib
 from itertools import product
+import json
 import logging
+import multiprocessing
 import pandas as pd
 import os
 from sklearn.model_selection import ShuffleSplit
 import shutil
 import subprocess
 import sys
+import yaml
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(os.path.dirname(CURRENT_DIR))
+sys.path.insert(0, os.path.join(APP_DIR, "scripts"))
+from miniti.checksum import checksum, writeDigest  # noqa: E402
+from miniti.modelBuilder import createModel, getKnownStatus  # noqa: E402
+from miniti.reportIO import parseReport  # noqa: E402
 
 
 ########################################################################
@@ -82,7 +94,264 @@ def getStatus(in_annotations, samples):
     return status_by_spl
 
 
-def train(libraries, out_folder, cfg_tpl_path, status_path, targets_path, padding, min_support_reads, stitching, duplicates, log):
+def getAlnChecksums(libraries, cache_folder):
+    """
+    Return by library path the checksum of its alignments file. The checksums are stored in the cache folder with the size and the modification time of the files: only the new or modified files are read.
+
+    :param libraries: The list of libraries (see getLibFromDataFolder()).
+    :type libraries: list
+    :param cache_folder: Path to the lengths distributions cache folder.
+    :type cache_folder: str
+    :return: By library path the checksum of its alignments file.
+    :rtype: dict
+    """
+    index_path = os.path.join(cache_folder, "aln_md5.json")
+    index = dict()
+    if os.path.exists(index_path):
+        with open(index_path) as reader:
+            index = json.load(reader)
+    md5_by_path = dict()
+    for lib in libraries:
+        real_path = os.path.realpath(lib["path"])
+        file_stat = os.stat(real_path)
+        entry = index.get(real_path)
+        if entry is None or entry["size"] != file_stat.st_size or entry["mtime_ns"] != file_stat.st_mtime_ns:
+            entry = {"md5": checksum(real_path, chunk_size=1048576), "mtime_ns": file_stat.st_mtime_ns, "size": file_stat.st_size}
+            index[real_path] = entry
+        md5_by_path[lib["path"]] = entry["md5"]
+    tmp_path = index_path + ".{}.tmp".format(os.getpid())  # Cache folder can be shared between assessments
+    with open(tmp_path, "w") as writer:
+        json.dump(index, writer, sort_keys=True)
+    os.replace(tmp_path, index_path)
+    return md5_by_path
+
+
+def getCountToolVersion(cfg_tpl_path, log):
+    """
+    Return checksum identifying the lengths distributions count: content of the workflow rule and of its conda environment, which sets the AnaCore-utils version, and count section of the learn workflow configuration template.
+
+    :param cfg_tpl_path: Path to the learn workflow configuration template.
+    :type cfg_tpl_path: str
+    :param log: Logger of the script.
+    :type log: logging.Logger
+    :return: The checksum. None if the rule or its environment is missing (lib/snake-basket not cloned): the count tool cannot be identified.
+    :rtype: str
+    """
+    tool_hash = hashlib.md5()
+    for path in [os.path.join(APP_DIR, "rules", "microsatLenDistrib.smk"), os.path.join(APP_DIR, "envs", "anacore-utils.yml")]:
+        if not os.path.exists(path):
+            log.warning("The file {} used to identify the count tool is missing: lengths distributions cache is disabled.".format(path))
+            return None
+        tool_hash.update(checksum(path).encode('utf-8'))
+    with open(cfg_tpl_path) as reader:
+        cfg = yaml.safe_load(reader)
+    tool_hash.update(json.dumps(cfg["classifier"]["locus"].get("count"), sort_keys=True).encode('utf-8'))
+    return tool_hash.hexdigest()
+
+
+def getLenDistribCacheKey(aln_md5, targets_md5, padding, stitching, duplicates, count_tool_version):
+    """
+    Return the key of a lengths distribution in cache. The distribution depends only on the alignments, the targets, the count tool and the count parameters.
+
+    :param aln_md5: Checksum of the alignments file.
+    :type aln_md5: str
+    :param targets_md5: Checksum of the targets file.
+    :type targets_md5: str
+    :param padding: Minimum number of nucleotids aligned on each side around the microsatellite.
+    :type padding: int
+    :param stitching: Reads pair is counted once ("with") or not ("without").
+    :type stitching: str
+    :param duplicates: Duplicates reads are taking into account ("with") or not ("without").
+    :type duplicates: str
+    :param count_tool_version: Checksum identifying the count tool (see getCountToolVersion()).
+    :type count_tool_version: str
+    :return: The key.
+    :rtype: str
+    """
+    content = json.dumps(
+        {"aln_md5": aln_md5, "count_tool": count_tool_version, "duplicates": duplicates, "padding": padding, "stitching": stitching, "targets_md5": targets_md5},
+        sort_keys=True
+    )
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+def fillLenDistribCache(libraries, cache_folder, work_folder, cfg_tpl_path, status_path, targets_path, targets_md5, padding, min_support_reads, stitching, duplicates, count_tool_version, log):
+    """
+    Count lengths distributions of the libraries missing in cache and return the path to the distribution in cache for each library.
+
+    :param libraries: The list of libraries (see getLibFromDataFolder()) with their alignments checksum (key: md5).
+    :type libraries: list
+    :param cache_folder: Path to the cache folder.
+    :type cache_folder: str
+    :param work_folder: Path to the temporary folder used to count missing distributions.
+    :type work_folder: str
+    :param cfg_tpl_path: Path to the learn workflow configuration template.
+    :type cfg_tpl_path: str
+    :param status_path: Path to the file containing status by locus by sample (format: TSV).
+    :type status_path: str
+    :param targets_path: Path to the targets file (format: BED).
+    :type targets_path: str
+    :param targets_md5: Checksum of the targets file.
+    :type targets_md5: str
+    :param padding: Minimum number of nucleotids aligned on each side around the microsatellite.
+    :type padding: int
+    :param min_support_reads: The minimum numbers of reads for use loci in learning step.
+    :type min_support_reads: int
+    :param stitching: Reads pair is counted once ("with") or not ("without").
+    :type stitching: str
+    :param duplicates: Duplicates reads are taking into account ("with") or not ("without").
+    :type duplicates: str
+    :param count_tool_version: Checksum identifying the count tool (see getCountToolVersion()).
+    :type count_tool_version: str
+    :param log: Logger of the script.
+    :type log: logging.Logger
+    :return: By library name the path to its lengths distribution in cache (format: MSIReport with method "model").
+    :rtype: dict
+    """
+    cache_path_by_lib = {
+        lib["name"]: os.path.join(
+            cache_folder,
+            getLenDistribCacheKey(lib["md5"], targets_md5, padding, stitching, duplicates, count_tool_version) + ".json"
+        ) for lib in libraries
+    }
+    missing_libraries = [lib for lib in libraries if not os.path.exists(cache_path_by_lib[lib["name"]])]
+    log.info("Lengths distributions for padding={}, stitching={}, duplicates={}: {} in cache and {} to count.".format(
+        padding, stitching, duplicates, len(libraries) - len(missing_libraries), len(missing_libraries)
+    ))
+    if len(missing_libraries) != 0:
+        count_folder = os.path.join(work_folder, "count_pad-{}_stitch-{}_dup-{}".format(padding, stitching, duplicates))
+        train(
+            missing_libraries, count_folder, cfg_tpl_path, status_path, targets_path, padding, min_support_reads, stitching, duplicates, log,
+            snk_targets=["microsat/{}_microsatLenDistrib.json".format(lib["name"]) for lib in missing_libraries]
+        )
+        for lib in missing_libraries:
+            tmp_path = cache_path_by_lib[lib["name"]] + ".tmp"
+            shutil.move(os.path.join(count_folder, "microsat", "{}_microsatLenDistrib.json".format(lib["name"])), tmp_path)
+            os.replace(tmp_path, cache_path_by_lib[lib["name"]])  # Atomic for concurrent assessments sharing cache
+        shutil.rmtree(count_folder)
+    return cache_path_by_lib
+
+
+def writeLenDistribFromCache(libraries, cache_path_by_lib, method_name, out_folder):
+    """
+    Write lengths distributions of the libraries from cache with the method name expected by the workflow and return the path pattern to these files.
+
+    :param libraries: The list of libraries (see getLibFromDataFolder()).
+    :type libraries: list
+    :param cache_path_by_lib: By library name the path to its lengths distribution in cache.
+    :type cache_path_by_lib: dict
+    :param method_name: Name of the method storing distributions in workflow ("model" in learn, classifier name in tag).
+    :type method_name: str
+    :param out_folder: Path to the output folder.
+    :type out_folder: str
+    :return: Path pattern to the distributions (the tag "{sample}" corresponds to the library name).
+    :rtype: str
+    """
+    os.makedirs(out_folder)
+    pattern = os.path.abspath(os.path.join(out_folder, "{sample}_microsatLenDistrib.json"))
+    for lib in libraries:
+        with open(cache_path_by_lib[lib["name"]]) as reader:
+            report = json.load(reader)
+        for spl in report:
+            spl["name"] = lib["name"]
+            for locus in spl["loci"].values():
+                locus["results"] = {method_name: locus_res for locus_res in locus["results"].values()}
+        with open(pattern.replace("{sample}", lib["name"]), "w") as writer:
+            json.dump(report, writer)
+    return pattern
+
+
+def getLenDistribFromCache(libraries, cache_path_by_lib, method_name):
+    """
+    Return lengths distributions of the libraries from cache with the specified method name.
+
+    :param libraries: The list of libraries (see getLibFromDataFolder()).
+    :type libraries: list
+    :param cache_path_by_lib: By library name the path to its lengths distribution in cache.
+    :type cache_path_by_lib: dict
+    :param method_name: Name of the method storing distributions.
+    :type method_name: str
+    :return: One MSISample by library.
+    :rtype: list
+    """
+    samples = list()
+    for lib in libraries:
+        for spl in parseReport(cache_path_by_lib[lib["name"]]):
+            spl.name = lib["name"]
+            for locus in spl.loci.values():
+                locus.results = {method_name: locus_res for locus_res in locus.results.values()}
+            samples.append(spl)
+    return samples
+
+
+def setLenDistribPattern(cfg_path, len_distrib_pattern):
+    """
+    Set path pattern to lengths distributions already computed in workflow configuration.
+
+    :param cfg_path: Path to the workflow configuration (format: YAML).
+    :type cfg_path: str
+    :param len_distrib_pattern: Path pattern to the distributions.
+    :type len_distrib_pattern: str
+    """
+    with open(cfg_path) as reader:
+        cfg = yaml.safe_load(reader)
+    cfg["input"]["len_distrib_pattern"] = len_distrib_pattern
+    with open(cfg_path, "w") as writer:
+        yaml.safe_dump(cfg, writer)
+
+
+def getTagMinDepth(min_support_reads, stitching):
+    """
+    Return the minimum depth used by classifiers in workflow from the minimum number of reads.
+
+    :param min_support_reads: The minimum numbers of reads for determine the status.
+    :type min_support_reads: int
+    :param stitching: Reads pair is counted once ("with") or not ("without").
+    :type stitching: str
+    :return: The value of classifier.locus.min_support in workflow configuration.
+    :rtype: int
+    """
+    return int(min_support_reads / 2) if stitching else min_support_reads
+
+
+def getSampleClassifierParams(cfg_path):
+    """
+    Return parameters used to determine samples status and score in tag workflow.
+
+    :param cfg_path: Path to the tag workflow configuration (format: YAML).
+    :type cfg_path: str
+    :return: Parameters from section classifier.sample of the configuration.
+    :rtype: dict
+    """
+    with open(cfg_path) as reader:
+        return yaml.safe_load(reader)["classifier"]["sample"]
+
+
+def setMinDepth(reports, methods_names, min_depth, spl_params):
+    """
+    Set undetermined the loci with a depth lower than min_depth and update samples status and score. The reports must come from a tag workflow launched with a lower or equal minimum depth.
+
+    :param reports: List of MSISample classified.
+    :type reports: list
+    :param methods_names: Names of the processed methods.
+    :type methods_names: list
+    :param min_depth: The minimum numbers of reads or fragments to determine the locus status.
+    :type min_depth: int
+    :param spl_params: Parameters used to determine samples status and score in tag workflow (see getSampleClassifierParams()).
+    :type spl_params: dict
+    """
+    for curr_report in reports:
+        for method_name in methods_names:
+            for locus in curr_report.loci.values():
+                locus_res = locus.results[method_name]
+                if locus_res.data["lengths"].getCount() < min_depth:
+                    locus_res.status = Status.undetermined
+                    locus_res.score = None
+            curr_report.setStatusByInstabilityRatio(method_name, spl_params["min_voting_loci"], spl_params["instability_threshold"])
+            curr_report.setScore(method_name, spl_params["undetermined_weight"], spl_params["locus_weight_is_score"])
+
+
+def train(libraries, out_folder, cfg_tpl_path, status_path, targets_path, padding, min_support_reads, stitching, duplicates, log, len_distrib_cache=None, snk_targets=None):
     os.makedirs(out_folder)
     # Create config
     cfg_path = os.path.join(out_folder, "config.yml")
@@ -90,10 +359,30 @@ def train(libraries, out_folder, cfg_tpl_path, status_path, targets_path, paddin
         with open(cfg_path, "w") as writer:
             for line in reader:
                 line = line.replace("##KEEP_DUPLICATES##", str(duplicates == "with").lower())
-                line = line.replace("##MIN_SUPPORT##", str(int(min_support_reads / 2)) if stitching else str(min_support_reads))
+                line = line.replace("##MIN_SUPPORT##", str(getTagMinDepth(min_support_reads, stitching)))
                 line = line.replace("##PADDING##", str(padding))
                 line = line.replace("##STITCH_COUNT##", str(stitching == "with").lower())
                 writer.write(line)
+    if len_distrib_cache is not None:  # Model is built in process from distributions in cache
+        with open(cfg_path) as reader:
+            cfg = yaml.safe_load(reader)
+        excluded_samples = set(cfg["input"].get("excluded_samples") or [])
+        model_samples = getLenDistribFromCache(
+            [lib for lib in libraries if lib["name"] not in excluded_samples],
+            len_distrib_cache,
+            "model"
+        )
+        createModel(
+            model_samples,
+            getKnownStatus(status_path),
+            cfg["classifier"]["locus"]["min_support"],
+            cfg["classifier"]["locus"]["msings"]["peak_height_cutoff"]
+        )
+        model_path = os.path.join(out_folder, "microsat", "microsatModel.json")
+        os.makedirs(os.path.dirname(model_path))
+        ReportIO.write(model_samples, model_path)
+        writeDigest(model_path)
+        return
     # Create raw
     raw_folder = os.path.join(out_folder, "raw")
     os.makedirs(raw_folder)
@@ -111,11 +400,13 @@ def train(libraries, out_folder, cfg_tpl_path, status_path, targets_path, paddin
         cfg_path,
         out_folder
     ]
+    if snk_targets is not None:
+        cmd.extend(snk_targets)
     log.debug("submit: ".join(cmd))
     subprocess.check_call(cmd)
 
 
-def predict(libraries, out_folder, cfg_tpl_path, targets_path, model_path, clf, padding, min_support_reads, stitching, duplicates, log):
+def predict(libraries, out_folder, cfg_tpl_path, targets_path, model_path, clf, padding, min_support_reads, stitching, duplicates, log, len_distrib_cache=None):
     os.makedirs(out_folder)
     # Create config
     cfg_path = os.path.join(out_folder, "config.yml")
@@ -125,11 +416,16 @@ def predict(libraries, out_folder, cfg_tpl_path, targets_path, model_path, clf,
                 line = line.replace("##CLASSIFIER##", clf["class"])
                 line = line.replace("##CLASSIFIER_PARAMS##", clf["params"])
                 line = line.replace("##KEEP_DUPLICATES##", str(duplicates == "with").lower())
-                line = line.replace("##MIN_SUPPORT##", str(int(min_support_reads / 2)) if stitching else str(min_support_reads))
+                line = line.replace("##MIN_SUPPORT##", str(getTagMinDepth(min_support_reads, stitching)))
                 line = line.replace("##MODEL_PATH##", model_path)
                 line = line.replace("##PADDING##", str(padding))
                 line = line.replace("##STITCH_COUNT##", str(stitching == "with").lower())
                 writer.write(line)
+    if len_distrib_cache is not None:
+        setLenDistribPattern(
+            cfg_path,
+            writeLenDistribFromCache(libraries, len_distrib_cache, clf["class"], os.path.join(out_folder, "lenDistrib"))
+        )
     # Create raw
     raw_folder = os.path.join(out_folder, "raw")
     os.makedirs(raw_folder)
@@ -339,10 +635,195 @@ def getMSISamples(in_folder, samples):
     samples_res = list()
     for spl_name in samples:
         filepath = os.path.join(in_folder, "report", "data", spl_name + "_stabilityStatus.json")
-        samples_res.append(ReportIO.parse(filepath)[0])
+        samples_res.append(parseReport(filepath)[0])
     return samples_res
 
 
+def processTask(task):
+    """
+    Learn model on train samples and classify test samples for one dataset and one combination of count parameters. Each task uses its own work folder. This function is executed by the workers of the scheduler.
+
+    :param task: The dataset, the count parameters and the paths used by the task.
+    :type task: dict
+    :return: Results rows for each classification (one list by classifier and min support).
+    :rtype: list
+    """
+    log = logging.getLogger()
+    args = task["args"]
+    dataset_id = task["dataset_id"]
+    padding = task["padding"]
+    stitching = task["stitching"]
+    duplicates = task["duplicates"]
+    log.info("Start processing dataset {}/{} ({}) with padding={}, stitching={}, duplicates={}.".format(dataset_id, args.nb_tests - 1, task["dataset_md5"], padding, stitching, duplicates))
+    # Temp file
+    train_out_folder = os.path.join(task["work_folder"], "learn_out")
+    test_out_folder = os.path.join(task["work_folder"], "tag_out")
+    # Train
+    train(task["train_samples"], train_out_folder, task["train_cfg_tpl_path"], task["annotation_path"], task["targets_path"], padding, args.learn_min_support_reads, stitching, duplicates, log, task["len_distrib_cache"])
+    # Predict
+    task_res = list()
+    model_path = os.path.abspath(os.path.join(train_out_folder, "microsat", "microsatModel.json"))
+    for clfier_idx, clf in enumerate(args.classifiers):
+        if args.sweep_min_support:  # Only one tag with the lowest threshold, others are applied on its results
+            sweep_min_support = min(args.tag_min_support_reads)
+            predict(task["test_samples"], test_out_folder, task["test_cfg_tpl_path"], task["targets_path"], model_path, clf, padding, sweep_min_support, stitching, duplicates, log, task["len_distrib_cache"])
+            sweep_reports = getMSISamples(test_out_folder, task["test_names"])
+            sweep_spl_params = getSampleClassifierParams(os.path.join(test_out_folder, "config.yml"))
+            shutil.rmtree(test_out_folder)
+        for min_support in args.tag_min_support_reads:
+            if args.sweep_min_support:
+                reports = copy.deepcopy(sweep_reports)
+                setMinDepth(
+                    reports,
+                    [clf["class"], "mSINGSUp", "MSIsensor-pro_pro"],
+                    getTagMinDepth(min_support, stitching),
+                    sweep_spl_params
+                )
+            else:
+                predict(task["test_samples"], test_out_folder, task["test_cfg_tpl_path"], task["targets_path"], model_path, clf, padding, min_support, stitching, duplicates, log, task["len_distrib_cache"])
+                reports = getMSISamples(test_out_folder, task["test_names"])
+            methods = [(clf["name"], clf["class"])]
+            if clfier_idx == 0:
+                methods.extend([("mSINGSUp", "mSINGSUp"), ("MSIsensor-pro_pro", "MSIsensor-pro_pro")])
+            res_df_rows = list()
+            for clf_name, method_name in methods:
+                res_df_rows.extend(
+                    getMethodResInfo(
+                        dataset_id,
+                        clf_name,
+                        padding,
+                        min_support,
+                        stitching,
+                        duplicates,
+                        task["loci_id_by_name"],
+                        reports,
+                        task["status_by_spl"],
+                        method_name
+                    )
+                )
+            task_res.append(res_df_rows)
+            if not args.sweep_min_support:
+                shutil.rmtree(test_out_folder)
+    shutil.rmtree(task["work_folder"])
+    return task_res
+
+
+def getResLongTable(res_df_rows, loci_id_by_name):
+    """
+    Return results rows in long format: one row by sample or locus of each library with columns typed and categories dictionary encoded.
+
+    :param res_df_rows: Rows for results dataframe (see getMethodResInfo()).
+    :type res_df_rows: list
+    :param loci_id_by_name: List of locus names.
+    :type loci_id_by_name: dict
+    :return: Results table without dataset_id (this column is the partition key).
+    :rtype: pyarrow.Table
+    """
+    import pyarrow as pa
+    columns = {
+        "lib_name": [], "config": [], "classifier": [], "padding": [], "min_support": [], "stitching": [], "duplicates": [],
+        "element": [], "expected_status": [], "observed_status": [], "pred_score": [], "pred_support": []
+    }
+    sorted_loci = sorted(loci_id_by_name)
+    for row in res_df_rows:
+        elements = [("spl", row[8:11] + [None])]
+        for locus_idx, locus_name in enumerate(sorted_loci):
+            locus_start = 11 + 4 * locus_idx
+            elements.append((locus_name, row[locus_start:locus_start + 4]))
+        for element, (expected, observed, score, support) in elements:
+            for col_name, value in zip(["lib_name", "config", "classifier", "padding", "min_support", "stitching", "duplicates"], row[1:8]):
+                columns[col_name].append(value)
+            columns["element"].append(element)
+            columns["expected_status"].append(expected)
+            columns["observed_status"].append(observed)
+            columns["pred_score"].append(score)
+            columns["pred_support"].append(support)
+    arrays = list()
+    for col_name, values in columns.items():
+        if col_name in {"padding", "min_support", "pred_support"}:
+            arrays.append(pa.array(values, type=pa.int32()))
+        elif col_name == "pred_score":
+            arrays.append(pa.array(values, type=pa.float64()))
+        else:
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+    return pa.Table.from_arrays(arrays, names=list(columns))
+
+
+def writeResultsPart(results_path, dataset_id, part_name, res_df_rows, loci_id_by_name):
+    """
+    Write results rows in a new file of the dataset partition of the results store. The store is a folder readable with pandas.read_parquet() or pyarrow.dataset.dataset(..., partitioning="hive") and filters on any column (example: [("dataset_id", "<", 10), ("element", "==", "spl")]).
+
+    :param results_path: Path to the results store (format: folder of parquet files partitioned by dataset_id).
+    :type results_path: str
+    :param dataset_id: Dataset ID.
+    :type dataset_id: int
+    :param part_name: Name of the file in the dataset partition.
+    :type part_name: str
+    :param res_df_rows: Rows for results dataframe (see getMethodResInfo()).
+    :type res_df_rows: list
+    :param loci_id_by_name: List of locus names.
+    :type loci_id_by_name: dict
+    """
+    import pyarrow.parquet as pq
+    partition_folder = os.path.join(results_path, "dataset_id={}".format(dataset_id))
+    os.makedirs(partition_folder, exist_ok=True)
+    pq.write_table(
+        getResLongTable(res_df_rows, loci_id_by_name),
+        os.path.join(partition_folder, part_name + ".parquet")
+    )
+
+
+def writeTasksResults(tasks, tasks_results, datasets_row_by_id, loci_id_by_name, datasets_path, results_path, results_format="tsv"):
+    """
+    Write datasets description and results of the tasks in tasks order. The files are created by the dataset 0 otherwise the rows are appended.
+
+    :param tasks: The tasks (see processTask()).
+    :type tasks: list
+    :param tasks_results: Results rows of each task in the same order as tasks.
+    :type tasks_results: iterable
+    :param datasets_row_by_id: Row for datasets dataframe by dataset ID.
+    :type datasets_row_by_id: dict
+    :param loci_id_by_name: List of locus names.
+    :type loci_id_by_name: dict
+    :param datasets_path: Path to the output file containing the description of the datasets (format: TSV).
+    :type datasets_path: str
+    :param results_path: Path to the output file containing the description of the results and expected value for each samples in each datasets (format: TSV or folder of parquet files partitioned by dataset_id).
+    :type results_path: str
+    :param results_format: Format of the results: "tsv" for one wide file with one row by library and classification or "parquet" for a long format store partitioned by dataset_id. With "parquet" the previous results of a rewritten dataset are removed and the other datasets are kept.
+    :type results_format: str
+    """
+    written_datasets = set()
+    use_header = False
+    out_mode = "a"
+    for task, task_res in zip(tasks, tasks_results):
+        dataset_id = task["dataset_id"]
+        if dataset_id not in written_datasets:  # First task of the dataset
+            written_datasets.add(dataset_id)
+            # File mode
+            use_header = False
+            out_mode = "a"
+            if dataset_id == 0:
+                use_header = True
+                out_mode = "w"
+            datasets_df = pd.DataFrame.from_records([datasets_row_by_id[dataset_id]], columns=getDatasetsInfoTitles(loci_id_by_name))
+            with open(datasets_path, out_mode) as FH_out:
+                datasets_df.to_csv(FH_out, header=use_header, sep='\t')
+            if results_format == "parquet":
+                partition_folder = os.path.join(results_path, "dataset_id={}".format(dataset_id))
+                if os.path.exists(partition_folder):
+                    shutil.rmtree(partition_folder)
+        for part_idx, res_df_rows in enumerate(task_res):
+            if results_format == "parquet":
+                part_name = "pad-{}_stitch-{}_dup-{}_part-{}".format(task["padding"], task["stitching"], task["duplicates"], part_idx)
+                writeResultsPart(results_path, dataset_id, part_name, res_df_rows, loci_id_by_name)
+            else:
+                with open(results_path, out_mode) as FH_out:
+                    res_df = pd.DataFrame.from_records(res_df_rows, columns=getResInfoTitles(loci_id_by_name))
+                    res_df.to_csv(FH_out, header=use_header, sep='\t')
+            use_header = False
+            out_mode = "a"
+
+
 class ClfAction(argparse.Action):
     """Manage classifiers parameter to convert in list of dict."""
 
@@ -380,6 +861,7 @@ if __name__ == "__main__":
     clf_dflt = ["SVC", "RandomForest:10", "RandomForest:50"]
     parsed_clf_dflt = ClfAction.parsed(clf_dflt)
     parser.add_argument('-c', '--classifiers', default=parsed_clf_dflt, nargs='+', action=ClfAction, help="Classifiers evaluates (example: DecisionTree, KNeighbors, LogisticRegression, RandomForest, RandomForest:n). [Default: {}]".format(clf_dflt))
+    parser.add_argument('-p', '--nb-workers', type=int, default=1, help="The number of couples of dataset and count parameters processed concurrently. Each one uses its own work folder and results are written in datasets order. [Default: %(default)s]")
     parser.add_argument('-v', '--version', action='version', version=__version__)
     # Loci classification
     group_loci = parser.add_argument_group('Loci classification')
@@ -387,6 +869,7 @@ if __name__ == "__main__":
     group_loci.add_argument('--duplicates', default=["without"], nargs='+', choices=["with", "without"], help='Duplicates reads are taking into account in lengths distribution ("with"). [Default: %(default)s]')
     group_loci.add_argument('--stitching', default=["without"], nargs='+', choices=["with", "without"], help='Reads pair is taking account if the length of repeat is the same on two mates (one count). Otherwise, reads are not take into account. [Default: %(default)s]')
     group_loci.add_argument('-t', '--tag-min-support-reads', default=[50, 60, 70, 80, 90, 100, 110, 120, 130, 140, 150, 160, 170], nargs='+', type=int, help='The minimum numbers of reads for determine the status. [Default: %(default)s]')
+    group_loci.add_argument('--sweep-min-support', action='store_true', help='Launch tag workflow only once with the lowest tag-min-support-reads for each classifier. The other thresholds are applied in memory on its lengths distributions and predictions. Results are identical to one tag workflow by threshold. [Default: %(default)s]')
     group_loci.add_argument('-e', '--learn-min-support-reads', default=100, type=int, help='The minimum numbers of reads for use loci in learning step. [Default: %(default)s]')
     # Sample classification
     group_spl = parser.add_argument_group('Sample classification')
@@ -401,12 +884,19 @@ if __name__ == "__main__":
     # Inputs
     group_input = parser.add_argument_group('Inputs')
     group_input.add_argument('-d', '--data-folder', required=True, help="The folder containing data to process. It must aln/, targets.bed and status.tsv.")
+    group_input.add_argument('-l', '--len-distrib-cache', help="Folder storing the lengths distributions by library, targets and count parameters. Distributions missing in this folder are counted once and added. With this cache models are built in process from distributions and tag uses distributions instead of alignments. The folder can be shared between assessments: distributions counted by another version of the count rule or of its environment are not reused. The cache is disabled when the count rule is missing (lib/snake-basket not cloned). [Default: no cache]")
     group_input.add_argument('-w', '--work-folder', default=os.getcwd(), help="The working directory. [Default: %(default)s]")
     # Outputs
     group_output = parser.add_argument_group('Outputs')
-    group_output.add_argument('-r', '--results-path', default="results.tsv", help='Path to the output file containing the description of the results and expected value for each samples in each datasets (format: TSV). [Default: %(default)s]')
+    group_output.add_argument('-f', '--results-format', default="tsv", choices=["parquet", "tsv"], help='Format of the results. With "tsv" results are written in one wide file with one row by library and classification. With "parquet" results-path is a folder storing results in long format (one row by sample or locus of each library and classification) partitioned by dataset_id. This store supports appends and filtered reads (see report_assessment.ipynb) and it requires pyarrow. [Default: %(default)s]')
+    group_output.add_argument('-r', '--results-path', default="results.tsv", help='Path to the output file containing the description of the results and expected value for each samples in each datasets (format: TSV or folder with --results-format parquet). [Default: %(default)s]')
     group_output.add_argument('-s', '--datasets-path', default="datasets.tsv", help='Path to the output file containing the description of the datasets (format: TSV). [Default: %(default)s]')
     args = parser.parse_args()
+    if args.results_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("the package pyarrow is required with --results-format parquet")
 
     # Parameters
     aln_folder = os.path.join(args.data_folder, "aln")
@@ -433,100 +923,77 @@ if __name__ == "__main__":
         for locus in getAreas(targets_path)
     }
 
-    # Process assessment
+    # Lengths distributions cache
+    len_distrib_cache_by_params = dict()
+    count_tool_version = None
+    if args.len_distrib_cache is not None:
+        count_tool_version = getCountToolVersion(train_cfg_tpl_path, log)
+    if count_tool_version is not None:
+        os.makedirs(args.len_distrib_cache, exist_ok=True)
+        targets_md5 = checksum(targets_path)
+        md5_by_path = getAlnChecksums(librairies, args.len_distrib_cache)
+        for lib in librairies:
+            lib["md5"] = md5_by_path[lib["path"]]
+        for (padding, stitching, duplicates) in product(args.padding, args.stitching, args.duplicates):
+            len_distrib_cache_by_params[(padding, stitching, duplicates)] = fillLenDistribCache(
+                librairies, args.len_distrib_cache, args.work_folder, train_cfg_tpl_path, annotation_path, targets_path,
+                targets_md5, padding, args.learn_min_support_reads, stitching, duplicates, count_tool_version, log
+            )
+
+    # Create tasks: one by dataset and count parameters
     cv = ShuffleSplit(n_splits=args.nb_tests, test_size=args.test_ratio, random_state=42)
     dataset_id = 0
+    datasets_row_by_id = dict()
+    tasks = list()
     ordered_spl_names = sorted(list(set(lib["name"] for lib in librairies)))  # All replicates of one sample will be managed in same content (train or test)
     for train_idx, test_idx in cv.split(ordered_spl_names, groups=[status_by_spl[spl_name]["sample"] for spl_name in ordered_spl_names]):
         dataset_md5 = hashlib.md5(",".join(map(str, train_idx)).encode('utf-8')).hexdigest()
         if args.start_dataset_id > dataset_id:
             log.info("Skip already processed dataset {}/{} ({}).".format(dataset_id, args.nb_tests - 1, dataset_md5))
         else:
-            log.info("Start processing dataset {}/{} ({}).".format(dataset_id, args.nb_tests - 1, dataset_md5))
-            # File mode
-            use_header = False
-            out_mode = "a"
-            if dataset_id == 0:
-                use_header = True
-                out_mode = "w"
-            # Temp file
-            train_out_folder = os.path.join(args.work_folder, "learn_out_dataset-{}".format(dataset_id))
-            test_out_folder = os.path.join(args.work_folder, "tag_out_dataset-{}".format(dataset_id))
             # Create dataset
             train_names = {spl_name for idx, spl_name in enumerate(ordered_spl_names) if idx in train_idx}
             test_names = {spl_name for idx, spl_name in enumerate(ordered_spl_names) if idx in test_idx}
-            train_samples = [lib for lib in librairies if lib["name"] in train_names]  # Select all libraries corresponding to the train samples
-            test_samples = [lib for lib in librairies if lib["name"] in test_names]  # Select all libraries corresponding to the test samples
-            datasets_df_rows = [
-                getDatasetsInfo(
-                    dataset_id,
-                    dataset_md5,
-                    loci_id_by_name,
-                    test_names,
-                    train_names,
-                    status_by_spl
-                )
-            ]
-            datasets_df = pd.DataFrame.from_records(datasets_df_rows, columns=getDatasetsInfoTitles(loci_id_by_name))
-            with open(args.datasets_path, out_mode) as FH_out:
-                datasets_df.to_csv(FH_out, header=use_header, sep='\t')
+            datasets_row_by_id[dataset_id] = getDatasetsInfo(
+                dataset_id,
+                dataset_md5,
+                loci_id_by_name,
+                sorted(test_names),
+                sorted(train_names),
+                status_by_spl
+            )
             for (padding, stitching, duplicates) in product(args.padding, args.stitching, args.duplicates):
-                # Train
-                train(train_samples, train_out_folder, train_cfg_tpl_path, annotation_path, targets_path, padding, args.learn_min_support_reads, stitching, duplicates, log)
-                # Predict
-                for clfier_idx, clf in enumerate(args.classifiers):
-                    for min_support in args.tag_min_support_reads:
-                        model_path = os.path.abspath(os.path.join(train_out_folder, "microsat", "microsatModel.json"))
-                        predict(test_samples, test_out_folder, test_cfg_tpl_path, targets_path, model_path, clf, padding, min_support, stitching, duplicates, log)
-                        reports = getMSISamples(test_out_folder, test_names)
-                        res_df_rows = getMethodResInfo(
-                            dataset_id,
-                            clf["name"],
-                            padding,
-                            min_support,
-                            stitching,
-                            duplicates,
-                            loci_id_by_name,
-                            reports,
-                            status_by_spl,
-                            clf["class"]
-                        )
-                        if clfier_idx == 0:
-                            res_df_rows.extend(
-                                getMethodResInfo(
-                                    dataset_id,
-                                    "mSINGSUp",
-                                    padding,
-                                    min_support,
-                                    stitching,
-                                    duplicates,
-                                    loci_id_by_name,
-                                    reports,
-                                    status_by_spl,
-                                    "mSINGSUp"
-                                )
-                            )
-                            res_df_rows.extend(
-                                getMethodResInfo(
-                                    dataset_id,
-                                    "MSIsensor-pro_pro",
-                                    padding,
-                                    min_support,
-                                    stitching,
-                                    duplicates,
-                                    loci_id_by_name,
-                                    reports,
-                                    status_by_spl,
-                                    "MSIsensor-pro_pro"
-                                )
-                            )
-                        with open(args.results_path, out_mode) as FH_out:
-                            res_df = pd.DataFrame.from_records(res_df_rows, columns=getResInfoTitles(loci_id_by_name))
-                            res_df.to_csv(FH_out, header=use_header, sep='\t')
-                        use_header = False
-                        out_mode = "a"
-                        shutil.rmtree(test_out_folder)
-                shutil.rmtree(train_out_folder)
+                tasks.append({
+                    "annotation_path": annotation_path,
+                    "args": args,
+                    "dataset_id": dataset_id,
+                    "dataset_md5": dataset_md5,
+                    "duplicates": duplicates,
+                    "len_distrib_cache": len_distrib_cache_by_params.get((padding, stitching, duplicates)),
+                    "loci_id_by_name": loci_id_by_name,
+                    "padding": padding,
+                    "status_by_spl": status_by_spl,
+                    "stitching": stitching,
+                    "targets_path": targets_path,
+                    "test_cfg_tpl_path": test_cfg_tpl_path,
+                    "test_names": sorted(test_names),
+                    "test_samples": [lib for lib in librairies if lib["name"] in test_names],  # Select all libraries corresponding to the test samples
+                    "train_cfg_tpl_path": train_cfg_tpl_path,
+                    "train_samples": [lib for lib in librairies if lib["name"] in train_names],  # Select all libraries corresponding to the train samples
+                    "work_folder": os.path.join(
+                        args.work_folder,
+                        "dataset-{}_pad-{}_stitch-{}_dup-{}".format(dataset_id, padding, stitching, duplicates)
+                    )
+                })
         # Next dataset
         dataset_id += 1
+
+    # Process tasks and write results in datasets order
+    log.info("Process {} tasks with {} workers.".format(len(tasks), args.nb_workers))
+    if args.nb_workers > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(min(args.nb_workers, len(tasks))) as pool:
+            tasks_results = pool.imap(processTask, tasks, chunksize=1)  # Results are returned in tasks order
+            writeTasksResults(tasks, tasks_results, datasets_row_by_id, loci_id_by_name, args.datasets_path, args.results_path, args.results_format)
+    else:
+        writeTasksResults(tasks, map(processTask, tasks), datasets_row_by_id, loci_id_by_name, args.datasets_path, args.results_path, args.results_format)
     log.info("End of job")
@@ -2,6 +2,7 @@
 wf=$1
 config=$2
 out=$3
+targets=${@:4}  # Optional: only these files are produced
 
 assessment_bin_dir=`dirname $0`
 assessment_bin_dir=`realpath ${assessment_bin_dir}`
@@ -23,5 +24,6 @@ snakemake \
 --snakefile ${application_dir}/$wf \
 --configfile $config \
 --directory $out \
+$targets \
 > $out/wf_log.txt \
 2> $out/wf_stderr.txt
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+from anacore.msi.reportIO import ReportIO
+import argparse
+import json
+import logging
+import numpy as np
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(os.path.dirname(CURRENT_DIR))
+sys.path.insert(0, os.path.join(APP_DIR, "scripts"))
+from miniti.modelBuilder import createModel  # noqa: E402
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def getSyntheticLoci(template_loci, nb_loci):
+    """
+    Return loci descriptions (name and position) for the synthetic panel. The template loci are used first and then they are copied on shifted positions with suffixed names.
+
+    :param template_loci: The template loci by position (from one sample of the template model).
+    :type template_loci: dict
+    :param nb_loci: Number of loci in synthetic panel.
+    :type nb_loci: int
+    :return: List of (template position, synthetic position, synthetic name).
+    :rtype: list
+    """
+    template_positions = sorted(template_loci)
+    synthetic_loci = list()
+    for locus_idx in range(nb_loci):
+        tpl_position = template_positions[locus_idx % len(template_positions)]
+        copy_idx = locus_idx // len(template_positions)
+        if copy_idx == 0:
+            synthetic_loci.append((tpl_position, tpl_position, template_loci[tpl_position]["name"]))
+        else:
+            chrom, interval = tpl_position.rsplit(":", 1)
+            start, end = [int(elt) + copy_idx * 10000 for elt in interval.split("-")]
+            synthetic_loci.append((
+                tpl_position,
+                "{}:{}-{}".format(chrom, start, end),
+                "{}_{}".format(template_loci[tpl_position]["name"], copy_idx)
+            ))
+    return synthetic_loci
+
+
+def getResampledLengths(lengths, depth_factor, rng):
+    """
+    Return lengths distribution drawn from the template distribution with a depth multiplied by depth_factor.
+
+    :param lengths: The template lengths distribution (format: MSIReport lengths).
+    :type lengths: dict
+    :param depth_factor: Multiplier applied on the depth of the template distribution.
+    :type depth_factor: float
+    :param rng: Random generator.
+    :type rng: numpy.random.Generator
+    :return: The synthetic lengths distribution (format: MSIReport lengths).
+    :rtype: dict
+    """
+    ct_by_len = lengths["ct_by_len"]
+    depth = sum(ct_by_len.values())
+    new_lengths = {key: val for key, val in lengths.items() if key != "ct_by_len"}
+    new_lengths["ct_by_len"] = dict()
+    if depth > 0:
+        lengths_keys = sorted(ct_by_len, key=int)
+        counts = rng.multinomial(
+            int(round(depth * depth_factor)),
+            [ct_by_len[key] / depth for key in lengths_keys]
+        )
+        new_lengths["ct_by_len"] = {key: int(count) for key, count in zip(lengths_keys, counts) if count > 0}
+    return new_lengths
+
+
+def getSyntheticSample(template_spl, spl_name, synthetic_loci, method_name, depth_factor, rng, with_status):
+    """
+    Return one synthetic sample with lengths distributions drawn from the template sample.
+
+    :param template_spl: The template sample (format: MSIReport sample).
+    :type template_spl: dict
+    :param spl_name: Name of the synthetic sample.
+    :type spl_name: str
+    :param synthetic_loci: The loci of the synthetic panel (see getSyntheticLoci()).
+    :type synthetic_loci: list
+    :param method_name: The name of the method storing the lengths distributions.
+    :type method_name: str
+    :param depth_factor: Multiplier applied on the depth of the template distributions.
+    :type depth_factor: float
+    :param rng: Random generator.
+    :type rng: numpy.random.Generator
+    :param with_status: Keep the template status of each locus (model sample) or set none status (evaluated sample).
+    :type with_status: bool
+    :return: The synthetic sample (format: MSIReport sample).
+    :rtype: dict
+    """
+    synthetic_spl = {"name": spl_name, "loci": dict(), "results": dict()}
+    for tpl_position, position, locus_name in synthetic_loci:
+        tpl_res = template_spl["loci"][tpl_position]["results"]["model"]
+        synthetic_spl["loci"][position] = {
+            "name": locus_name,
+            "position": position,
+            "results": {
+                method_name: {
+                    "status": tpl_res["status"] if with_status else None,
+                    "score": None,
+                    "data": {"lengths": getResampledLengths(tpl_res["data"]["lengths"], depth_factor, rng)}
+                }
+            }
+        }
+    return synthetic_spl
+
+
+def writeSyntheticData(template_path, out_folder, nb_loci, nb_model_samples, nb_samples, data_method, random_seed):
+    """
+    Write synthetic model and evaluated samples (one file by sample) drawn from the template model.
+
+    :param template_path: Path to the template model (format: MSIReport).
+    :type template_path: str
+    :param out_folder: Path to the folder where the data are written.
+    :type out_folder: str
+    :param nb_loci: Number of loci in synthetic panel.
+    :type nb_loci: int
+    :param nb_model_samples: Number of samples in synthetic model.
+    :type nb_model_samples: int
+    :param nb_samples: Number of evaluated samples.
+    :type nb_samples: int
+    :param data_method: The name of the method storing the lengths distributions in evaluated samples.
+    :type data_method: str
+    :param random_seed: The seed used by the random generator.
+    :type random_seed: int
+    :return: Path to the model and paths to the evaluated samples files by sample name.
+    :rtype: (str, dict)
+    """
+    rng = np.random.default_rng(random_seed)
+    with open(template_path) as reader:
+        template_samples = json.load(reader)
+    synthetic_loci = getSyntheticLoci(template_samples[0]["loci"], nb_loci)
+    # Model
+    raw_model_path = os.path.join(out_folder, "model_raw.json")
+    with open(raw_model_path, "w") as writer:
+        json.dump(
+            [
+                getSyntheticSample(template_samples[spl_idx % len(template_samples)], "model_{}".format(spl_idx), synthetic_loci, "model", 1.0, rng, True)
+                for spl_idx in range(nb_model_samples)
+            ],
+            writer
+        )
+    model_samples = ReportIO.parse(raw_model_path)
+    status_by_spl = {
+        spl.name: {locus.name: locus.results["model"].status for locus in spl.loci.values()}
+        for spl in model_samples
+    }
+    createModel(model_samples, status_by_spl, 0)
+    model_path = os.path.join(out_folder, "model.json")
+    ReportIO.write(model_samples, model_path)
+    os.remove(raw_model_path)
+    # Evaluated samples
+    evaluated_by_spl = dict()
+    for spl_idx in range(nb_samples):
+        spl_name = "spl_{}".format(spl_idx)
+        evaluated_by_spl[spl_name] = os.path.join(out_folder, "{}_microsatLenDistrib.json".format(spl_name))
+        with open(evaluated_by_spl[spl_name], "w") as writer:
+            json.dump(
+                [getSyntheticSample(template_samples[(spl_idx * 7) % len(template_samples)], spl_name, synthetic_loci, data_method, rng.uniform(0.5, 1.5), rng, False)],
+                writer
+            )
+    return model_path, evaluated_by_spl
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    # Manage parameters
+    parser = argparse.ArgumentParser(description="Write synthetic model and evaluated samples drawn from a template model. The model is written in out-folder/model.json and each evaluated sample in out-folder/spl_N_microsatLenDistrib.json.")
+    parser.add_argument('-d', '--data-method', default="SVC", help='The name of the method storing the lengths distributions in evaluated samples. [Default: %(default)s]')
+    parser.add_argument('-s', '--random-seed', default=0, type=int, help='The seed used to draw synthetic lengths distributions. [Default: %(default)s]')
+    parser.add_argument('-v', '--version', action='version', version=__version__)
+    group_scale = parser.add_argument_group('Synthetic data')
+    group_scale.add_argument('-l', '--nb-loci', default=100, type=int, help='Number of loci in panel. [Default: %(default)s]')
+    group_scale.add_argument('-m', '--nb-model-samples', default=100, type=int, help='Number of samples in model. [Default: %(default)s]')
+    group_scale.add_argument('-e', '--nb-samples', default=10, type=int, help='Number of evaluated samples. [Default: %(default)s]')
+    group_input = parser.add_argument_group('Inputs')
+    group_input.add_argument('-t', '--input-template', default=os.path.join(APP_DIR, "test", "config", "microsat_model.json"), help='Path to the model used as template for synthetic data (format: MSIReport). [Default: %(default)s]')
+    group_output = parser.add_argument_group('Outputs')
+    group_output.add_argument('-o', '--out-folder', default=os.getcwd(), help='Path to the folder where the data are written. [Default: %(default)s]')
+    args = parser.parse_args()
+
+    # Logger
+    logging.basicConfig(format='%(asctime)s -- [%(filename)s][pid:%(process)d][%(levelname)s] %(message)s')
+    log = logging.getLogger()
+    log.setLevel(logging.INFO)
+    log.info("Command: " + " ".join(sys.argv))
+
+    # Process
+    os.makedirs(args.out_folder, exist_ok=True)
+    writeSyntheticData(
+        args.input_template, args.out_folder, args.nb_loci, args.nb_model_samples, args.nb_samples, args.data_method, args.random_seed
+    )
+    log.info("End of job")
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.1.0'
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(os.path.dirname(CURRENT_DIR))
+SCRIPTS_DIR = os.path.join(APP_DIR, "scripts")
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def runJob(cmd):
+    """
+    Execute command and return its wall time and its peak resident set size.
+
+    :param cmd: The command.
+    :type cmd: list
+    :return: Wall time in seconds and maximum resident set size in kilobytes.
+    :rtype: (float, int)
+    """
+    start_time = time.perf_counter()
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    _, exit_status, rusage = os.wait4(process.pid, 0)
+    wall_time = time.perf_counter() - start_time
+    process.returncode = os.waitstatus_to_exitcode(exit_status)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+    return wall_time, rusage.ru_maxrss
+
+
+def getStages(model_path, evaluated_by_spl, out_folder, classifier):
+    """
+    Return the commands of each benchmarked stage in execution order. Each stage has one job by sample like in MInITI tag except wfRunReport.py.
+
+    :param model_path: Path to the synthetic model (format: MSIReport).
+    :type model_path: str
+    :param evaluated_by_spl: Paths to the evaluated samples files by sample name.
+    :type evaluated_by_spl: dict
+    :param out_folder: Path to the folder where the outputs are written.
+    :type out_folder: str
+    :param classifier: The sklearn classifier.
+    :type classifier: str
+    :return: List of (stage name, list of commands).
+    :rtype: list
+    """
+    python = sys.executable
+    msings_pattern = os.path.join(out_folder, "{}_msings.json")
+    pro_pattern = os.path.join(out_folder, "{}_msisensorpro.json")
+    sklearn_pattern = os.path.join(out_folder, "{}_stabilityStatus.json")
+    stable_peaks_path = os.path.join(out_folder, "stable_model_peaks.json")
+    stable_peaks_asset = os.path.join(out_folder, "stable_model_peaks.js")
+    samples = sorted(evaluated_by_spl)
+    return [
+        ("microsatMsingsClassify", [
+            [python, os.path.join(SCRIPTS_DIR, "microsatMsingsClassify.py"), "--data-method", classifier,
+             "--input-model", model_path, "--input-evaluated", evaluated_by_spl[spl], "--output-report", msings_pattern.format(spl)]
+            for spl in samples
+        ]),
+        ("microsatMSIsensorproProClassify", [
+            [python, os.path.join(SCRIPTS_DIR, "microsatMSIsensorproProClassify.py"), "--data-method", classifier,
+             "--input-model", model_path, "--input-evaluated", msings_pattern.format(spl), "--output-report", pro_pattern.format(spl)]
+            for spl in samples
+        ]),
+        ("microsatSklearnClassify", [
+            [python, os.path.join(SCRIPTS_DIR, "microsatSklearnClassify.py"), "--classifier", classifier, "--random-seed", "0",
+             "--input-model", model_path, "--input-evaluated", pro_pattern.format(spl), "--output-report", sklearn_pattern.format(spl)]
+            for spl in samples
+        ]),
+        ("modelToStablePeaks", [
+            [python, os.path.join(SCRIPTS_DIR, "modelToStablePeaks.py"), "--input-model", model_path, "--output-peaks", stable_peaks_path, "--output-asset", stable_peaks_asset]
+        ]),
+        ("wfSplReport", [
+            [python, os.path.join(SCRIPTS_DIR, "wfSplReport.py"), "--data-method-name", classifier, "--sample-name", spl,
+             "--input-report", sklearn_pattern.format(spl), "--model-peaks-asset", os.path.basename(stable_peaks_asset), "--output-report", os.path.join(out_folder, spl + ".html")]
+            for spl in samples
+        ]),
+        ("wfRunReport", [
+            [python, os.path.join(SCRIPTS_DIR, "wfRunReport.py"), "--classification-method-name", classifier,
+             "--inputs-report"] + [sklearn_pattern.format(spl) for spl in samples] + ["--output-report", os.path.join(out_folder, "run.html")]
+        ])
+    ]
+
+
+def getStagesMetrics(stages, nb_repeats, log):
+    """
+    Execute stages and return their metrics. The wall time of a stage is the sum of the wall times of its jobs and the best of the repetitions is kept. The peak RSS is the maximum of the jobs.
+
+    :param stages: List of (stage name, list of commands) (see getStages()).
+    :type stages: list
+    :param nb_repeats: Number of executions of each stage.
+    :type nb_repeats: int
+    :param log: Logger of the script.
+    :type log: logging.Logger
+    :return: By stage name the metrics: wall_time (seconds), max_rss (kilobytes) and nb_jobs.
+    :rtype: dict
+    """
+    metrics_by_stage = dict()
+    for stage_name, commands in stages:
+        stage_metrics = {"wall_time": None, "max_rss": 0, "nb_jobs": len(commands)}
+        for repeat_idx in range(nb_repeats):
+            repeat_time = 0
+            for cmd in commands:
+                wall_time, max_rss = runJob(cmd)
+                repeat_time += wall_time
+                stage_metrics["max_rss"] = max(stage_metrics["max_rss"], max_rss)
+            if stage_metrics["wall_time"] is None or repeat_time < stage_metrics["wall_time"]:
+                stage_metrics["wall_time"] = repeat_time
+        log.info("Stage {}: {:.3f}s for {} jobs (peak RSS: {} kB).".format(stage_name, stage_metrics["wall_time"], len(commands), stage_metrics["max_rss"]))
+        metrics_by_stage[stage_name] = stage_metrics
+    return metrics_by_stage
+
+
+def getRegressions(metrics_by_stage, baseline_by_stage, max_regression):
+    """
+    Return stages metrics exceeding the baseline by more than max_regression.
+
+    :param metrics_by_stage: By stage name the current metrics (see getStagesMetrics()).
+    :type metrics_by_stage: dict
+    :param baseline_by_stage: By stage name the baseline metrics (see getStagesMetrics()).
+    :type baseline_by_stage: dict
+    :param max_regression: Maximum accepted increase ratio of wall time and peak RSS. Example: 0.2 for 20%.
+    :type max_regression: float
+    :return: List of (stage name, metric name, baseline value, current value).
+    :rtype: list
+    """
+    regressions = list()
+    for stage_name, stage_metrics in metrics_by_stage.items():
+        if stage_name in baseline_by_stage:
+            for metric_name in ["wall_time", "max_rss"]:
+                baseline_value = baseline_by_stage[stage_name][metric_name]
+                if stage_metrics[metric_name] > baseline_value * (1 + max_regression):
+                    regressions.append((stage_name, metric_name, baseline_value, stage_metrics[metric_name]))
+    return regressions
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    # Manage parameters
+    parser = argparse.ArgumentParser(description="Measure wall time and peak RSS of the classification and report scripts on synthetic models and samples drawn from a template model. Metrics can be compared to a previous run to detect regressions.")
+    parser.add_argument('-k', '--classifier', default="SVC", choices=["DecisionTree", "KNeighbors", "LogisticRegression", "RandomForest", "SVC"], help='The sklearn classifier used in microsatSklearnClassify.py. [Default: %(default)s]')
+    parser.add_argument('-n', '--nb-repeats', default=1, type=int, help='Number of executions of each stage. The best wall time is kept. [Default: %(default)s]')
+    parser.add_argument('-s', '--random-seed', default=0, type=int, help='The seed used to draw synthetic lengths distributions. [Default: %(default)s]')
+    parser.add_argument('-x', '--max-regression', default=0.2, type=float, help='Maximum accepted increase ratio of wall time and peak RSS compared to the baseline. [Default: %(default)s]')
+    parser.add_argument('-v', '--version', action='version', version=__version__)
+    group_scale = parser.add_argument_group('Synthetic data')
+    group_scale.add_argument('-l', '--nb-loci', default=100, type=int, help='Number of loci in panel. [Default: %(default)s]')
+    group_scale.add_argument('-m', '--nb-model-samples', default=100, type=int, help='Number of samples in model. [Default: %(default)s]')
+    group_scale.add_argument('-e', '--nb-samples', default=10, type=int, help='Number of evaluated samples. [Default: %(default)s]')
+    group_input = parser.add_argument_group('Inputs')
+    group_input.add_argument('-t', '--input-template', default=os.path.join(APP_DIR, "test", "config", "microsat_model.json"), help='Path to the model used as template for synthetic data (format: MSIReport). [Default: %(default)s]')
+    group_input.add_argument('-b', '--input-baseline', help='Path to metrics from a previous run used as baseline (format: JSON). With this option the script fails when a stage exceeds the baseline by more than max-regression.')
+    group_input.add_argument('-w', '--work-folder', default=os.getcwd(), help='The working directory. [Default: %(default)s]')
+    group_output = parser.add_argument_group('Outputs')
+    group_output.add_argument('-o', '--output-metrics', default="benchmark_metrics.json", help='Path to the output file containing configuration and metrics by stage (format: JSON). [Default: %(default)s]')
+    args = parser.parse_args()
+
+    # Logger
+    logging.basicConfig(format='%(asctime)s -- [%(filename)s][pid:%(process)d][%(levelname)s] %(message)s')
+    log = logging.getLogger()
+    log.setLevel(logging.INFO)
+    log.info("Command: " + " ".join(sys.argv))
+
+    # Synthetic data
+    config = {
+        "classifier": args.classifier,
+        "nb_loci": args.nb_loci,
+        "nb_model_samples": args.nb_model_samples,
+        "nb_repeats": args.nb_repeats,
+        "nb_samples": args.nb_samples,
+        "random_seed": args.random_seed,
+        "template": os.path.basename(args.input_template)
+    }
+    bench_folder = os.path.join(args.work_folder, "benchmark_l{}_m{}_e{}".format(args.nb_loci, args.nb_model_samples, args.nb_samples))
+    data_folder = os.path.join(bench_folder, "data")
+    out_folder = os.path.join(bench_folder, "out")
+    for folder in [data_folder, out_folder]:
+        os.makedirs(folder, exist_ok=True)
+    log.info("Write synthetic data with {} loci, {} model samples and {} evaluated samples.".format(args.nb_loci, args.nb_model_samples, args.nb_samples))
+    subprocess.check_call([  # In a separate process to keep the launcher RSS out of the measured peaks
+        sys.executable, os.path.join(CURRENT_DIR, "createSyntheticData.py"),
+        "--data-method", args.classifier,
+        "--random-seed", str(args.random_seed),
+        "--nb-loci", str(args.nb_loci),
+        "--nb-model-samples", str(args.nb_model_samples),
+        "--nb-samples", str(args.nb_samples),
+        "--input-template", args.input_template,
+        "--out-folder", data_folder
+    ])
+    model_path = os.path.join(data_folder, "model.json")
+    evaluated_by_spl = {
+        "spl_{}".format(spl_idx): os.path.join(data_folder, "spl_{}_microsatLenDistrib.json".format(spl_idx))
+        for spl_idx in range(args.nb_samples)
+    }
+
+    # Execute stages
+    metrics_by_stage = getStagesMetrics(
+        getStages(model_path, evaluated_by_spl, out_folder, args.classifier),
+        args.nb_repeats,
+        log
+    )
+    with open(args.output_metrics, "w") as writer:
+        json.dump(
+            {"config": config, "host": platform.node(), "stages": metrics_by_stage, "version": __version__},
+            writer,
+            indent=2
+        )
+    shutil.rmtree(bench_folder)
+
+    # Compare to baseline
+    if args.input_baseline is not None:
+        with open(args.input_baseline) as reader:
+            baseline = json.load(reader)
+        if baseline["config"] != config:
+            log.warning("Baseline has been produced with another configuration: {}.".format(baseline["config"]))
+        regressions = getRegressions(metrics_by_stage, baseline["stages"], args.max_regression)
+        for stage_name, metric_name, baseline_value, current_value in regressions:
+            log.error("Regression in stage {} on {}: {} in baseline and {} now.".format(stage_name, metric_name, baseline_value, current_value))
+        if len(regressions) != 0:
+            sys.exit(1)
+    log.info("End of job")
@@ -2,4 +2,10 @@ include: "bwa_mem.smk"
 include: "markDuplicates.smk"
 include: "microsatCreateModel.smk"
 include: "microsatLenDistrib.smk"
+include: "microsatModelBaseline.smk"
+include: "microsatModelConvert.smk"
+include: "microsatModelDigest.smk"
+include: "microsatModelUpdate.smk"
+include: "microsatSklearnFit.smk"
 include: "microsatStatusToAnnot.smk"
+include: "wfPerfReport.smk"
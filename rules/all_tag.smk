@@ -1,9 +1,12 @@
 include: "bwa_mem.smk"
 include: "markDuplicates.smk"
+include: "microsatClassify.smk"
 include: "microsatMergeResults.smk"
 include: "microsatLenDistrib.smk"
 include: "microsatMsingsClassify.smk"
 include: "microsatMsisensorproProClassify.smk"
 include: "microsatSklearnClassify.smk"
+include: "microsatSklearnClassifyBatch.smk"
 include: "modelToStablePeaks.smk"
+include: "wfPerfReport.smk"
 include: "wfReport_tag.smk"
@@ -0,0 +1,111 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.4.0'
+
+
+def microsatClassify(
+        in_evaluated="microsat/{sample}_microsatLenDistrib.json",
+        in_model="microsat/microsatModel.json",
+        in_baselines=None,
+        in_estimators=None,
+        out_report="microsat/{sample}_stabilityStatus.json",
+        out_stderr="logs/{sample}_microsatClassify_stderr.txt",
+        params_classifier=None,
+        params_classifier_params=None,  # Must be str
+        params_data_method=None,
+        params_instability_ratio=None,
+        params_locus_weight_is_score=False,
+        params_min_depth=None,
+        params_min_voting_loci=None,
+        params_nb_threads=1,
+        params_random_seed=None,
+        params_server_socket=None,
+        params_std_dev_rate=None,
+        params_undetermined_weight=None,
+        params_keep_outputs=False,
+        params_stderr_append=False):
+    """Predict stability classes and scores for loci and samples using mSINGS, MSIsensor-pro pro and an sklearn classifier in one job. The output contains results of all the methods. With params_server_socket the samples are sent to the classification service listening on this socket (see microsatClassifyServer.py) and the job fails if the service has been started with another model or other parameters."""
+    # Parameters
+    if params_classifier_params is not None:
+        if not isinstance(params_classifier_params, str):
+            raise Exception('The argument "params_classifier_params" in rule microsatClassify must be a string not {}: {}.'.format(type(params_classifier_params), params_classifier_params))
+    if params_server_socket is None:
+        shell_cmd = (
+            "{params.bin_path}"
+            " {params.classifier}"
+            " {params.classifier_params}"
+            " {params.data_method}"
+            " {params.instability_ratio}"
+            " {params.locus_weight_is_score}"
+            " {params.min_depth}"
+            " {params.min_voting_loci}"
+            " {params.random_seed}"
+            " --threads {threads}"
+            " {params.std_dev_rate}"
+            " {params.undetermined_weight}"
+            " {params.estimators}"
+            " {params.baselines}"
+            " --input-evaluated {input.evaluated}"
+            " --input-model {input.model}"
+            " --output-report {output}"
+            " {params.stderr_redirection} {log}"
+        )
+    else:
+        shell_cmd = (
+            "{params.client_path}"
+            " {params.classifier}"
+            " {params.classifier_params}"
+            " {params.data_method}"
+            " {params.instability_ratio}"
+            " {params.locus_weight_is_score}"
+            " {params.min_depth}"
+            " {params.min_voting_loci}"
+            " {params.random_seed}"
+            " {params.std_dev_rate}"
+            " {params.undetermined_weight}"
+            " {params.estimators}"
+            " {params.baselines}"
+            " --socket {params.server_socket}"
+            " --input-evaluated {input.evaluated}"
+            " --input-model {input.model}"
+            " --output-report {output}"
+            " {params.stderr_redirection} {log}"
+        )
+    # Rule
+    rule microsatClassify:
+        input:
+            baselines = [] if in_baselines is None else in_baselines,
+            evaluated = in_evaluated,
+            estimators = [] if in_estimators is None else in_estimators,
+            model = in_model
+        output:
+            out_report if params_keep_outputs else temp(out_report)
+        log:
+            out_stderr
+        params:
+            bin_path = os.path.abspath(os.path.join(workflow.basedir, "scripts/microsatClassify.py")),
+            baselines = "" if in_baselines is None else "--input-baselines {}".format(in_baselines),
+            client_path = os.path.abspath(os.path.join(workflow.basedir, "scripts/microsatClassifyClient.py")),
+            classifier = "" if params_classifier is None else "--classifier {}".format(params_classifier),
+            classifier_params = "" if params_classifier_params is None else "--classifier-params '{}'".format(params_classifier_params),
+            data_method = "" if params_data_method is None else "--data-method {}".format(params_data_method),
+            estimators = "" if in_estimators is None else "--input-estimators {}".format(in_estimators),
+            instability_ratio = "" if params_instability_ratio is None else "--instability-ratio {}".format(params_instability_ratio),
+            locus_weight_is_score = "--locus-weight-is-score" if params_locus_weight_is_score else "",
+            min_depth = "" if params_min_depth is None else "--min-depth {}".format(params_min_depth),
+            min_voting_loci = "" if params_min_voting_loci is None else "--min-voting-loci {}".format(params_min_voting_loci),
+            random_seed = "" if params_random_seed is None else "--random-seed {}".format(params_random_seed),
+            server_socket = "" if params_server_socket is None else os.path.abspath(params_server_socket),
+            std_dev_rate = "" if params_std_dev_rate is None else "--std-dev-rate {}".format(params_std_dev_rate),
+            stderr_redirection = "2>" if not params_stderr_append else "2>>",
+            undetermined_weight = "" if params_undetermined_weight is None else "--undetermined-weight {}".format(params_undetermined_weight),
+        resources:
+            extra = "",
+            mem = "10G",
+            partition = "normal"
+        threads: params_nb_threads if params_server_socket is None else 1
+        conda:
+            "envs/anacore-utils.yml"
+        shell:
+            shell_cmd
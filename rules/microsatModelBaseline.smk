@@ -0,0 +1,34 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+
+def microsatModelBaseline(
+        in_model="microsat/microsatModel.json",
+        out_baselines="microsat/microsatModel_baseline.json",
+        out_stderr="logs/microsatModelBaseline_stderr.txt",
+        params_keep_outputs=False,
+        params_stderr_append=False):
+    """Compute by locus the mSINGS and MSIsensor-pro baselines from model. These baselines are used in tag step to avoid reading all the model samples."""
+    rule microsatModelBaseline:
+        input:
+            in_model
+        output:
+            out_baselines if params_keep_outputs else temp(out_baselines)
+        log:
+            out_stderr
+        params:
+            bin_path = os.path.abspath(os.path.join(workflow.basedir, "scripts/microsatModelBaseline.py")),
+            stderr_redirection = "2>" if not params_stderr_append else "2>>"
+        resources:
+            extra = "",
+            mem = "5G",
+            partition = "normal"
+        conda:
+            "envs/anacore-utils.yml"
+        shell:
+            "{params.bin_path}"
+            " --input-model {input}"
+            " --output-baselines {output}"
+            " {params.stderr_redirection} {log}"
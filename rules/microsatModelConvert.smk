@@ -0,0 +1,35 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.1.0'
+
+
+def microsatModelConvert(
+        in_model="microsat/microsatModel.json",
+        out_model="microsat/microsatModel_binary",
+        out_stderr="logs/microsatModelConvert_stderr.txt",
+        params_keep_outputs=False,
+        params_stderr_append=False):
+    """Convert model from MSIReport to binary format (folder containing arrays read by memory mapping in tag step) or from binary to MSIReport format. The direction depends on the input: a folder is converted to MSIReport."""
+    out_model_decl = directory(out_model) if not out_model.endswith((".json", ".json.gz", ".json.zst")) else out_model
+    rule microsatModelConvert:
+        input:
+            in_model
+        output:
+            out_model_decl if params_keep_outputs else temp(out_model_decl)
+        log:
+            out_stderr
+        params:
+            bin_path = os.path.abspath(os.path.join(workflow.basedir, "scripts/microsatModelConvert.py")),
+            stderr_redirection = "2>" if not params_stderr_append else "2>>"
+        resources:
+            extra = "",
+            mem = "5G",
+            partition = "normal"
+        conda:
+            "envs/anacore-utils.yml"
+        shell:
+            "{params.bin_path}"
+            " --input-model {input}"
+            " --output-model {output}"
+            " {params.stderr_redirection} {log}"
@@ -0,0 +1,34 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+
+def microsatModelDigest(
+        in_model="microsat/microsatModel.json",
+        out_digest="microsat/microsatModel_digest.json",
+        out_stderr="logs/microsatModelDigest_stderr.txt",
+        params_keep_outputs=False,
+        params_stderr_append=False):
+    """Write checksum, size and modification time of the model. The digest must be stored next to the model with the suffix "_digest.json" to be used in tag step."""
+    rule microsatModelDigest:
+        input:
+            in_model
+        output:
+            out_digest if params_keep_outputs else temp(out_digest)
+        log:
+            out_stderr
+        params:
+            bin_path = os.path.abspath(os.path.join(workflow.basedir, "scripts/microsatModelDigest.py")),
+            stderr_redirection = "2>" if not params_stderr_append else "2>>"
+        resources:
+            extra = "",
+            mem = "1G",
+            partition = "normal"
+        conda:
+            "envs/anacore-utils.yml"
+        shell:
+            "{params.bin_path}"
+            " --input-model {input}"
+            " --output-digest {output}"
+            " {params.stderr_redirection} {log}"
@@ -0,0 +1,57 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+
+def microsatModelUpdate(
+        in_model,
+        in_known_status,
+        in_length_distributions,
+        in_baselines=None,
+        out_model="microsat/microsatModel.json",
+        out_baselines="microsat/microsatModel_baseline.json",
+        out_stderr="logs/microsatModelUpdate_stderr.txt",
+        params_min_support=70,
+        params_peak_height_cutoff=0.05,
+        params_samples_names=None,
+        params_keep_outputs=False,
+        params_stderr_append=False):
+    """Append new samples to an existing model without reading the samples already in model. The digest of the model is written next to out_model and, with in_baselines, the baselines are updated from the new samples only."""
+    outputs = [out_model, os.path.splitext(out_model)[0] + "_digest.json"]
+    if in_baselines is not None:
+        outputs.append(out_baselines)
+    rule microsatModelUpdate:
+        input:
+            baselines = [] if in_baselines is None else in_baselines,
+            known_status = in_known_status,
+            length_distributions = in_length_distributions,
+            model = in_model
+        output:
+            outputs if params_keep_outputs else [temp(elt) for elt in outputs]
+        log:
+            out_stderr
+        params:
+            bin_path = os.path.abspath(os.path.join(workflow.basedir, "scripts/microsatModelUpdate.py")),
+            baselines = "" if in_baselines is None else "--input-baselines {} --output-baselines {}".format(in_baselines, out_baselines),
+            min_support = params_min_support,
+            peak_height_cutoff = params_peak_height_cutoff,
+            samples_names = "" if params_samples_names is None else "--samples-names " + " ".join(params_samples_names),
+            stderr_redirection = "2>" if not params_stderr_append else "2>>"
+        resources:
+            extra = "",
+            mem = "5G",
+            partition = "normal"
+        conda:
+            "envs/anacore-utils.yml"
+        shell:
+            "{params.bin_path}"
+            " --min-support {params.min_support}"
+            " --peak-height-cutoff {params.peak_height_cutoff}"
+            " {params.baselines}"
+            " {params.samples_names}"
+            " --input-model {input.model}"
+            " --input-known-status {input.known_status}"
+            " --inputs-length-distributions {input.length_distributions}"
+            " --output-model {output[0]}"
+            " {params.stderr_redirection} {log}"
@@ -1,12 +1,13 @@
 __author__ = 'Frederic Escudie'
 __copyright__ = 'Copyright (C) 2020 CHU Toulouse'
 __license__ = 'GNU General Public License'
-__version__ = '1.2.0'
+__version__ = '1.3.0'
 
 
 def microsatMsingsClassify(
         in_evaluated="microsat/{sample}_microsatLenDistrib.json",
         in_model="microsat/microsatModel.json",
+        in_baselines=None,
         out_report="microsat/{sample}_stabilityStatus.json",
         out_stderr="logs/{sample}_microsatMSINGSClassify_stderr.txt",
         params_data_method=None,
@@ -22,6 +23,7 @@ def microsatMsingsClassify(
     """Predict stability classes and scores for loci and samples using mSINGS v4.0 like algorithm."""
     rule microsatMsingsClassify:
         input:
+            baselines = [] if in_baselines is None else in_baselines,
             evaluated = in_evaluated,
             model = in_model
         output:
@@ -30,6 +32,7 @@ def microsatMsingsClassify(
             out_stderr
         params:
             bin_path = os.path.abspath(os.path.join(workflow.basedir, "scripts/microsatMsingsClassify.py")),
+            baselines = "" if in_baselines is None else "--input-baselines {}".format(in_baselines),
             data_method = "" if params_data_method is None else "--data-method {}".format(params_data_method),
             instability_ratio = "" if params_instability_ratio is None else "--instability-ratio {}".format(params_instability_ratio),
             locus_weight_is_score = "--locus-weight-is-score" if params_locus_weight_is_score else "",
@@ -55,6 +58,7 @@ def microsatMsingsClassify(
             " {params.status_method}"
             " {params.std_dev_rate}"
             " {params.undetermined_weight}"
+            " {params.baselines}"
             " --input-evaluated {input.evaluated}"
             " --input-model {input.model}"
             " --output-report {output}"
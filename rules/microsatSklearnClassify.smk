@@ -1,12 +1,13 @@
 __author__ = 'Frederic Escudie'
 __copyright__ = 'Copyright (C) 2020 CHU Toulouse'
 __license__ = 'GNU General Public License'
-__version__ = '1.2.0'
+__version__ = '1.4.0'
 
 
 def microsatSklearnClassify(
         in_evaluated="microsat/{sample}_microsatLenDistrib.json",
         in_model="microsat/microsatModel.json",
+        in_estimators=None,
         out_report="microsat/{sample}_stabilityStatus.json",
         out_stderr="logs/{sample}_microsatStabilityClassify_stderr.txt",
         params_classifier=None,
@@ -16,6 +17,7 @@ def microsatSklearnClassify(
         params_locus_weight_is_score=False,
         params_min_depth=None,
         params_min_voting_loci=None,
+        params_nb_threads=1,
         params_random_seed=None,
         params_status_method=None,
         params_undetermined_weight=None,
@@ -30,6 +32,7 @@ def microsatSklearnClassify(
     rule microsatSklearnClassify:
         input:
             evaluated = in_evaluated,
+            estimators = [] if in_estimators is None else in_estimators,
             model = in_model
         output:
             out_report if params_keep_outputs else temp(out_report)
@@ -40,6 +43,7 @@ def microsatSklearnClassify(
             classifier = "" if params_classifier is None else "--classifier {}".format(params_classifier),
             classifier_params = "" if params_classifier_params is None else "--classifier-params '{}'".format(params_classifier_params),
             data_method = "" if params_data_method is None else "--data-method {}".format(params_data_method),
+            estimators = "" if in_estimators is None else "--input-estimators {}".format(in_estimators),
             instability_ratio = "" if params_instability_ratio is None else "--instability-ratio {}".format(params_instability_ratio),
             locus_weight_is_score = "--locus-weight-is-score" if params_locus_weight_is_score else "",
             min_depth = "" if params_min_depth is None else "--min-depth {}".format(params_min_depth),
@@ -52,6 +56,7 @@ def microsatSklearnClassify(
             extra = "",
             mem = "10G",
             partition = "normal"
+        threads: params_nb_threads
         conda:
             "envs/anacore-utils.yml"
         shell:
@@ -64,8 +69,10 @@ def microsatSklearnClassify(
             " {params.min_depth}"
             " {params.min_voting_loci}"
             " {params.random_seed}"
+            " --threads {threads}"
             " {params.status_method}"
             " {params.undetermined_weight}"
+            " {params.estimators}"
             " --input-evaluated {input.evaluated}"
             " --input-model {input.model}"
             " --output-report {output}"
@@ -0,0 +1,51 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.1.0'
+
+
+def microsatSklearnFit(
+        in_model="microsat/microsatModel.json",
+        out_estimators="microsat/microsatModel_sklearn.pkl",
+        out_stderr="logs/microsatSklearnFit_stderr.txt",
+        params_classifier=None,
+        params_classifier_params=None,  # Must be str
+        params_nb_threads=1,
+        params_random_seed=None,
+        params_keep_outputs=False,
+        params_stderr_append=False):
+    """Fit on model the sklearn classifier of each locus. These classifiers are re-used in tag step with the same classifier, parameters and random seed."""
+    # Parameters
+    if params_classifier_params is not None:
+        if not isinstance(params_classifier_params, str):
+            raise Exception('The argument "params_classifier_params" in rule microsatSklearnFit must be a string not {}: {}.'.format(type(params_classifier_params), params_classifier_params))
+    # Rule
+    rule microsatSklearnFit:
+        input:
+            in_model
+        output:
+            out_estimators if params_keep_outputs else temp(out_estimators)
+        log:
+            out_stderr
+        params:
+            bin_path = os.path.abspath(os.path.join(workflow.basedir, "scripts/microsatSklearnFit.py")),
+            classifier = "" if params_classifier is None else "--classifier {}".format(params_classifier),
+            classifier_params = "" if params_classifier_params is None else "--classifier-params '{}'".format(params_classifier_params),
+            random_seed = "" if params_random_seed is None else "--random-seed {}".format(params_random_seed),
+            stderr_redirection = "2>" if not params_stderr_append else "2>>"
+        resources:
+            extra = "",
+            mem = "10G",
+            partition = "normal"
+        threads: params_nb_threads
+        conda:
+            "envs/anacore-utils.yml"
+        shell:
+            "{params.bin_path}"
+            " {params.classifier}"
+            " {params.classifier_params}"
+            " {params.random_seed}"
+            " --threads {threads}"
+            " --input-model {input}"
+            " --output-estimators {output}"
+            " {params.stderr_redirection} {log}"
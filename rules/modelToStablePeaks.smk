@@ -1,26 +1,32 @@
 __author__ = 'Frederic Escudie'
 __copyright__ = 'Copyright (C) 2024 CHU Toulouse'
 __license__ = 'GNU General Public License'
-__version__ = '1.0.0'
+__version__ = '1.2.0'
 
 
 def modelToStablePeaks(
         in_model="microsat/microsatModel.json",
+        in_baselines=None,
         out_stable_peaks="microsat/stable_model_peaks.json",
+        out_stable_peaks_asset=None,
         out_stderr="logs/modelToStablePeaks_stderr.txt",
         params_model_min_support=None,
         params_keep_outputs=False,
         params_stderr_append=False):
-    """Extract most represented lengths by locus from stable microsatellites model."""
+    """Extract most represented lengths by locus from stable microsatellites model. With in_baselines the lengths are read from the baselines computed in learn step. With out_stable_peaks_asset these lengths are also written in JavaScript asset shared by the samples HTML reports."""
+    outputs = [out_stable_peaks] if out_stable_peaks_asset is None else [out_stable_peaks, out_stable_peaks_asset]
     rule modelToStablePeaks:
         input:
-            in_model
+            baselines = [] if in_baselines is None else in_baselines,
+            model = in_model
         output:
-            out_stable_peaks if params_keep_outputs else temp(out_stable_peaks)
+            outputs if params_keep_outputs else [temp(elt) for elt in outputs]
         log:
             out_stderr
         params:
             bin_path = os.path.abspath(os.path.join(workflow.basedir, "scripts/modelToStablePeaks.py")),
+            baselines = "" if in_baselines is None else "--input-baselines {}".format(in_baselines),
+            asset = "" if out_stable_peaks_asset is None else "--output-asset {}".format(out_stable_peaks_asset),
             model_min_support = "" if params_model_min_support is None else "--min-support {}".format(params_model_min_support),
             stderr_redirection = "2>" if not params_stderr_append else "2>>"
         resources:
@@ -33,6 +39,8 @@ def modelToStablePeaks(
         shell:
             "{params.bin_path}"
             " {params.model_min_support}"
-            " --input-model {input}"
-            " --output-peaks {output}"
+            " {params.baselines}"
+            " --input-model {input.model}"
+            " --output-peaks {output[0]}"
+            " {params.asset}"
             " {params.stderr_redirection} {log}"
@@ -0,0 +1,38 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+
+def wfPerfReport(
+        in_outputs,
+        in_metrics_folders=["."],
+        out_table="logs/perf.tsv",
+        out_details="logs/perf_details.tsv",
+        out_stderr="logs/wfPerfReport_stderr.txt",
+        params_stderr_append=False):
+    """Aggregate the metrics written by the scripts next to their outputs (files *_metrics.json) in run-wide performance tables. The rule is executed after in_outputs, the final outputs of the workflow."""
+    rule wfPerfReport:
+        input:
+            in_outputs
+        output:
+            details = out_details,
+            table = out_table
+        log:
+            out_stderr
+        params:
+            bin_path = os.path.abspath(os.path.join(workflow.basedir, "scripts/wfPerfReport.py")),
+            metrics_folders = " ".join(in_metrics_folders),
+            stderr_redirection = "2>" if not params_stderr_append else "2>>"
+        resources:
+            extra = "",
+            mem = "1G",
+            partition = "normal"
+        conda:
+            "envs/anacore-utils.yml"
+        shell:
+            "{params.bin_path}"
+            " --inputs-metrics {params.metrics_folders}"
+            " --output-details {output.details}"
+            " --output-table {output.table}"
+            " {params.stderr_redirection} {log}"
@@ -1,7 +1,7 @@
 __author__ = 'Frederic Escudie'
 __copyright__ = 'Copyright (C) 2020 CHU Toulouse'
 __license__ = 'GNU General Public License'
-__version__ = '1.0.0'
+__version__ = '1.3.0'
 
 
 def wfReport(
@@ -9,15 +9,19 @@ def wfReport(
         in_classification="microsat/{sample}_stabilityStatus.json",
         in_resources_folder=None,
         in_stable_peaks="microsat/stable_model_peaks.json",
+        in_stable_peaks_asset=None,
         out_run_report="report/run.html",
         out_spl_reports="report/{sample}.html",
         out_stderr_cpRsc="logs/reportCpReportResources_stderr.txt",
         out_stderr_run="logs/reportRun_stderr.txt",
         out_stderr_spl="logs/report{sample}_stderr.txt",
         params_classification_method_name=None,
-        params_data_method_name="alnLength"):
-    """Write samples and run reports."""
-    # Copy web resources
+        params_data_method_name="alnLength",
+        params_run_nb_threads=1,
+        params_resources_mode="copy",
+        params_resources_store=None):
+    """Write samples and run reports. With in_stable_peaks_asset the samples reports load the model peaks from this shared file instead of including in_stable_peaks. The run report uses the summaries written next to the classification reports and parses with params_run_nb_threads processes the reports without summary. The web resources are copied in reports folder or with params_resources_store linked (params_resources_mode: "hardlink" or "symlink") from a shared folder where they are stored once by content hash."""
+    # Set web resources
     if in_resources_folder is None:
         in_resources_folder = os.path.abspath(os.path.join(workflow.basedir, "report_resources"))
     out_report_folder = os.path.dirname(out_spl_reports)
@@ -30,20 +34,28 @@ def wfReport(
         log:
             out_stderr_cpRsc
         params:
-            report_dir = out_report_folder
+            bin_path = os.path.abspath(os.path.join(workflow.basedir, "scripts/wfReportResources.py")),
+            mode = "--mode {}".format(params_resources_mode),
+            resources_store = "" if params_resources_store is None else "--resources-store {}".format(params_resources_store)
         resources:
             mem = "1G",
             partition = "normal"
         threads: 1
+        conda:
+            "envs/anacore-utils.yml"
         shell:
-            "mkdir -p {params.report_dir} && cp -r {input} {output}"
+            "{params.bin_path}"
+            " {params.mode}"
+            " {params.resources_store}"
+            " --input-resources {input}"
+            " --output-resources {output}"
             " 2> {log}"
     # Create sample report
     rule wfSplReport:
         input:
             classification = in_classification,
             lib = out_resources_folder,  # Not input but necessary to output
-            stable_peaks = in_stable_peaks
+            stable_peaks = in_stable_peaks if in_stable_peaks_asset is None else in_stable_peaks_asset
         output:
             out_spl_reports
         log:
@@ -51,7 +63,8 @@ def wfReport(
         params:
             bin_path = os.path.abspath(os.path.join(workflow.basedir, "scripts/wfSplReport.py")),
             data_method_name = "" if params_data_method_name is None else "--data-method-name {}".format(params_data_method_name),
-            sample = " --sample-name {sample}"
+            sample = " --sample-name {sample}",
+            stable_peaks = "--input-stable-peaks " + in_stable_peaks if in_stable_peaks_asset is None else "--model-peaks-asset " + os.path.relpath(in_stable_peaks_asset, os.path.dirname(out_spl_reports))
         resources:
             mem = "3G",
             partition = "normal"
@@ -62,7 +75,7 @@ def wfReport(
             "{params.bin_path}"
             " {params.sample}"
             " {params.data_method_name}"
-            " --input-stable-peaks {input.stable_peaks}"
+            " {params.stable_peaks}"
             " --input-report {input.classification}"
             " --output-report {output}"
             " 2> {log}"
@@ -80,12 +93,13 @@ def wfReport(
         resources:
             mem = "2G",
             partition = "normal"
-        threads: 1
+        threads: params_run_nb_threads
         conda:
             "envs/anacore-utils.yml"
         shell:
             "{params.bin_path}"
             " {params.classification_method_name}"
+            " --threads {threads}"
             " --inputs-report {input}"
             " --output-report {output}"
             " 2> {log}"
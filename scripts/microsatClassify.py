@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.5.0'
+
+import argparse
+import json
+import logging
+from miniti.engine import ClassificationEngine
+from miniti.metrics import ScriptMetrics
+import os
+import sys
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+class ClassifierParamsAction(argparse.Action):
+    """Manages classifier-params parameters."""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        setattr(namespace, self.dest, json.loads(values))
+
+
+def process(args, metrics):
+    """
+    Predict stability classes and scores for loci and samples with mSINGS, MSIsensor-pro pro and sklearn classifier and write one report containing all the results.
+
+    :param args: The namespace extracted from the script arguments.
+    :type args: Namespace
+    :param metrics: The metrics of the script.
+    :type metrics: miniti.metrics.ScriptMetrics
+    :return: Paths to the written outputs.
+    :rtype: list
+    """
+    with metrics.stage("load"):
+        engine = ClassificationEngine(
+            args.input_model, args.input_baselines, args.input_estimators, args.data_method, args.msings_method,
+            args.msisensorpro_method, args.sklearn_method, args.min_depth, args.std_dev_rate, args.classifier,
+            args.classifier_params, args.random_seed, args.min_voting_loci, args.instability_ratio,
+            args.undetermined_weight, args.locus_weight_is_score, args.threads
+        )
+    return engine.classifyReports(args.inputs_evaluated, args.outputs_report, args.output_pattern, metrics)
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    # Manage parameters
+    parser = argparse.ArgumentParser(description='Predict stability classes and scores for loci and samples using mSINGS v4.0 like, MSIsensor-pro pro v1.2.0 like and sklearn classifiers in one process.')
+    parser.add_argument('--data-method', help='The name of the method storing locus metrics. [Default: classifier name]')
+    parser.add_argument('--msings-method', default="mSINGSUp", help='The name of the method where the mSINGS status will be set. [Default: %(default)s]')
+    parser.add_argument('--msisensorpro-method', default="MSIsensor-pro_pro", help='The name of the method where the MSIsensor-pro status will be set. [Default: %(default)s]')
+    parser.add_argument('--sklearn-method', help='The name of the method where the sklearn classifier status will be set. [Default: classifier name]')
+    parser.add_argument('--threads', default=1, type=int, help='Number of processes used to fit and predict sklearn classifiers of loci. [Default: %(default)s]')
+    parser.add_argument('-v', '--version', action='version', version=__version__)
+    group_locus = parser.add_argument_group('Locus classifier')  # Locus status
+    group_locus.add_argument('-f', '--min-depth', default=60, type=int, help='The minimum numbers of reads or fragments to determine the status. [Default: %(default)s]')
+    group_locus.add_argument('-t', '--std-dev-rate', default=2.0, type=float, help='[mSINGS] The locus is tagged as unstable if the number of peaks is upper than models_avg_nb_peaks + std_dev_rate * models_std_dev_nb_peaks. [Default: %(default)s]')
+    group_locus.add_argument('-k', '--classifier', default="SVC", choices=["DecisionTree", "KNeighbors", "LogisticRegression", "RandomForest", "SVC"], help='[sklearn] The classifier used to predict loci status.')
+    group_locus.add_argument('-p', '--classifier-params', action=ClassifierParamsAction, default={}, help='[sklearn] By default the classifier is used with these default parameters defined in scikit-learn. If you want change these parameters you use this option to provide them as json string. Example: {"n_estimators": 1000, "criterion": "entropy"} for RandmForest.')
+    group_locus.add_argument('-s', '--random-seed', default=None, type=int, help='[sklearn] The seed used by the random number generator in the classifier.')
+    group_status = parser.add_argument_group('Sample consensus status')  # Sample status
+    group_status.add_argument('-l', '--min-voting-loci', default=0.5, type=float, help='Minimum number of voting loci (stable + unstable) to determine the sample status. If the number of voting loci is lower than this value the status for the sample will be undetermined. [Default: %(default)s]')
+    group_status.add_argument('-i', '--instability-ratio', default=0.2, type=float, help='If the ratio unstable/(stable + unstable) is superior than this value the status of the sample will be unstable otherwise it will be stable. [Default: %(default)s]')
+    group_score = parser.add_argument_group('Sample prediction score')  # Sample score
+    group_score.add_argument('-w', '--undetermined-weight', default=0, type=float, help='The weight of the undetermined loci in sample score calculation. [Default: %(default)s]')
+    group_score.add_argument('-d', '--locus-weight-is-score', action='store_true', help='Use the prediction score of each locus as wheight of this locus in sample prediction score calculation. [Default: %(default)s]')
+    group_input = parser.add_argument_group('Inputs')  # Inputs
+    group_input.add_argument('-r', '--input-model', required=True, help='Path to the file containing the references samples used in learn step (format: MSIReport or binary model folder).')
+    group_input.add_argument('-e', '--inputs-evaluated', '--input-evaluated', dest="inputs_evaluated", required=True, nargs='+', help='Paths to the files containing the samples with loci to classify or to folders containing these files (format: MSIReport).')
+    group_input.add_argument('-b', '--input-baselines', help='[mSINGS and MSIsensor-pro] Path to the baselines computed from model in learn step (format: JSON). With this file the model samples are read only for the loci missing in baselines. A file produced from another model is ignored.')
+    group_input.add_argument('-a', '--input-estimators', help='[sklearn] Path to the classifiers pre-fitted on model in learn step (format: pickle). Classifiers missing in this file or a file produced from another model lead to fit classifiers on model.')
+    group_output = parser.add_argument_group('Outputs')  # Outputs
+    group_output_ex = group_output.add_mutually_exclusive_group(required=True)
+    group_output_ex.add_argument('-o', '--outputs-report', '--output-report', dest="outputs_report", nargs='+', help='The paths to the output files, one by evaluated report and in the same order. Outputs ending with ".gz" are compressed with gzip and those ending with ".zst" with zstd (format: MSIReport).')
+    group_output_ex.add_argument('-n', '--output-pattern', help='The path pattern to the output files with one file by sample. The tag "{sample}" is replaced by the sample name (format: MSIReport). Example: classif/{sample}_stabilityStatus.json.')
+    args = parser.parse_args()
+
+    args.classifier_params["random_state"] = args.random_seed
+    if args.data_method is None:
+        args.data_method = args.classifier
+    if args.sklearn_method is None:
+        args.sklearn_method = args.classifier
+
+    # Logger
+    logging.basicConfig(format='%(asctime)s -- [%(filename)s][pid:%(process)d][%(levelname)s] -- %(message)s')
+    log = logging.getLogger(os.path.basename(__file__))
+    log.setLevel(logging.INFO)
+    log.info("Command: " + " ".join(sys.argv))
+
+    # Process
+    metrics = ScriptMetrics(os.path.basename(__file__))
+    written_paths = process(args, metrics)
+    metrics.write(written_paths[0])
+    log.info("End of job")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.2.0'
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+class ClassifierParamsAction(argparse.Action):
+    """Manages classifier-params parameters."""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        setattr(namespace, self.dest, json.loads(values))
+
+
+def getSettings(args):
+    """
+    Return the parameters changing the classification results. The service rejects the request if it has been started with other values (see microsatClassifyServer.getSettings()).
+
+    :param args: The namespace extracted from the script arguments.
+    :type args: Namespace
+    :return: By parameter name its value. Paths are resolved.
+    :rtype: dict
+    """
+    return {
+        "baselines": None if args.input_baselines is None else os.path.realpath(args.input_baselines),
+        "classifier": args.classifier,
+        "classifier_params": args.classifier_params,
+        "data_method": args.data_method,
+        "estimators": None if args.input_estimators is None else os.path.realpath(args.input_estimators),
+        "instability_ratio": args.instability_ratio,
+        "locus_weight_is_score": args.locus_weight_is_score,
+        "min_depth": args.min_depth,
+        "min_voting_loci": args.min_voting_loci,
+        "msings_method": args.msings_method,
+        "msisensorpro_method": args.msisensorpro_method,
+        "random_seed": args.random_seed,
+        "sklearn_method": args.sklearn_method,
+        "std_dev_rate": args.std_dev_rate,
+        "undetermined_weight": args.undetermined_weight
+    }
+
+
+def sendRequest(socket_path, request):
+    """
+    Send request to the classification service and return its response.
+
+    :param socket_path: Path to the Unix socket where the service listens.
+    :type socket_path: str
+    :param request: The request.
+    :type request: dict
+    :return: The response with keys "status" ("ok" or "error") and "message".
+    :rtype: dict
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        with client.makefile("rb") as reader:
+            response = reader.readline()
+    if not response:
+        raise Exception("The classification service on {} has closed the connection without response.".format(socket_path))
+    return json.loads(response.decode("utf-8"))
+
+
+def process(args):
+    """
+    Send evaluated reports to the classification service and wait for the classified reports.
+
+    :param args: The namespace extracted from the script arguments.
+    :type args: Namespace
+    """
+    if args.stop:
+        request = {"action": "stop"}
+    else:
+        request = {
+            "inputs_evaluated": [os.path.abspath(path) for path in args.inputs_evaluated],
+            "settings": getSettings(args)
+        }
+        if args.input_model is not None:
+            request["model"] = os.path.abspath(args.input_model)
+        if args.output_pattern is not None:
+            request["output_pattern"] = os.path.abspath(args.output_pattern)
+        else:
+            request["outputs_report"] = [os.path.abspath(path) for path in args.outputs_report]
+    response = sendRequest(args.socket, request)
+    if response["status"] != "ok":
+        raise Exception("Classification service error: {}".format(response["message"]))
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    # Manage parameters
+    parser = argparse.ArgumentParser(description='Predict stability classes and scores for loci and samples with the long-running classification service (see microsatClassifyServer.py). The parameters are the same as in microsatClassify.py: if the service has been started with another model or other parameters the classification fails.')
+    parser.add_argument('--data-method', help='The name of the method storing locus metrics. [Default: classifier name]')
+    parser.add_argument('--msings-method', default="mSINGSUp", help='The name of the method where the mSINGS status will be set. [Default: %(default)s]')
+    parser.add_argument('--msisensorpro-method', default="MSIsensor-pro_pro", help='The name of the method where the MSIsensor-pro status will be set. [Default: %(default)s]')
+    parser.add_argument('--sklearn-method', help='The name of the method where the sklearn classifier status will be set. [Default: classifier name]')
+    parser.add_argument('-x', '--stop', action='store_true', help='Stop the service instead of classifying samples.')
+    parser.add_argument('-v', '--version', action='version', version=__version__)
+    group_locus = parser.add_argument_group('Locus classifier')  # Locus status
+    group_locus.add_argument('-f', '--min-depth', default=60, type=int, help='The minimum numbers of reads or fragments to determine the status. [Default: %(default)s]')
+    group_locus.add_argument('-t', '--std-dev-rate', default=2.0, type=float, help='[mSINGS] The locus is tagged as unstable if the number of peaks is upper than models_avg_nb_peaks + std_dev_rate * models_std_dev_nb_peaks. [Default: %(default)s]')
+    group_locus.add_argument('-k', '--classifier', default="SVC", choices=["DecisionTree", "KNeighbors", "LogisticRegression", "RandomForest", "SVC"], help='[sklearn] The classifier used to predict loci status.')
+    group_locus.add_argument('-p', '--classifier-params', action=ClassifierParamsAction, default={}, help='[sklearn] By default the classifier is used with these default parameters defined in scikit-learn. If you want change these parameters you use this option to provide them as json string. Example: {"n_estimators": 1000, "criterion": "entropy"} for RandmForest.')
+    group_locus.add_argument('-s', '--random-seed', default=None, type=int, help='[sklearn] The seed used by the random number generator in the classifier.')
+    group_status = parser.add_argument_group('Sample consensus status')  # Sample status
+    group_status.add_argument('-l', '--min-voting-loci', default=0.5, type=float, help='Minimum number of voting loci (stable + unstable) to determine the sample status. If the number of voting loci is lower than this value the status for the sample will be undetermined. [Default: %(default)s]')
+    group_status.add_argument('-i', '--instability-ratio', default=0.2, type=float, help='If the ratio unstable/(stable + unstable) is superior than this value the status of the sample will be unstable otherwise it will be stable. [Default: %(default)s]')
+    group_score = parser.add_argument_group('Sample prediction score')  # Sample score
+    group_score.add_argument('-w', '--undetermined-weight', default=0, type=float, help='The weight of the undetermined loci in sample score calculation. [Default: %(default)s]')
+    group_score.add_argument('-d', '--locus-weight-is-score', action='store_true', help='Use the prediction score of each locus as wheight of this locus in sample prediction score calculation. [Default: %(default)s]')
+    group_input = parser.add_argument_group('Inputs')  # Inputs
+    group_input.add_argument('-u', '--socket', required=True, help='Path to the Unix socket where the service listens.')
+    group_input.add_argument('-r', '--input-model', help='Path to the model expected in the service. If the service has been started with another model the classification fails.')
+    group_input.add_argument('-b', '--input-baselines', help='[mSINGS and MSIsensor-pro] Path to the baselines expected in the service.')
+    group_input.add_argument('-a', '--input-estimators', help='[sklearn] Path to the pre-fitted classifiers expected in the service.')
+    group_input.add_argument('-e', '--inputs-evaluated', '--input-evaluated', dest="inputs_evaluated", nargs='+', help='Paths to the files containing the samples with loci to classify or to folders containing these files (format: MSIReport).')
+    group_output = parser.add_argument_group('Outputs')  # Outputs
+    group_output_ex = group_output.add_mutually_exclusive_group()
+    group_output_ex.add_argument('-o', '--outputs-report', '--output-report', dest="outputs_report", nargs='+', help='The paths to the output files, one by evaluated report and in the same order. Outputs ending with ".gz" are compressed with gzip and those ending with ".zst" with zstd (format: MSIReport).')
+    group_output_ex.add_argument('-n', '--output-pattern', help='The path pattern to the output files with one file by sample. The tag "{sample}" is replaced by the sample name (format: MSIReport). Example: classif/{sample}_stabilityStatus.json.')
+    args = parser.parse_args()
+
+    if not args.stop:
+        if args.inputs_evaluated is None:
+            parser.error("the following arguments are required without --stop: -e/--inputs-evaluated")
+        if args.outputs_report is None and args.output_pattern is None:
+            parser.error("one of the arguments -o/--outputs-report -n/--output-pattern is required without --stop")
+    args.classifier_params["random_state"] = args.random_seed
+    if args.data_method is None:
+        args.data_method = args.classifier
+    if args.sklearn_method is None:
+        args.sklearn_method = args.classifier
+
+    # Logger
+    logging.basicConfig(format='%(asctime)s -- [%(filename)s][pid:%(process)d][%(levelname)s] -- %(message)s')
+    log = logging.getLogger(os.path.basename(__file__))
+    log.setLevel(logging.INFO)
+    log.info("Command: " + " ".join(sys.argv))
+
+    # Process
+    process(args)
+    log.info("End of job")
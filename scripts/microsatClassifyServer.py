@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.1.0'
+
+import argparse
+import json
+import logging
+from miniti.engine import ClassificationEngine
+import os
+import socketserver
+import sys
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+class ClassifierParamsAction(argparse.Action):
+    """Manages classifier-params parameters."""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        setattr(namespace, self.dest, json.loads(values))
+
+
+class ClassifyRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Process one request sent by microsatClassifyClient.py. The request is one JSON line with keys "inputs_evaluated" and "outputs_report" or "output_pattern" (see ClassificationEngine.classifyReports()) and optionally "model" and "settings" to check the model and the parameters used to start the service (see getSettings()). The request is rejected if they are different. The request {"action": "stop"} shutdowns the service. The response is one JSON line with keys "status" ("ok" or "error") and "message".
+    """
+
+    def handle(self):
+        log = self.server.log
+        response = {"status": "ok", "message": ""}
+        try:
+            request = json.loads(self.rfile.readline().decode("utf-8"))
+            if request.get("action") == "stop":
+                log.info("Stop requested")
+                response["message"] = "Service stopped"
+                self.server.stop_requested = True
+            else:
+                log.info("Classify {}".format(" ".join(request["inputs_evaluated"])))
+                if "model" in request and os.path.realpath(request["model"]) != os.path.realpath(self.server.engine.model_path):
+                    raise Exception("The service has been started with the model {} and not {}.".format(self.server.engine.model_path, request["model"]))
+                if "settings" in request:
+                    differences = [
+                        "{} {} and not {}".format(name, json.dumps(self.server.settings.get(name)), json.dumps(request["settings"].get(name)))
+                        for name in sorted(set(self.server.settings) | set(request["settings"]))
+                        if self.server.settings.get(name) != request["settings"].get(name)
+                    ]
+                    if len(differences) != 0:
+                        raise Exception("The service has been started with {}.".format(", ".join(differences)))
+                self.server.engine.classifyReports(
+                    request["inputs_evaluated"],
+                    request.get("outputs_report"),
+                    request.get("output_pattern")
+                )
+        except Exception as error:
+            log.error("{}: {}".format(type(error).__name__, error))
+            response = {"status": "error", "message": "{}: {}".format(type(error).__name__, error)}
+        self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+
+
+def getSettings(args):
+    """
+    Return the parameters changing the classification results. They are compared with the parameters sent by microsatClassifyClient.py in each request.
+
+    :param args: The namespace extracted from the script arguments.
+    :type args: Namespace
+    :return: By parameter name its value. Paths are resolved.
+    :rtype: dict
+    """
+    return {
+        "baselines": None if args.input_baselines is None else os.path.realpath(args.input_baselines),
+        "classifier": args.classifier,
+        "classifier_params": args.classifier_params,
+        "data_method": args.data_method,
+        "estimators": None if args.input_estimators is None else os.path.realpath(args.input_estimators),
+        "instability_ratio": args.instability_ratio,
+        "locus_weight_is_score": args.locus_weight_is_score,
+        "min_depth": args.min_depth,
+        "min_voting_loci": args.min_voting_loci,
+        "msings_method": args.msings_method,
+        "msisensorpro_method": args.msisensorpro_method,
+        "random_seed": args.random_seed,
+        "sklearn_method": args.sklearn_method,
+        "std_dev_rate": args.std_dev_rate,
+        "undetermined_weight": args.undetermined_weight
+    }
+
+
+def process(args, log):
+    """
+    Load model, baselines and classifiers once and classify the evaluated reports received on Unix socket until a stop request.
+
+    :param args: The namespace extracted from the script arguments.
+    :type args: Namespace
+    :param log: Logger of the script.
+    :type log: logging.Logger
+    """
+    # Load model data
+    engine = ClassificationEngine(
+        args.input_model, args.input_baselines, args.input_estimators, args.data_method, args.msings_method,
+        args.msisensorpro_method, args.sklearn_method, args.min_depth, args.std_dev_rate, args.classifier,
+        args.classifier_params, args.random_seed, args.min_voting_loci, args.instability_ratio,
+        args.undetermined_weight, args.locus_weight_is_score, args.threads
+    )
+    engine.warmUp()
+    log.info("Model {} loaded (md5: {})".format(args.input_model, engine.model_md5))
+    # Serve requests one by one
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+    with socketserver.UnixStreamServer(args.socket, ClassifyRequestHandler) as server:
+        server.engine = engine
+        server.log = log
+        server.settings = getSettings(args)
+        server.stop_requested = False
+        log.info("Listen on {}".format(args.socket))
+        try:
+            while not server.stop_requested:
+                server.handle_request()
+        finally:
+            os.remove(args.socket)
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    # Manage parameters
+    parser = argparse.ArgumentParser(description='Long-running service predicting stability classes and scores for loci and samples using mSINGS v4.0 like, MSIsensor-pro pro v1.2.0 like and sklearn classifiers. The model, the baselines and the fitted classifiers are loaded once and the evaluated reports are received on a Unix socket (see microsatClassifyClient.py). Outputs are identical to microsatClassify.py with the same parameters.')
+    parser.add_argument('--data-method', help='The name of the method storing locus metrics. [Default: classifier name]')
+    parser.add_argument('--msings-method', default="mSINGSUp", help='The name of the method where the mSINGS status will be set. [Default: %(default)s]')
+    parser.add_argument('--msisensorpro-method', default="MSIsensor-pro_pro", help='The name of the method where the MSIsensor-pro status will be set. [Default: %(default)s]')
+    parser.add_argument('--sklearn-method', help='The name of the method where the sklearn classifier status will be set. [Default: classifier name]')
+    parser.add_argument('--threads', default=1, type=int, help='Number of processes used to fit and predict sklearn classifiers of loci. [Default: %(default)s]')
+    parser.add_argument('-v', '--version', action='version', version=__version__)
+    group_locus = parser.add_argument_group('Locus classifier')  # Locus status
+    group_locus.add_argument('-f', '--min-depth', default=60, type=int, help='The minimum numbers of reads or fragments to determine the status. [Default: %(default)s]')
+    group_locus.add_argument('-t', '--std-dev-rate', default=2.0, type=float, help='[mSINGS] The locus is tagged as unstable if the number of peaks is upper than models_avg_nb_peaks + std_dev_rate * models_std_dev_nb_peaks. [Default: %(default)s]')
+    group_locus.add_argument('-k', '--classifier', default="SVC", choices=["DecisionTree", "KNeighbors", "LogisticRegression", "RandomForest", "SVC"], help='[sklearn] The classifier used to predict loci status.')
+    group_locus.add_argument('-p', '--classifier-params', action=ClassifierParamsAction, default={}, help='[sklearn] By default the classifier is used with these default parameters defined in scikit-learn. If you want change these parameters you use this option to provide them as json string. Example: {"n_estimators": 1000, "criterion": "entropy"} for RandmForest.')
+    group_locus.add_argument('-s', '--random-seed', default=None, type=int, help='[sklearn] The seed used by the random number generator in the classifier.')
+    group_status = parser.add_argument_group('Sample consensus status')  # Sample status
+    group_status.add_argument('-l', '--min-voting-loci', default=0.5, type=float, help='Minimum number of voting loci (stable + unstable) to determine the sample status. If the number of voting loci is lower than this value the status for the sample will be undetermined. [Default: %(default)s]')
+    group_status.add_argument('-i', '--instability-ratio', default=0.2, type=float, help='If the ratio unstable/(stable + unstable) is superior than this value the status of the sample will be unstable otherwise it will be stable. [Default: %(default)s]')
+    group_score = parser.add_argument_group('Sample prediction score')  # Sample score
+    group_score.add_argument('-w', '--undetermined-weight', default=0, type=float, help='The weight of the undetermined loci in sample score calculation. [Default: %(default)s]')
+    group_score.add_argument('-d', '--locus-weight-is-score', action='store_true', help='Use the prediction score of each locus as wheight of this locus in sample prediction score calculation. [Default: %(default)s]')
+    group_input = parser.add_argument_group('Inputs')  # Inputs
+    group_input.add_argument('-r', '--input-model', required=True, help='Path to the file containing the references samples used in learn step (format: MSIReport or binary model folder).')
+    group_input.add_argument('-b', '--input-baselines', help='[mSINGS and MSIsensor-pro] Path to the baselines computed from model in learn step (format: JSON). Without this file or with a file produced from another model, the baselines are computed at startup.')
+    group_input.add_argument('-a', '--input-estimators', help='[sklearn] Path to the classifiers pre-fitted on model in learn step (format: pickle). Classifiers missing in this file or a file produced from another model are fitted at startup.')
+    group_input.add_argument('-u', '--socket', required=True, help='Path to the Unix socket where the service listens.')
+    args = parser.parse_args()
+
+    args.classifier_params["random_state"] = args.random_seed
+    if args.data_method is None:
+        args.data_method = args.classifier
+    if args.sklearn_method is None:
+        args.sklearn_method = args.classifier
+
+    # Logger
+    logging.basicConfig(format='%(asctime)s -- [%(filename)s][pid:%(process)d][%(levelname)s] -- %(message)s')
+    log = logging.getLogger(os.path.basename(__file__))
+    log.setLevel(logging.INFO)
+    log.info("Command: " + " ".join(sys.argv))
+
+    # Process
+    process(args, log)
+    log.info("End of job")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.2.0'
+
+import argparse
+import logging
+from miniti.baseline import writeBaselines
+from miniti.engine import getModelBaselines
+from miniti.metrics import ScriptMetrics
+from miniti.model import getModelChecksum
+import os
+import sys
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def process(args, metrics):
+    """
+    Compute by locus the mSINGS and MSIsensor-pro baselines and the stable peaks from model and write them.
+
+    :param args: The namespace extracted from the script arguments.
+    :type args: Namespace
+    :param metrics: The metrics of the script.
+    :type metrics: miniti.metrics.ScriptMetrics
+    """
+    with metrics.stage("baselines") as stage:
+        baseline_by_locus = getModelBaselines(args.input_model)
+        stage["nb_items"] = len(baseline_by_locus)
+    with metrics.stage("checksum"):
+        model_md5 = getModelChecksum(args.input_model)
+    with metrics.stage("write", 1):
+        writeBaselines(args.output_baselines, baseline_by_locus, model_md5)
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    # Manage parameters
+    parser = argparse.ArgumentParser(description='Compute by locus the mSINGS and MSIsensor-pro baselines and the higher peaks of the stable samples from model. These baselines are used in tag step to avoid reading all the model samples.')
+    parser.add_argument('-v', '--version', action='version', version=__version__)
+    group_input = parser.add_argument_group('Inputs')  # Inputs
+    group_input.add_argument('-r', '--input-model', required=True, help='Path to the file containing the references samples used in learn step (format: MSIReport or binary model folder).')
+    group_output = parser.add_argument_group('Outputs')  # Outputs
+    group_output.add_argument('-o', '--output-baselines', required=True, help='The path to the output file containing the baselines (format: JSON).')
+    args = parser.parse_args()
+
+    # Logger
+    logging.basicConfig(format='%(asctime)s -- [%(filename)s][pid:%(process)d][%(levelname)s] -- %(message)s')
+    log = logging.getLogger(os.path.basename(__file__))
+    log.setLevel(logging.INFO)
+    log.info("Command: " + " ".join(sys.argv))
+
+    # Process
+    metrics = ScriptMetrics(os.path.basename(__file__))
+    process(args, metrics)
+    metrics.write(args.output_baselines)
+    log.info("End of job")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.2.0'
+
+import argparse
+import logging
+from miniti.metrics import ScriptMetrics
+from miniti.model import isBinaryModel, writeBinaryModel, writeJSONModel
+import os
+import sys
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    # Manage parameters
+    parser = argparse.ArgumentParser(description='Convert model from MSIReport to binary format or from binary to MSIReport format. The binary format is a folder containing a JSON header and arrays (format: npy) read by memory mapping in tag step.')
+    parser.add_argument('-v', '--version', action='version', version=__version__)
+    group_input = parser.add_argument_group('Inputs')  # Inputs
+    group_input.add_argument('-i', '--input-model', required=True, help='Path to the model to convert (format: MSIReport, optionally compressed with gzip or zstd, or binary model folder).')
+    group_output = parser.add_argument_group('Outputs')  # Outputs
+    group_output.add_argument('-o', '--output-model', required=True, help='Path to the converted model (format: binary model folder if input is MSIReport, otherwise MSIReport). The MSIReport is compressed if the path ends with .gz or .zst.')
+    args = parser.parse_args()
+
+    # Logger
+    logging.basicConfig(format='%(asctime)s -- [%(filename)s][pid:%(process)d][%(levelname)s] -- %(message)s')
+    log = logging.getLogger(os.path.basename(__file__))
+    log.setLevel(logging.INFO)
+    log.info("Command: " + " ".join(sys.argv))
+
+    # Process
+    metrics = ScriptMetrics(os.path.basename(__file__))
+    with metrics.stage("convert"):
+        if isBinaryModel(args.input_model):
+            writeJSONModel(args.input_model, args.output_model)
+        else:
+            writeBinaryModel(args.input_model, args.output_model)
+    metrics.write(args.output_model)
+    log.info("End of job")
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.1.0'
+
+import argparse
+import logging
+from miniti.checksum import getDigestPath, writeDigest
+from miniti.metrics import ScriptMetrics
+import os
+import sys
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    # Manage parameters
+    parser = argparse.ArgumentParser(description='Write checksum, size and modification time of the model. In tag step this digest is used instead of computing the model checksum in each job.')
+    parser.add_argument('-v', '--version', action='version', version=__version__)
+    group_input = parser.add_argument_group('Inputs')  # Inputs
+    group_input.add_argument('-r', '--input-model', required=True, help='Path to the file containing the references samples used in learn step (format: MSIReport).')
+    group_output = parser.add_argument_group('Outputs')  # Outputs
+    group_output.add_argument('-o', '--output-digest', help='The path to the output file. It must be named as the model with the suffix "_digest.json" to be found by tag step. [Default: model path with suffix "_digest.json"]')
+    args = parser.parse_args()
+
+    # Logger
+    logging.basicConfig(format='%(asctime)s -- [%(filename)s][pid:%(process)d][%(levelname)s] -- %(message)s')
+    log = logging.getLogger(os.path.basename(__file__))
+    log.setLevel(logging.INFO)
+    log.info("Command: " + " ".join(sys.argv))
+
+    # Process
+    metrics = ScriptMetrics(os.path.basename(__file__))
+    with metrics.stage("digest", 1):
+        writeDigest(args.input_model, args.output_digest)
+    metrics.write(getDigestPath(args.input_model) if args.output_digest is None else args.output_digest)
+    log.info("End of job")
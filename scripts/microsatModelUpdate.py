@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.1.3'
+
+import argparse
+import json
+import logging
+from miniti.baseline import loadBaselines, writeBaselines
+from miniti.checksum import writeDigest
+from miniti.compression import getContent
+from miniti.engine import updateModelBaselines
+from miniti.metrics import ScriptMetrics
+from miniti.model import appendJSONModelSamples, getModelChecksum, JSONModel
+from miniti.modelBuilder import createModel, getKnownStatus
+from miniti.reportIO import parseReport, writeSamples
+import os
+import re
+import sys
+import tempfile
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def getDuplicatedNames(model_path, new_names):
+    """
+    Return names of the new samples already in model or present several times in new samples. The model is only indexed if one of the names is found in its content.
+
+    :param model_path: Path to the model (format: MSIReport).
+    :type model_path: str
+    :param new_names: Names of the new samples.
+    :type new_names: list
+    :return: The duplicated names.
+    :rtype: list
+    """
+    duplicated_names = {name for name in new_names if new_names.count(name) > 1}
+    content = getContent(model_path)
+    candidates = {
+        name for name in set(new_names)
+        if re.search(rb'"name"\s*:\s*' + re.escape(json.dumps(name).encode("utf-8")), content)  # Also matches loci names
+    }
+    content.close()
+    if len(candidates) != 0:
+        model = JSONModel(model_path)
+        duplicated_names |= candidates & set(model.samples_names)
+        model.close()
+    return sorted(duplicated_names)
+
+
+def getNewSamples(distributions_paths, samples_names=None, data_method="model"):
+    """
+    Return the samples from the lengths distributions files. The distributions are moved in the method "model".
+
+    :param distributions_paths: Paths to the lengths distributions of the new samples (format: MSIReport).
+    :type distributions_paths: list
+    :param samples_names: Name of the sample in each distributions file. By default the names stored in files are used.
+    :type samples_names: list
+    :param data_method: The name of the method storing distributions in files.
+    :type data_method: str
+    :return: The new samples.
+    :rtype: list of anacore.msi.sample.MSISample
+    """
+    if samples_names is not None and len(samples_names) != len(distributions_paths):
+        raise Exception("The number of samples names must be equal to the number of lengths distributions files.")
+    samples = list()
+    for file_idx, filepath in enumerate(distributions_paths):
+        file_samples = parseReport(filepath)
+        if samples_names is not None:
+            if len(file_samples) != 1:
+                raise Exception("The file {} must contain only one sample to be renamed.".format(filepath))
+            file_samples[0].name = samples_names[file_idx]
+        for spl in file_samples:
+            for locus in spl.loci.values():
+                locus.results = {"model": locus.results[data_method]} if data_method in locus.results else dict()
+            samples.append(spl)
+    return samples
+
+
+def process(args, log, metrics):
+    """
+    Append new samples to model and update the baselines and the digest of the model.
+
+    :param args: The namespace extracted from the script arguments.
+    :type args: Namespace
+    :param log: Logger of the script.
+    :type log: logging.Logger
+    :param metrics: The metrics of the script.
+    :type metrics: miniti.metrics.ScriptMetrics
+    """
+    # Baselines of the current model
+    baselines = None
+    if args.input_baselines is not None:
+        with metrics.stage("load_baselines"):
+            baselines = loadBaselines(args.input_baselines, getModelChecksum(args.input_model))
+        if baselines is None:
+            raise Exception("Baselines {} cannot be updated because they do not correspond to the model {}.".format(args.input_baselines, args.input_model))
+    # New samples
+    with metrics.stage("create", len(args.inputs_length_distributions)) as stage:
+        new_samples = getNewSamples(args.inputs_length_distributions, args.samples_names, args.data_method)
+        stage["nb_items"] = len(new_samples)
+        duplicated_names = getDuplicatedNames(args.input_model, [spl.name for spl in new_samples])
+        if len(duplicated_names) != 0:
+            raise Exception("The samples {} are already in model or are duplicated.".format(duplicated_names))
+        createModel(new_samples, getKnownStatus(args.input_known_status), args.min_support, args.peak_height_cutoff)
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        new_samples_path = os.path.join(tmp_folder, "new_samples.json")
+        writeSamples(new_samples, new_samples_path)
+        # Baselines
+        if baselines is not None:
+            with metrics.stage("update_baselines", len(new_samples)):
+                updateModelBaselines(baselines, new_samples_path)
+        # Model
+        with metrics.stage("append", len(new_samples)):
+            appendJSONModelSamples(args.input_model, new_samples_path, args.output_model)
+    # Digest and baselines
+    with metrics.stage("digest", 1):
+        writeDigest(args.output_model)
+        model_md5 = getModelChecksum(args.output_model)
+    if baselines is not None:
+        with metrics.stage("write_baselines", 1):
+            writeBaselines(args.output_baselines, baselines, model_md5)
+    log.info("{} samples appended to model {}.".format(len(new_samples), args.output_model))
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    # Manage parameters
+    parser = argparse.ArgumentParser(description='Append new references samples to an existing model without reading the samples already in model. The mSINGS and MSIsensor-pro baselines are updated from the new samples and the model digest is refreshed. The binary model and the pre-fitted sklearn classifiers must be produced again from the updated model.')
+    parser.add_argument('-v', '--version', action='version', version=__version__)
+    group_model = parser.add_argument_group('Model')  # Model
+    group_model.add_argument('-c', '--peak-height-cutoff', default=0.05, type=float, help='[mSINGS] Minimum height to consider a peak in lengths distribution as rate of the highest peak. It must be the same as in model creation. [Default: %(default)s]')
+    group_model.add_argument('-d', '--data-method', default="model", help='The name of the method storing lengths distributions in the new samples files. [Default: %(default)s]')
+    group_model.add_argument('-s', '--min-support', required=True, type=int, help='Minimum number of reads/fragments in lengths distribution to use the locus status in model. It must be the same as in model creation.')
+    group_input = parser.add_argument_group('Inputs')  # Inputs
+    group_input.add_argument('-r', '--input-model', required=True, help='Path to the file containing the references samples used in learn step (format: MSIReport).')
+    group_input.add_argument('-b', '--input-baselines', help='Path to the baselines computed from model by microsatModelBaseline.py (format: JSON).')
+    group_input.add_argument('-k', '--input-known-status', required=True, help='Path to the file describing status (MSI or MSS or Undetermined) of each locus (columns) for each new sample (rows) (format: TSV). See example test/config/known_status.tsv.')
+    group_input.add_argument('-l', '--inputs-length-distributions', required=True, nargs='+', help='Paths to the lengths distributions of the new samples (format: MSIReport).')
+    group_input.add_argument('-n', '--samples-names', nargs='+', help='Name of the sample in each lengths distributions file. [Default: names stored in files]')
+    group_output = parser.add_argument_group('Outputs')  # Outputs
+    group_output.add_argument('-o', '--output-model', required=True, help='The path to the updated model. It can be the input model to update it in place. The digest is written next to this file (format: MSIReport).')
+    group_output.add_argument('-a', '--output-baselines', help='The path to the updated baselines (format: JSON).')
+    args = parser.parse_args()
+    if (args.input_baselines is None) != (args.output_baselines is None):
+        parser.error("--input-baselines and --output-baselines must be used together.")
+
+    # Logger
+    logging.basicConfig(format='%(asctime)s -- [%(filename)s][pid:%(process)d][%(levelname)s] -- %(message)s')
+    log = logging.getLogger(os.path.basename(__file__))
+    log.setLevel(logging.INFO)
+    log.info("Command: " + " ".join(sys.argv))
+
+    # Process
+    metrics = ScriptMetrics(os.path.basename(__file__))
+    process(args, log, metrics)
+    metrics.write(args.output_model)
+    log.info("End of job")
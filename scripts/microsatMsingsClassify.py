@@ -3,17 +3,17 @@
 __author__ = 'Frederic Escudie'
 __copyright__ = 'Copyright (C) 2022 CHU Toulouse'
 __license__ = 'GNU General Public License'
-__version__ = '1.1.0'
+__version__ = '1.6.0'
 
-from anacore.msi.base import Status
-from anacore.msi.locus import LocusRes
-from anacore.msi.msings import MSINGSEval
-from anacore.msi.reportIO import ReportIO
 import argparse
-import hashlib
 import logging
+from miniti.baseline import loadBaselines
+from miniti.metrics import ScriptMetrics
+from miniti.model import getModelChecksum
+from miniti.msings import setLociStatus
+from miniti.reportIO import parseReport, writeSamples
+from miniti.sample import setSamplesStatus
 import os
-from sklearn.naive_bayes import GaussianNB
 import sys
 
 
@@ -22,138 +22,34 @@ import sys
 # FUNCTIONS
 #
 ########################################################################
-def checksum(path, algo="md5", chunk_size=8192):
-    """
-    Return checksum for the file.
-
-    :param path: Path to the file.
-    :type path: str
-    :param chunk_size: Size of chunks.
-    :type chunk_size: int
-    :return: Checksum for the file.
-    :rtype: str
-    """
-    hashsum = hashlib.new(algo)
-    with open(path, "rb") as reader:
-        chunk = reader.read(chunk_size)
-        while chunk:  # while chunk := reader.read(chunk_size):
-            hashsum.update(chunk)
-            chunk = reader.read(chunk_size)
-    return hashsum.hexdigest()
-
-
-def getModelBaseline(locus_models, std_dev_rate):
-    """
-    Return number of peaks for stable and unstable samples in model, the instability threshold and peak_height_cutoff used.
-
-    :param locus_models: Selected locus for each samples in model.
-    :type locus_models: list of Locus
-    :param std_dev_rate: A locus is tagged as unstable if the number of peaks is upper than models_avg_nb_peaks + std_dev_rate * models_std_dev_nb_peaks.
-    :type std_dev_rate: float
-    :return: Number of peaks for stable and unstable samples in model, the instability threshold and peak_height_cutoff used.
-    :rtype: dict
-    """
-    baseline = {
-        "scores": {Status.stable: [], Status.unstable: []},
-        "threshold": None,
-        "peak_height_cutoff": None
-    }
-    for curr_ref in locus_models:
-        if "model" in curr_ref.results:
-            baseline["peak_height_cutoff"] = curr_ref.results["model"].data["mSINGS"]["peak_height_cutoff"]
-            curr_status = curr_ref.results["model"].status
-            if curr_status in {Status.stable, Status.unstable}:
-                baseline["scores"][curr_status].append(
-                    curr_ref.results["model"].data["mSINGS"]["nb_peaks"]
-                )
-    baseline["threshold"] = MSINGSEval.getThresholdFromNbPeaks(
-        baseline["scores"][Status.stable],
-        std_dev_rate
-    )
-    return baseline
-
-
-def getScore(nb_peaks, baseline_locus, status):
-    """
-    Return prediction confidence score.
-
-    :param nb_peaks: Number of peaks for locus in sample.
-    :type nb_peaks: float
-    :param baseline_locus: Number of peaks for stable and unstable samples in model, the instability threshold and peak_height_cutoff used.
-    :type baseline_locus: dict
-    :param status: Predicted status for locus.
-    :type status: anacore.msi.base.Status
-    :return: Prediction confidence score.
-    :rtype: dict
-    """
-    scores = [[score] for score in baseline_locus["scores"][Status.stable]]
-    scores += [[score] for score in baseline_locus["scores"][Status.unstable]]
-    labels = [Status.stable for score in baseline_locus["scores"][Status.stable]]
-    labels += [Status.unstable for score in baseline_locus["scores"][Status.unstable]]
-    clf = GaussianNB()
-    clf.fit(scores, labels)
-    spl_proba = clf.predict_proba([[nb_peaks]])[0]
-    idx_by_cls = {cls: idx for idx, cls in enumerate(clf.classes_)}
-    return spl_proba[idx_by_cls[status]]
-
-
-def getStatus(nb_peaks, baseline_locus):
-    """
-    Return predicted status.
-
-    :param nb_peaks: Number of peaks for locus in sample.
-    :type nb_peaks: float
-    :param baseline_locus: Number of peaks for stable and unstable samples in model, the instability threshold and peak_height_cutoff used.
-    :type baseline_locus: dict
-    :return: Predicted status.
-    :rtype: anacore.msi.base.Status
-    """
-    if nb_peaks > baseline_locus["threshold"]:
-        status = Status.unstable
-    else:
-        status = Status.stable
-    return status
-
-
-def process(args):
+def process(args, metrics):
     """
     Predict stability classes and scores for loci and samples using mSINGS v4.0 like algorithm.
 
     :param args: The namespace extracted from the script arguments.
     :type args: Namespace
+    :param metrics: The metrics of the script.
+    :type metrics: miniti.metrics.ScriptMetrics
     """
-    eval_list = ReportIO.parse(args.input_evaluated)
+    with metrics.stage("parse") as stage:
+        eval_list = parseReport(args.input_evaluated)
+        stage["nb_items"] = len(eval_list)
+    with metrics.stage("checksum"):
+        model_md5 = getModelChecksum(args.input_model)
     # Classify loci
-    models = ReportIO.parse(args.input_model)
-    model_baseline = dict()
-    for curr_spl in eval_list:
-        for locus_id, locus in curr_spl.loci.items():
-            # Model
-            if locus.position not in model_baseline:
-                model_baseline[locus.position] = getModelBaseline(
-                    [curr_model.loci[locus.position] for curr_model in models if locus.position in curr_model.loci],
-                    args.std_dev_rate
-                )
-            baseline_locus = model_baseline[locus.position]
-            # Classify
-            locus_data = locus.results[args.data_method].data
-            if args.data_method != args.status_method:  # Data come from another method
-                locus_data = {"lengths": locus_data["lengths"]}
-            locus_res = LocusRes(Status.undetermined, None, locus_data)
-            if locus_data["lengths"].getCount() >= args.min_depth:
-                locus_data["nb_peaks"] = MSINGSEval.getNbPeaks(locus_data["lengths"], baseline_locus["peak_height_cutoff"])
-                locus_res.status = getStatus(locus_data["nb_peaks"], baseline_locus)
-                locus_res.score = round(
-                    getScore(locus_data["nb_peaks"], baseline_locus, locus_res.status),
-                    6
-                )
-            locus.results[args.status_method] = locus_res
-        # Classify sample
-        curr_spl.setStatusByInstabilityRatio(args.status_method, args.min_voting_loci, args.instability_ratio)
-        curr_spl.setScore(args.status_method, args.undetermined_weight, args.locus_weight_is_score)
-        curr_spl.results[args.status_method].param["model_md5"] = checksum(args.input_model)
+    with metrics.stage("baselines"):
+        baselines = loadBaselines(args.input_baselines, model_md5) if args.input_baselines else None
+    with metrics.stage("loci", sum(len(spl.loci) for spl in eval_list)):
+        setLociStatus(eval_list, args.input_model, args.data_method, args.status_method, args.min_depth, args.std_dev_rate, baselines)
+    # Classify samples
+    with metrics.stage("samples", len(eval_list)):
+        setSamplesStatus(
+            eval_list, args.status_method, args.min_voting_loci, args.instability_ratio,
+            args.undetermined_weight, args.locus_weight_is_score, model_md5
+        )
     # Write output
-    ReportIO.write(eval_list, args.output_report)
+    with metrics.stage("write", 1):
+        writeSamples(eval_list, args.output_report)
 
 
 ########################################################################
@@ -177,9 +73,10 @@ if __name__ == "__main__":
     group_score.add_argument('-w', '--undetermined-weight', default=0, type=float, help='The weight of the undetermined loci in sample score calculation. [Default: %(default)s]')
     group_input = parser.add_argument_group('Inputs')  # Inputs
     group_input.add_argument('-e', '--input-evaluated', required=True, help='Path to the file containing the samples with loci to classify (format: MSIReport).')
-    group_input.add_argument('-r', '--input-model', required=True, help='Path to the file containing the references samples used in learn step (format: MSIReport).')
+    group_input.add_argument('-r', '--input-model', required=True, help='Path to the file containing the references samples used in learn step (format: MSIReport or binary model folder).')
+    group_input.add_argument('-b', '--input-baselines', help='Path to the baselines computed from model in learn step (format: JSON). With this file the model samples are read only for the loci missing in baselines. A file produced from another model is ignored.')
     group_output = parser.add_argument_group('Outputs')  # Outputs
-    group_output.add_argument('-o', '--output-report', required=True, help='The path to the output file (format: MSIReport).')
+    group_output.add_argument('-o', '--output-report', required=True, help='The path to the output file. It is compressed with gzip if it ends with ".gz" and with zstd if it ends with ".zst" (format: MSIReport).')
     args = parser.parse_args()
 
     # Logger
@@ -189,5 +86,7 @@ if __name__ == "__main__":
     log.info("Command: " + " ".join(sys.argv))
 
     # Process
-    process(args)
+    metrics = ScriptMetrics(os.path.basename(__file__))
+    process(args, metrics)
+    metrics.write(args.output_report)
     log.info("End of job")
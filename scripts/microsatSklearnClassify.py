@@ -3,21 +3,17 @@
 __author__ = 'Frederic Escudie'
 __copyright__ = 'Copyright (C) 2018 CHU Toulouse'
 __license__ = 'GNU General Public License'
-__version__ = '3.1.0'
+__version__ = '3.7.1'
 
-from anacore.msi.base import LocusClassifier, Status
-from anacore.msi.locus import LocusRes
-from anacore.msi.reportIO import ReportIO
 import argparse
-import hashlib
 import json
 import logging
+from miniti.metrics import ScriptMetrics
+from miniti.model import getModelChecksum
+from miniti.reportIO import getEvaluatedPaths, parseReports, writeReports
+from miniti.sample import setSamplesStatus
+from miniti.sklearnClassifier import setLociStatus
 import os
-from sklearn.tree import DecisionTreeClassifier as DecisionTree
-from sklearn.neighbors import KNeighborsClassifier as KNeighbors
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier as RandomForest
-from sklearn.svm import SVC
 import sys
 
 
@@ -26,26 +22,6 @@ import sys
 # FUNCTIONS
 #
 ########################################################################
-def checksum(path, algo="md5", chunk_size=8192):
-    """
-    Return checksum for the file.
-
-    :param path: Path to the file.
-    :type path: str
-    :param chunk_size: Size of chunks.
-    :type chunk_size: int
-    :return: Checksum for the file.
-    :rtype: str
-    """
-    hashsum = hashlib.new(algo)
-    with open(path, "rb") as reader:
-        chunk = reader.read(chunk_size)
-        while chunk:  # while chunk := reader.read(chunk_size):
-            hashsum.update(chunk)
-            chunk = reader.read(chunk_size)
-    return hashsum.hexdigest()
-
-
 class ClassifierParamsAction(argparse.Action):
     """Manages classifier-params parameters."""
 
@@ -53,69 +29,41 @@ class ClassifierParamsAction(argparse.Action):
         setattr(namespace, self.dest, json.loads(values))
 
 
-class SklearnClassifier(LocusClassifier):
-    def __init__(self, locus_id, method_name="MIAmS", model_method_name="model", clf="SVC", clf_params=None):
-        if clf_params is None:
-            clf_params = {}
-        clf_obj = self._getClassifier(clf, clf_params)
-        super().__init__(locus_id, method_name, clf_obj, model_method_name)
-
-    def _getClassifier(self, clf, clf_params):
-        clf_obj = None
-        if clf == "SVC":  # The argument "probability" must be set to True to use predict_proba()
-            clf_params["probability"] = True
-            clf_params["gamma"] = "auto"
-            clf_obj = SVC(**clf_params)
-        elif clf == "KNeighbors":  # The KNeighbors does not accept the argument "random_state"
-            if "n_neighbors" in clf_params:
-                clf_params["n_neighbors"] = 2
-            if "random_state" in clf_params:
-                del clf_params["random_state"]
-            clf_obj = KNeighbors(**clf_params)
-        else:
-            try:
-                clf_obj = globals()[clf](**clf_params)
-            except Exception:
-                raise Exception('The classifier "{}" is not implemented in MIAmSClassifier.'.format(clf))
-        return clf_obj
-
-
-def process(args):
+def process(args, metrics):
     """
-    Predict classification (status and score) for all samples loci.
+    Predict classification (status and score) for all samples loci. The model is parsed and each locus classifier is fitted only once for all evaluated reports.
 
     :param args: The namespace extracted from the script arguments.
     :type args: Namespace
+    :param metrics: The metrics of the script.
+    :type metrics: miniti.metrics.ScriptMetrics
+    :return: Paths to the written outputs.
+    :rtype: list
     """
-    train_dataset = ReportIO.parse(args.input_model)
-    test_dataset = ReportIO.parse(args.input_evaluated)
+    with metrics.stage("checksum"):
+        model_md5 = getModelChecksum(args.input_model)
+    with metrics.stage("parse") as stage:
+        evaluated_paths = getEvaluatedPaths(args.inputs_evaluated)
+        test_dataset_by_path = parseReports(evaluated_paths)
+        test_dataset = [spl for dataset in test_dataset_by_path.values() for spl in dataset]
+        stage["nb_items"] = len(test_dataset)
     # Classification by locus
-    loci_ids = sorted(train_dataset[0].loci.keys())
-    for locus_id in loci_ids:
-        # Select the samples with a sufficient number of fragment to classify distribution
-        evaluated_test_dataset = []
-        for spl in test_dataset:
-            locus = spl.loci[locus_id]
-            locus_data = locus.results[args.data_method].data
-            if args.data_method != args.status_method:  # Data come from another method
-                locus_data = {"lengths": locus_data["lengths"]}
-            locus.results[args.status_method] = LocusRes(
-                Status.undetermined, None, locus_data
-            )
-            if locus_data["lengths"].getCount() >= args.min_depth:
-                evaluated_test_dataset.append(spl)
-        # Classify
-        if len(evaluated_test_dataset) != 0:
-            clf = SklearnClassifier(locus_id, args.status_method, "model", args.classifier, args.classifier_params)
-            clf.fit(train_dataset)
-            clf.set_status(evaluated_test_dataset)
+    with metrics.stage("sklearn_loci", sum(len(spl.loci) for spl in test_dataset)):
+        setLociStatus(
+            test_dataset, args.input_model, model_md5, args.data_method, args.status_method, args.min_depth,
+            args.classifier, args.classifier_params, args.random_seed, args.input_estimators, args.threads
+        )
     # Classification by sample
-    for spl in test_dataset:
-        spl.setStatusByInstabilityRatio(args.status_method, args.min_voting_loci, args.instability_ratio)
-        spl.setScore(args.status_method, args.undetermined_weight, args.locus_weight_is_score)
-        spl.results[args.status_method].param["model_md5"] = checksum(args.input_model)
+    with metrics.stage("samples", len(test_dataset)):
+        setSamplesStatus(
+            test_dataset, args.status_method, args.min_voting_loci, args.instability_ratio,
+            args.undetermined_weight, args.locus_weight_is_score, model_md5
+        )
     # Write output
-    ReportIO.write(test_dataset, args.output_report)
+    with metrics.stage("write") as stage:
+        written_paths = writeReports(test_dataset_by_path, args.outputs_report, args.output_pattern)
+        stage["nb_items"] = len(written_paths)
+    return written_paths
 
 
 ########################################################################
@@ -128,6 +76,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Predict stability classes and scores for loci and samples using an sklearn classifer.')
     parser.add_argument('--data-method', help='The name of the method storing locus metrics and where the status will be set. [Default: classifier name]')
     parser.add_argument('--status-method', help='The name of the method storing locus metrics and where the status will be set. [Default: classifier name]')
+    parser.add_argument('--threads', default=1, type=int, help='Number of processes used to fit and predict sklearn classifiers of loci. [Default: %(default)s]')
     parser.add_argument('-v', '--version', action='version', version=__version__)
     group_locus = parser.add_argument_group('Locus classifier')  # Locus status
     group_locus.add_argument('-k', '--classifier', default="SVC", choices=["DecisionTree", "KNeighbors", "LogisticRegression", "RandomForest", "SVC"], help='The classifier used to predict loci status.')
@@ -141,10 +90,13 @@ if __name__ == "__main__":
     group_score.add_argument('-w', '--undetermined-weight', default=0, type=float, help='The weight of the undetermined loci in sample score calculation. [Default: %(default)s]')
     group_score.add_argument('-d', '--locus-weight-is-score', action='store_true', help='Use the prediction score of each locus as wheight of this locus in sample prediction score calculation. [Default: %(default)s]')
     group_input = parser.add_argument_group('Inputs')  # Inputs
-    group_input.add_argument('-r', '--input-model', required=True, help='Path to the file containing the references samples used in learn step (format: MSIReport).')
-    group_input.add_argument('-e', '--input-evaluated', required=True, help='Path to the file containing the samples with loci to classify (format: MSIReport).')
+    group_input.add_argument('-r', '--input-model', required=True, help='Path to the file containing the references samples used in learn step (format: MSIReport or binary model folder).')
+    group_input.add_argument('-e', '--inputs-evaluated', '--input-evaluated', dest="inputs_evaluated", required=True, nargs='+', help='Paths to the files containing the samples with loci to classify or to folders containing these files (format: MSIReport).')
+    group_input.add_argument('-t', '--input-estimators', help='Path to the classifiers pre-fitted on model in learn step (format: pickle). Classifiers missing in this file or a file produced from another model lead to fit classifiers on model.')
     group_output = parser.add_argument_group('Outputs')  # Outputs
-    group_output.add_argument('-o', '--output-report', required=True, help='The path to the output file (format: MSIReport).')
+    group_output_ex = group_output.add_mutually_exclusive_group(required=True)
+    group_output_ex.add_argument('-o', '--outputs-report', '--output-report', dest="outputs_report", nargs='+', help='The paths to the output files, one by evaluated report and in the same order. Outputs ending with ".gz" are compressed with gzip and those ending with ".zst" with zstd (format: MSIReport).')
+    group_output_ex.add_argument('-n', '--output-pattern', help='The path pattern to the output files with one file by sample. The tag "{sample}" is replaced by the sample name (format: MSIReport). Example: classif/{sample}_classif.json.')
     args = parser.parse_args()
 
     args.classifier_params["random_state"] = args.random_seed
@@ -160,5 +112,7 @@ if __name__ == "__main__":
     log.info("Command: " + " ".join(sys.argv))
 
     # Process
-    process(args)
+    metrics = ScriptMetrics(os.path.basename(__file__))
+    written_paths = process(args, metrics)
+    metrics.write(written_paths[0])
     log.info("End of job")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.2.1'
+
+import argparse
+import json
+import logging
+from miniti.metrics import ScriptMetrics
+from miniti.model import getModelChecksum, getModelLociIds
+from miniti.sklearnClassifier import fitClassifiers, getEstimatorKey, writeEstimators
+import os
+import sys
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+class ClassifierParamsAction(argparse.Action):
+    """Manages classifier-params parameters."""
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        setattr(namespace, self.dest, json.loads(values))
+
+
+def process(args, log, metrics):
+    """
+    Fit one sklearn classifier by locus on model and write them.
+
+    :param args: The namespace extracted from the script arguments.
+    :type args: Namespace
+    :param log: Logger of the script.
+    :type log: logging.Logger
+    :param metrics: The metrics of the script.
+    :type metrics: miniti.metrics.ScriptMetrics
+    """
+    loci_ids = getModelLociIds(args.input_model)
+    with metrics.stage("fit", len(loci_ids)):
+        clf_by_locus = fitClassifiers(args.input_model, loci_ids, args.classifier, args.classifier_params, args.threads)
+    classifier_by_key = dict()
+    for locus_id in loci_ids:
+        if locus_id not in clf_by_locus:
+            log.warning("Locus {} has no sample with known status and reads/fragments in model, classifier cannot be fitted.".format(locus_id))
+        else:
+            estimator_key = getEstimatorKey(locus_id, args.classifier, args.classifier_params, args.random_seed)
+            classifier_by_key[estimator_key] = clf_by_locus[locus_id]
+    with metrics.stage("checksum"):
+        model_md5 = getModelChecksum(args.input_model)
+    with metrics.stage("write", len(classifier_by_key)):
+        writeEstimators(args.output_estimators, classifier_by_key, loci_ids, model_md5)
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    # Manage parameters
+    parser = argparse.ArgumentParser(description='Fit on model the sklearn classifier used to predict stability of each locus.')
+    parser.add_argument('--threads', default=1, type=int, help='Number of processes used to fit loci. [Default: %(default)s]')
+    parser.add_argument('-v', '--version', action='version', version=__version__)
+    group_locus = parser.add_argument_group('Locus classifier')  # Locus status
+    group_locus.add_argument('-k', '--classifier', default="SVC", choices=["DecisionTree", "KNeighbors", "LogisticRegression", "RandomForest", "SVC"], help='The classifier used to predict loci status.')
+    group_locus.add_argument('-p', '--classifier-params', action=ClassifierParamsAction, default={}, help='By default the classifier is used with these default parameters defined in scikit-learn. If you want change these parameters you use this option to provide them as json string. Example: {"n_estimators": 1000, "criterion": "entropy"} for RandmForest.')
+    group_locus.add_argument('-s', '--random-seed', default=None, type=int, help='The seed used by the random number generator in the classifier. It must be the same as in tag step to use these classifiers.')
+    group_input = parser.add_argument_group('Inputs')  # Inputs
+    group_input.add_argument('-r', '--input-model', required=True, help='Path to the file containing the references samples used in learn step (format: MSIReport or binary model folder).')
+    group_output = parser.add_argument_group('Outputs')  # Outputs
+    group_output.add_argument('-o', '--output-estimators', required=True, help='The path to the output file containing the fitted classifiers (format: pickle).')
+    args = parser.parse_args()
+
+    args.classifier_params["random_state"] = args.random_seed
+
+    # Logger
+    logging.basicConfig(format='%(asctime)s -- [%(filename)s][pid:%(process)d][%(levelname)s] -- %(message)s')
+    log = logging.getLogger(os.path.basename(__file__))
+    log.setLevel(logging.INFO)
+    log.info("Command: " + " ".join(sys.argv))
+
+    # Process
+    metrics = ScriptMetrics(os.path.basename(__file__))
+    process(args, log, metrics)
+    metrics.write(args.output_estimators)
+    log.info("End of job")
@@ -0,0 +1,256 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.3.0'
+
+from anacore.msi.base import Status
+import json
+import logging
+import numpy as np
+import os
+
+
+def fitGaussianNB(scores_by_status):
+    """
+    Return parameters of the gaussian naive Bayes classifier fitted on scores of stable and unstable samples in model.
+
+    :param scores_by_status: Scores of the samples in model by status (stable and unstable).
+    :type scores_by_status: dict
+    :return: Classes, number of samples, mean and variance by class, prior probability of each class and variance smoothing added to variances. None if the model does not contain any sample with known status.
+    :rtype: dict
+    """
+    from sklearn.naive_bayes import GaussianNB  # Not loaded by the scripts only reading baselines
+    scores = [[score] for score in scores_by_status[Status.stable]]
+    scores += [[score] for score in scores_by_status[Status.unstable]]
+    if len(scores) == 0:
+        return None
+    labels = [Status.stable for score in scores_by_status[Status.stable]]
+    labels += [Status.unstable for score in scores_by_status[Status.unstable]]
+    clf = GaussianNB()
+    clf.fit(scores, labels)
+    return {
+        "classes": [str(cls) for cls in clf.classes_],
+        "class_count": [int(count) for count in clf.class_count_],
+        "theta": [float(cls_theta[0]) for cls_theta in clf.theta_],
+        "var": [float(cls_var[0]) for cls_var in clf.var_],
+        "class_prior": [float(prior) for prior in clf.class_prior_],
+        "epsilon": float(clf.epsilon_)
+    }
+
+
+def getScoresStats(scores):
+    """
+    Return sufficient statistics of scores: their number, their mean and the sum of their squared deviations from the mean. The values are computed as in numpy.var() so the standard deviations derived from them are identical to numpy.std() on the scores.
+
+    :param scores: The scores.
+    :type scores: list of float
+    :return: Number of scores (key: "count"), mean (key: "mean") and sum of squared deviations (key: "m2").
+    :rtype: dict
+    """
+    values = np.asarray(scores, dtype=float)
+    if len(values) == 0:
+        return {"count": 0, "mean": 0.0, "m2": 0.0}
+    mean = np.mean(values)
+    return {"count": len(values), "mean": float(mean), "m2": float(np.sum((values - mean) ** 2))}
+
+
+def getScoresStd(stats, ddof=0):
+    """
+    Return standard deviation of scores from their sufficient statistics (see getScoresStats()).
+
+    :param stats: Sufficient statistics of the scores.
+    :type stats: dict
+    :param ddof: Delta degrees of freedom: the divisor used in calculation is count - ddof.
+    :type ddof: int
+    :return: Standard deviation. NaN if count - ddof is lower than 1 (as numpy.std()).
+    :rtype: float
+    """
+    if stats["count"] - ddof < 1:
+        return float("nan")
+    return float(np.sqrt(stats["m2"] / (stats["count"] - ddof)))
+
+
+def getStatusProba(scores, statuses, gaussian_nbs):
+    """
+    Return for each score the posterior probability of the status. All the scores are processed in one batch with the computation used by GaussianNB.predict_proba() applied on parameters returned by fitGaussianNB().
+
+    :param scores: Score for each locus of each sample.
+    :type scores: list of float
+    :param statuses: Predicted status for each score.
+    :type statuses: list of anacore.msi.base.Status
+    :param gaussian_nbs: Parameters of the gaussian naive Bayes classifier (see fitGaussianNB()) for each score. The same object is shared by scores of the same locus.
+    :type gaussian_nbs: list of dict
+    :return: Probability of the status for each score.
+    :rtype: numpy.ndarray
+    """
+    classes = [Status.stable, Status.unstable]
+    # Parameters by row: one by distinct locus parameters
+    row_by_params_id = dict()
+    params_rows = list()
+    for gaussian_nb in gaussian_nbs:
+        if id(gaussian_nb) not in row_by_params_id:
+            if gaussian_nb is None:
+                raise Exception("The model does not contain any sample with known status for this locus.")
+            row_by_params_id[id(gaussian_nb)] = len(params_rows)
+            params_rows.append(gaussian_nb)
+    theta = np.zeros((len(params_rows), len(classes)))
+    var = np.ones((len(params_rows), len(classes)))
+    log_prior = np.full((len(params_rows), len(classes)), -np.inf)  # Class missing in model has no probability
+    for row_idx, gaussian_nb in enumerate(params_rows):
+        for cls, cls_theta, cls_var, cls_prior in zip(gaussian_nb["classes"], gaussian_nb["theta"], gaussian_nb["var"], gaussian_nb["class_prior"]):
+            col_idx = classes.index(cls)
+            theta[row_idx, col_idx] = cls_theta
+            var[row_idx, col_idx] = cls_var
+            log_prior[row_idx, col_idx] = np.log(cls_prior)
+    # Posterior
+    rows_idx = np.array([row_by_params_id[id(gaussian_nb)] for gaussian_nb in gaussian_nbs], dtype=int)
+    values = np.asarray(scores, dtype=float)[:, np.newaxis]
+    joint_log_likelihood = log_prior[rows_idx] + (
+        -0.5 * np.log(2.0 * np.pi * var[rows_idx]) - 0.5 * ((values - theta[rows_idx]) ** 2) / var[rows_idx]
+    )
+    max_jll = np.max(joint_log_likelihood, axis=1, keepdims=True)
+    log_prob_x = max_jll + np.log(np.sum(np.exp(joint_log_likelihood - max_jll), axis=1, keepdims=True))
+    proba = np.exp(joint_log_likelihood - log_prob_x)
+    statuses_idx = np.array([classes.index(status) for status in statuses], dtype=int)
+    return proba[np.arange(len(scores)), statuses_idx]
+
+
+def loadBaselines(path, model_md5):
+    """
+    Return baselines by locus from baselines file. If the file has been produced from another model, no baseline is returned.
+
+    :param path: Path to the baselines file (format: JSON).
+    :type path: str
+    :param model_md5: Checksum of the model currently used.
+    :type model_md5: str
+    :return: By locus position the baseline of each method (keys: "mSINGS" and "MSIsensor-pro") and the stable peaks (key: "stable_peaks", missing in files produced before this key). None if the file is missing or does not correspond to the model.
+    :rtype: dict
+    """
+    log = logging.getLogger(__name__)
+    if path is None or not os.path.exists(path):
+        log.warning("Baselines file is missing, baselines will be computed from model.")
+        return None
+    with open(path) as reader:
+        content = json.load(reader)
+    if content["model_md5"] != model_md5:
+        log.warning(
+            "Baselines file {} has been produced from another model (md5 {} vs {}), baselines will be computed from model.".format(
+                path, content["model_md5"], model_md5
+            )
+        )
+        return None
+    return content["loci"]
+
+
+def mergeScoresStats(stats, new_scores):
+    """
+    Return sufficient statistics of scores updated with new scores (Chan et al.).
+
+    :param stats: Sufficient statistics of the previous scores (see getScoresStats()).
+    :type stats: dict
+    :param new_scores: The new scores.
+    :type new_scores: list of float
+    :return: Sufficient statistics of all the scores.
+    :rtype: dict
+    """
+    new_stats = getScoresStats(new_scores)
+    if stats["count"] == 0:
+        return new_stats
+    if new_stats["count"] == 0:
+        return dict(stats)
+    nb_total = stats["count"] + new_stats["count"]
+    delta = new_stats["mean"] - stats["mean"]
+    return {
+        "count": nb_total,
+        "mean": stats["mean"] + delta * new_stats["count"] / nb_total,
+        "m2": stats["m2"] + new_stats["m2"] + delta ** 2 * stats["count"] * new_stats["count"] / nb_total
+    }
+
+
+def setScores(locus_results, scores, gaussian_nbs):
+    """
+    Set prediction confidence score for each locus result from its score in classifier and the gaussian naive Bayes parameters of the locus. The status of each result must already be set.
+
+    :param locus_results: Results of evaluated loci.
+    :type locus_results: list of anacore.msi.locus.LocusRes
+    :param scores: Score in classifier (number of peaks, pro_p, ...) for each locus result.
+    :type scores: list of float
+    :param gaussian_nbs: Parameters of the gaussian naive Bayes classifier (see fitGaussianNB()) for each locus result.
+    :type gaussian_nbs: list of dict
+    """
+    if len(locus_results) != 0:
+        status_proba = getStatusProba(scores, [locus_res.status for locus_res in locus_results], gaussian_nbs)
+        for locus_res, proba in zip(locus_results, status_proba):
+            locus_res.score = round(float(proba), 6)
+
+
+def updateGaussianNB(gaussian_nb, new_scores_by_status):
+    """
+    Return parameters of the gaussian naive Bayes classifier updated with the scores of new samples. Like in GaussianNB.partial_fit(), means and variances of each class are updated from their previous values and from the new scores only, and the variance smoothing of the first fit is kept.
+
+    :param gaussian_nb: Parameters fitted on the samples already in model (see fitGaussianNB()).
+    :type gaussian_nb: dict
+    :param new_scores_by_status: Scores of the new samples by status (stable and unstable).
+    :type new_scores_by_status: dict
+    :return: Classes, number of samples, mean and variance by class, prior probability of each class and variance smoothing added to variances. None if the model does not contain any sample with known status.
+    :rtype: dict
+    """
+    if gaussian_nb is None:
+        return fitGaussianNB(new_scores_by_status)
+    epsilon = gaussian_nb["epsilon"]
+    stats_by_cls = {
+        cls: {"count": cls_count, "mean": cls_theta, "m2": (cls_var - epsilon) * cls_count}
+        for cls, cls_count, cls_theta, cls_var in zip(gaussian_nb["classes"], gaussian_nb["class_count"], gaussian_nb["theta"], gaussian_nb["var"])
+    }
+    for status in [Status.stable, Status.unstable]:
+        if len(new_scores_by_status[status]) != 0:
+            past_stats = stats_by_cls.get(str(status), getScoresStats([]))
+            stats_by_cls[str(status)] = mergeScoresStats(past_stats, new_scores_by_status[status])
+    classes = sorted(stats_by_cls)
+    nb_samples = sum(stats_by_cls[cls]["count"] for cls in classes)
+    return {
+        "classes": classes,
+        "class_count": [stats_by_cls[cls]["count"] for cls in classes],
+        "theta": [float(stats_by_cls[cls]["mean"]) for cls in classes],
+        "var": [float(stats_by_cls[cls]["m2"] / stats_by_cls[cls]["count"] + epsilon) for cls in classes],
+        "class_prior": [stats_by_cls[cls]["count"] / nb_samples for cls in classes],
+        "epsilon": epsilon
+    }
+
+
+def upgradeGaussianNB(gaussian_nb, scores_by_status):
+    """
+    Add in place the number of samples by class and the variance smoothing in gaussian naive Bayes parameters stored in baselines produced before their storage.
+
+    :param gaussian_nb: Parameters of the gaussian naive Bayes classifier (see fitGaussianNB()).
+    :type gaussian_nb: dict
+    :param scores_by_status: Scores of the samples in model by status (stable and unstable) stored in these old baselines.
+    :type scores_by_status: dict
+    :return: The upgraded parameters.
+    :rtype: dict
+    """
+    if gaussian_nb is not None:
+        if "class_count" not in gaussian_nb:
+            gaussian_nb["class_count"] = [len(scores_by_status[cls]) for cls in gaussian_nb["classes"]]
+        if "epsilon" not in gaussian_nb:
+            gaussian_nb["epsilon"] = 1e-9 * float(np.var(scores_by_status[Status.stable] + scores_by_status[Status.unstable]))
+    return gaussian_nb
+
+
+def writeBaselines(path, baseline_by_locus, model_md5):
+    """
+    Write baselines file.
+
+    :param path: Path to the output file (format: JSON).
+    :type path: str
+    :param baseline_by_locus: By locus position the baseline of each method (keys: "mSINGS" and "MSIsensor-pro") and the stable peaks (key: "stable_peaks").
+    :type baseline_by_locus: dict
+    :param model_md5: Checksum of the model used to compute baselines.
+    :type model_md5: str
+    """
+    with open(path, "w") as writer:
+        json.dump(
+            {"loci": baseline_by_locus, "model_md5": model_md5},
+            writer,
+            sort_keys=True
+        )
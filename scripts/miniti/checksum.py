@@ -0,0 +1,98 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.2.0'
+
+import functools
+import hashlib
+import json
+import logging
+from miniti.compression import removeCompressionExt
+import os
+
+
+def checksum(path, algo="md5", chunk_size=8192):
+    """
+    Return checksum for the file.
+
+    :param path: Path to the file.
+    :type path: str
+    :param algo: Hash algorithm.
+    :type algo: str
+    :param chunk_size: Size of chunks.
+    :type chunk_size: int
+    :return: Checksum for the file.
+    :rtype: str
+    """
+    hashsum = hashlib.new(algo)
+    with open(path, "rb") as reader:
+        chunk = reader.read(chunk_size)
+        while chunk:  # while chunk := reader.read(chunk_size):
+            hashsum.update(chunk)
+            chunk = reader.read(chunk_size)
+    return hashsum.hexdigest()
+
+
+def checksumFromDigest(path, algo="md5"):
+    """
+    Return checksum for the file. The checksum is read from the digest file (see writeDigest()) when it exists and when the file has the same size and modification time as when the digest was written, otherwise it is computed. The result is memoized for the process by size and modification time of the file, so a file modified after a first call is read again.
+
+    :param path: Path to the file.
+    :type path: str
+    :param algo: Hash algorithm.
+    :type algo: str
+    :return: Checksum for the file.
+    :rtype: str
+    """
+    file_stat = os.stat(path)
+    return _checksumFromDigest(os.path.realpath(path), algo, file_stat.st_size, file_stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=None)
+def _checksumFromDigest(path, algo, size, mtime_ns):
+    digest_path = getDigestPath(path)
+    if os.path.exists(digest_path):
+        with open(digest_path) as reader:
+            digest = json.load(reader)
+        if digest["algo"] == algo and digest["size"] == size and digest["mtime_ns"] == mtime_ns:
+            return digest["checksum"]
+        log = logging.getLogger(__name__)
+        log.warning("Digest file {} does not correspond to {}, checksum will be computed.".format(digest_path, path))
+    return checksum(path, algo)
+
+
+def getDigestPath(path):
+    """
+    Return path to the digest file of the file (example: microsatModel_digest.json for microsatModel.json or microsatModel.json.gz).
+
+    :param path: Path to the file.
+    :type path: str
+    :return: Path to the digest file.
+    :rtype: str
+    """
+    return os.path.splitext(removeCompressionExt(path))[0] + "_digest.json"
+
+
+def writeDigest(path, digest_path=None, algo="md5"):
+    """
+    Write digest file containing checksum, size and modification time of the file.
+
+    :param path: Path to the file.
+    :type path: str
+    :param digest_path: Path to the output file (format: JSON). By default: see getDigestPath().
+    :type digest_path: str
+    :param algo: Hash algorithm.
+    :type algo: str
+    """
+    digest_path = getDigestPath(path) if digest_path is None else digest_path
+    file_stat = os.stat(path)
+    with open(digest_path, "w") as writer:
+        json.dump(
+            {
+                "algo": algo,
+                "checksum": checksum(path, algo),
+                "mtime_ns": file_stat.st_mtime_ns,
+                "size": file_stat.st_size
+            },
+            writer
+        )
@@ -0,0 +1,147 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.1.0'
+
+import gzip
+import json
+import mmap
+import shutil
+import tempfile
+
+
+COMPRESSION_BY_EXT = {".gz": "gzip", ".zst": "zstd"}
+COMPRESSION_MAGIC = {"gzip": b"\x1f\x8b", "zstd": b"\x28\xb5\x2f\xfd"}
+
+
+def _getZstdModule(path):
+    """
+    Return module used to read and write zstd files: compression.zstd (Python >= 3.14) or zstandard.
+
+    :param path: Path to the processed file (used in error message).
+    :type path: str
+    :return: The module providing the function open().
+    :rtype: module
+    """
+    try:
+        from compression import zstd
+    except ImportError:
+        try:
+            import zstandard as zstd
+        except ImportError:
+            raise Exception("The file {} is compressed with zstd: Python >= 3.14 or the package zstandard is required to process it.".format(path))
+    return zstd
+
+
+def dumpJSON(data, path):
+    """
+    Write data in JSON file. The file is compressed according to its extension (see getCompressionFromName()).
+
+    :param data: The data.
+    :type data: *
+    :param path: Path to the output file.
+    :type path: str
+    """
+    with openFile(path, "w") as writer:
+        json.dump(data, writer)
+
+
+def getCompression(path):
+    """
+    Return compression of the existing file detected from its first bytes.
+
+    :param path: Path to the file.
+    :type path: str
+    :return: "gzip", "zstd" or None for an uncompressed file.
+    :rtype: str
+    """
+    with open(path, "rb") as reader:
+        magic = reader.read(4)
+    for compression, compression_magic in COMPRESSION_MAGIC.items():
+        if magic.startswith(compression_magic):
+            return compression
+    return None
+
+
+def getCompressionFromName(path):
+    """
+    Return compression of the file from its extension (".gz" for gzip and ".zst" for zstd).
+
+    :param path: Path to the file.
+    :type path: str
+    :return: "gzip", "zstd" or None for an uncompressed file.
+    :rtype: str
+    """
+    for extension, compression in COMPRESSION_BY_EXT.items():
+        if path.endswith(extension):
+            return compression
+    return None
+
+
+def getContent(path):
+    """
+    Return content of the file for random access. The file is memory-mapped. A compressed file is first decompressed by chunks in an anonymous temporary file, so its content is never entirely loaded in memory.
+
+    :param path: Path to the file.
+    :type path: str
+    :return: The content.
+    :rtype: mmap.mmap
+    """
+    if getCompression(path) is None:
+        with open(path, "rb") as reader:
+            return mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ)
+    with tempfile.TemporaryFile() as tmp_file:  # Removed on close, the mapping keeps its content
+        with openFile(path, "rb") as reader:
+            shutil.copyfileobj(reader, tmp_file, 1024 * 1024)
+        tmp_file.flush()
+        return mmap.mmap(tmp_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def loadJSON(path):
+    """
+    Return data from JSON file. The compression is detected from the file content (see getCompression()).
+
+    :param path: Path to the file.
+    :type path: str
+    :return: The data.
+    :rtype: *
+    """
+    with openFile(path) as reader:
+        return json.load(reader)
+
+
+def openFile(path, mode="r"):
+    """
+    Return handle on file. In read mode the compression is detected from the file content (see getCompression()), in write mode it depends on the file extension (see getCompressionFromName()).
+
+    :param path: Path to the file.
+    :type path: str
+    :param mode: Mode "r", "rb", "w" or "wb". Text modes use UTF-8.
+    :type mode: str
+    :return: The file handle.
+    :rtype: file object
+    """
+    compression = getCompression(path) if mode.startswith("r") else getCompressionFromName(path)
+    if compression is None:
+        return open(path, mode)
+    is_text = "b" not in mode
+    mode = mode.rstrip("bt") + ("t" if is_text else "b")
+    encoding = "utf-8" if is_text else None
+    if compression == "gzip":
+        return gzip.open(path, mode, compresslevel=6, encoding=encoding)  # Level 6 is almost as efficient as 9 on reports and much faster
+    return _getZstdModule(path).open(path, mode, encoding=encoding)
+
+
+def removeCompressionExt(path):
+    """
+    Return path without its compression extension (example: splA.json for splA.json.gz).
+
+    :param path: Path to the file.
+    :type path: str
+    :return: Path without compression extension.
+    :rtype: str
+    """
+    for extension in COMPRESSION_BY_EXT:
+        if path.endswith(extension):
+            return path[:-len(extension)]
+    return path
@@ -0,0 +1,199 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.4.2'
+
+from miniti.baseline import loadBaselines
+from miniti.metrics import getStage
+from miniti.model import closeModel, getLocusModelResults, getModelChecksum, getModelLociIds, getModelStablePeaks
+import miniti.msings as msings
+import miniti.msisensorpro as msisensorpro
+from miniti.reportIO import getEvaluatedPaths, parseReports, writeReports
+from miniti.sample import setSamplesStatus
+import miniti.sklearnClassifier as sklearnClassifier
+
+
+def getModelBaselines(model_path):
+    """
+    Return by locus the mSINGS and MSIsensor-pro baselines and the stable peaks computed from model.
+
+    :param model_path: Path to the file containing the references samples used in learn step (format: MSIReport or binary model folder).
+    :type model_path: str
+    :return: By locus position the baseline of each method (keys: "mSINGS" and "MSIsensor-pro") and the peaks of the stable samples (key: "stable_peaks", see miniti.model.getModelStablePeaks()).
+    :rtype: dict
+    """
+    baseline_by_locus = dict()
+    stable_peaks_by_locus = getModelStablePeaks(model_path)
+    for locus_id in getModelLociIds(model_path):
+        locus_models = getLocusModelResults(model_path, locus_id)
+        baseline_by_locus[locus_id] = {
+            "mSINGS": msings.getModelBaseline(locus_models),  # Threshold depends on std_dev_rate used in tag step
+            "MSIsensor-pro": msisensorpro.getModelBaseline(locus_models),
+            "stable_peaks": stable_peaks_by_locus[locus_id]  # Filter on support depends on min_support used in tag step
+        }
+    return baseline_by_locus
+
+
+def updateModelBaselines(baseline_by_locus, new_samples_path):
+    """
+    Update by locus the mSINGS and MSIsensor-pro baselines and the stable peaks with the samples appended to the model. Only the new samples are read.
+
+    :param baseline_by_locus: By locus position the baselines computed on the samples already in model (see getModelBaselines()). It is modified in place.
+    :type baseline_by_locus: dict
+    :param new_samples_path: Path to the file containing only the new references samples (format: MSIReport).
+    :type new_samples_path: str
+    :return: By locus position the updated baselines.
+    :rtype: dict
+    """
+    new_stable_peaks_by_locus = getModelStablePeaks(new_samples_path)
+    for locus_id in getModelLociIds(new_samples_path):
+        locus_models = getLocusModelResults(new_samples_path, locus_id)
+        if locus_id not in baseline_by_locus:
+            baseline_by_locus[locus_id] = {
+                "mSINGS": msings.getModelBaseline(locus_models),
+                "MSIsensor-pro": msisensorpro.getModelBaseline(locus_models),
+                "stable_peaks": new_stable_peaks_by_locus[locus_id]
+            }
+        else:
+            locus_baseline = baseline_by_locus[locus_id]
+            msings.updateModelBaseline(locus_baseline["mSINGS"], locus_models)
+            msisensorpro.updateModelBaseline(locus_baseline["MSIsensor-pro"], locus_models)
+            if "stable_peaks" in locus_baseline:  # Missing in baselines produced before storage of stable peaks
+                locus_baseline["stable_peaks"] = sorted(locus_baseline["stable_peaks"] + new_stable_peaks_by_locus[locus_id])
+    closeModel(new_samples_path)
+    return baseline_by_locus
+
+
+class ClassificationEngine:
+    """Predict stability classes and scores for loci and samples with mSINGS, MSIsensor-pro pro and sklearn classifier. The baselines and the fitted classifiers are kept between calls."""
+
+    def __init__(self, model_path, baselines_path=None, estimators_path=None, data_method="SVC", msings_method="mSINGSUp", msisensorpro_method="MSIsensor-pro_pro", sklearn_method="SVC", min_depth=60, std_dev_rate=2.0, clf="SVC", clf_params=None, random_seed=None, min_voting_loci=0.5, instability_ratio=0.2, undetermined_weight=0, locus_weight_is_score=False, threads=1):
+        """
+        Build and return an instance of ClassificationEngine.
+
+        :param model_path: Path to the file containing the references samples used in learn step (format: MSIReport or binary model folder).
+        :type model_path: str
+        :param baselines_path: Path to the baselines computed from model in learn step (format: JSON).
+        :type baselines_path: str
+        :param estimators_path: Path to the classifiers pre-fitted on model in learn step (format: pickle).
+        :type estimators_path: str
+        :param data_method: The name of the method storing locus metrics.
+        :type data_method: str
+        :param msings_method: The name of the method where the mSINGS status will be set.
+        :type msings_method: str
+        :param msisensorpro_method: The name of the method where the MSIsensor-pro status will be set.
+        :type msisensorpro_method: str
+        :param sklearn_method: The name of the method where the sklearn classifier status will be set.
+        :type sklearn_method: str
+        :param min_depth: The minimum numbers of reads or fragments to determine the status.
+        :type min_depth: int
+        :param std_dev_rate: [mSINGS] The locus is tagged as unstable if the number of peaks is upper than models_avg_nb_peaks + std_dev_rate * models_std_dev_nb_peaks.
+        :type std_dev_rate: float
+        :param clf: [sklearn] The classifier name.
+        :type clf: str
+        :param clf_params: [sklearn] The classifier parameters.
+        :type clf_params: dict
+        :param random_seed: [sklearn] The seed used by the random number generator in the classifier.
+        :type random_seed: int
+        :param min_voting_loci: Minimum number of voting loci (stable + unstable) to determine the sample status.
+        :type min_voting_loci: float
+        :param instability_ratio: If the ratio unstable/(stable + unstable) is superior than this value the status of the sample will be unstable otherwise it will be stable.
+        :type instability_ratio: float
+        :param undetermined_weight: The weight of the undetermined loci in sample score calculation.
+        :type undetermined_weight: float
+        :param locus_weight_is_score: Use the prediction score of each locus as wheight of this locus in sample prediction score calculation.
+        :type locus_weight_is_score: bool
+        :param threads: Number of processes used to fit and predict sklearn classifiers of loci.
+        :type threads: int
+        :return: The new instance.
+        :rtype: ClassificationEngine
+        """
+        self.clf = clf
+        self.clf_params = clf_params
+        self.data_method = data_method
+        self.instability_ratio = instability_ratio
+        self.locus_weight_is_score = locus_weight_is_score
+        self.min_depth = min_depth
+        self.min_voting_loci = min_voting_loci
+        self.model_path = model_path
+        self.msings_method = msings_method
+        self.msisensorpro_method = msisensorpro_method
+        self.random_seed = random_seed
+        self.sklearn_method = sklearn_method
+        self.std_dev_rate = std_dev_rate
+        self.threads = threads
+        self.undetermined_weight = undetermined_weight
+        # Model data kept between calls
+        self.model_md5 = getModelChecksum(model_path)
+        self.baselines = None
+        if baselines_path is not None:
+            self.baselines = loadBaselines(baselines_path, self.model_md5)
+        self.fitted_by_key = dict()
+        if estimators_path is not None:
+            self.fitted_by_key = sklearnClassifier.loadEstimators(estimators_path, self.model_md5)[0]
+
+    def classify(self, test_dataset, metrics=None):
+        """
+        Set loci and samples status and score for the three methods.
+
+        :param test_dataset: Evaluated samples.
+        :type test_dataset: list of anacore.msi.sample.MSISample
+        :param metrics: The metrics of the script where the stages are recorded.
+        :type metrics: miniti.metrics.ScriptMetrics
+        """
+        nb_loci = sum(len(spl.loci) for spl in test_dataset)
+        # Classify loci (sklearn must be the last: its status is stored in data method)
+        with getStage(metrics, "mSINGS_loci", nb_loci):
+            msings.setLociStatus(test_dataset, self.model_path, self.data_method, self.msings_method, self.min_depth, self.std_dev_rate, self.baselines)
+        with getStage(metrics, "MSIsensor-pro_loci", nb_loci):
+            msisensorpro.setLociStatus(test_dataset, self.model_path, self.data_method, self.msisensorpro_method, self.min_depth, self.baselines)
+        with getStage(metrics, "sklearn_loci", nb_loci):
+            sklearnClassifier.setLociStatus(
+                test_dataset, self.model_path, self.model_md5, self.data_method, self.sklearn_method, self.min_depth,
+                self.clf, self.clf_params, self.random_seed, None, self.threads, self.fitted_by_key
+            )
+        # Classify samples
+        with getStage(metrics, "samples", len(test_dataset)):
+            for method_name in [self.msings_method, self.msisensorpro_method, self.sklearn_method]:
+                setSamplesStatus(
+                    test_dataset, method_name, self.min_voting_loci, self.instability_ratio,
+                    self.undetermined_weight, self.locus_weight_is_score, self.model_md5
+                )
+
+    def classifyReports(self, inputs_evaluated, outputs_report=None, output_pattern=None, metrics=None):
+        """
+        Classify samples from evaluated reports and write the classified reports.
+
+        :param inputs_evaluated: Paths to the files containing the samples with loci to classify or to folders containing these files (format: MSIReport).
+        :type inputs_evaluated: list
+        :param outputs_report: Paths to the outputs, one by evaluated report and in the same order (format: MSIReport).
+        :type outputs_report: list
+        :param output_pattern: Path pattern to the outputs where the tag "{sample}" is replaced by the sample name (format: MSIReport).
+        :type output_pattern: str
+        :param metrics: The metrics of the script where the stages are recorded.
+        :type metrics: miniti.metrics.ScriptMetrics
+        :return: Paths to the written outputs.
+        :rtype: list
+        """
+        with getStage(metrics, "parse") as stage:
+            test_dataset_by_path = parseReports(getEvaluatedPaths(inputs_evaluated))
+            test_dataset = [spl for dataset in test_dataset_by_path.values() for spl in dataset]
+            stage["nb_items"] = len(test_dataset)
+        self.classify(test_dataset, metrics)
+        with getStage(metrics, "write") as stage:
+            written_paths = writeReports(test_dataset_by_path, outputs_report, output_pattern)
+            stage["nb_items"] = len(written_paths)
+        return written_paths
+
+    def warmUp(self):
+        """Compute the baselines and fit the sklearn classifiers missing for the loci of the model. Following calls to classify() do not read the model samples anymore: the model reader is closed."""
+        if self.baselines is None:
+            self.baselines = getModelBaselines(self.model_path)
+        missing_loci = [
+            locus_id for locus_id in getModelLociIds(self.model_path)
+            if sklearnClassifier.getEstimatorKey(locus_id, self.clf, self.clf_params, self.random_seed) not in self.fitted_by_key
+        ]
+        fitted_by_locus = sklearnClassifier.fitClassifiers(self.model_path, missing_loci, self.clf, self.clf_params, self.threads)
+        for locus_id, locus_clf in fitted_by_locus.items():
+            self.fitted_by_key[sklearnClassifier.getEstimatorKey(locus_id, self.clf, self.clf_params, self.random_seed)] = locus_clf
+        closeModel(self.model_path)
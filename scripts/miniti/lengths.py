@@ -0,0 +1,287 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.2.1'
+
+from anacore.msi.locus import LocusDataDistrib
+import numpy as np
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def getCountsMatrix(lengths_distribs):
+    """
+    Return counts of the lengths distributions on their common lengths range.
+
+    :param lengths_distribs: The lengths distributions.
+    :type lengths_distribs: list of anacore.msi.locus.LocusDataDistrib
+    :return: Counts (one row by distribution and one column by length from the returned first length) and the first length.
+    :rtype: (numpy.ndarray, int)
+    """
+    lengths_distribs = [toArrayLengths(lengths) for lengths in lengths_distribs]
+    if len(lengths_distribs) == 0:
+        return np.zeros((0, 1), dtype=np.int32), 0
+    min_len = min(lengths.min_len for lengths in lengths_distribs)
+    max_len = max(lengths.min_len + len(lengths.counts) - 1 for lengths in lengths_distribs)
+    matrix = np.zeros((len(lengths_distribs), max_len - min_len + 1), dtype=np.int32)
+    for row_idx, lengths in enumerate(lengths_distribs):
+        start = lengths.min_len - min_len
+        matrix[row_idx, start:start + len(lengths.counts)] = lengths.counts
+    return matrix, min_len
+
+
+def getPeaks(counts, min_len):
+    """
+    Return length of the higher peak and number of reads/fragments of lengths distributions. When several lengths have the higher count, the longest is selected.
+
+    :param counts: Counts by length from min_len. The last axis is the length and the other axes are the distributions.
+    :type counts: numpy.ndarray
+    :param min_len: Length of the first count of the distributions (broadcastable to counts.shape[:-1]).
+    :type min_len: int or numpy.ndarray
+    :return: Length of the higher peak (-1 for empty distributions) and number of reads/fragments of each distribution.
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    support = counts.sum(axis=-1, dtype=np.int64)
+    last_higher_idx = counts.shape[-1] - 1 - np.argmax(counts[..., ::-1], axis=-1)  # argmax returns the first maximum
+    peak_len = np.where(support > 0, min_len + last_higher_idx, -1)
+    return peak_len, support
+
+
+def getPrctMatrix(lengths_distribs, min_len, max_len):
+    """
+    Return percentage of reads/fragments by length between min_len and max_len for each lengths distribution.
+
+    :param lengths_distribs: The lengths distributions.
+    :type lengths_distribs: list of anacore.msi.locus.LocusDataDistrib
+    :param min_len: The first length of the range.
+    :type min_len: int
+    :param max_len: The last length of the range.
+    :type max_len: int
+    :return: Percentage of reads/fragments by length (one row by distribution and one column by length from min_len to max_len).
+    :rtype: numpy.ndarray
+    """
+    prct = np.zeros((len(lengths_distribs), max_len - min_len + 1))
+    for row_idx, lengths in enumerate(lengths_distribs):
+        lengths = toArrayLengths(lengths)
+        count = lengths.getCount()
+        start = max(min_len, lengths.min_len)
+        end = min(max_len, lengths.min_len + len(lengths.counts) - 1)
+        if count != 0 and start <= end:
+            counts = lengths.counts[start - lengths.min_len:end - lengths.min_len + 1].astype(np.int64)
+            prct[row_idx, start - min_len:end - min_len + 1] = counts * 100 / count
+    return prct
+
+
+def getPrctFeatures(counts, min_len):
+    """
+    Return percentage of reads/fragments by length on the range of lengths observed in the distributions. Values are computed as in getPrctMatrix().
+
+    :param counts: Counts by length from min_len (one row by distribution).
+    :type counts: numpy.ndarray
+    :param min_len: Length of the first column of counts.
+    :type min_len: int
+    :return: Percentages (one row by distribution and one column by length from the first to the last observed length), the first and the last observed lengths. None if no length is observed.
+    :rtype: (numpy.ndarray, int, int)
+    """
+    observed_offsets = np.flatnonzero(counts.any(axis=0))
+    if len(observed_offsets) == 0:
+        return None
+    first_offset = int(observed_offsets[0])
+    last_offset = int(observed_offsets[-1])
+    counts = np.asarray(counts[:, first_offset:last_offset + 1], dtype=np.int64)
+    support = counts.sum(axis=1)
+    prct = np.zeros(counts.shape)
+    has_count = support != 0
+    prct[has_count] = counts[has_count] * 100 / support[has_count, np.newaxis]
+    return prct, int(min_len) + first_offset, int(min_len) + last_offset
+
+
+def setArrayLengths(samples):
+    """
+    Replace the lengths distributions of all the loci results by ArrayLengthsDistrib. The samples are modified in place.
+
+    :param samples: The samples.
+    :type samples: list of anacore.msi.sample.MSISample
+    :return: The samples.
+    :rtype: list of anacore.msi.sample.MSISample
+    """
+    for spl in samples:
+        for locus in spl.loci.values():
+            for locus_res in locus.results.values():
+                if locus_res.data is not None and locus_res.data.get("lengths") is not None:
+                    locus_res.data["lengths"] = toArrayLengths(locus_res.data["lengths"])
+    return samples
+
+
+def setDictLengths(samples):
+    """
+    Replace the ArrayLengthsDistrib of all the loci results by anacore.msi.locus.LocusDataDistrib, the class serialized by anacore.msi.reportIO.ReportIO.write(). The samples are modified in place.
+
+    :param samples: The samples.
+    :type samples: list of anacore.msi.sample.MSISample
+    :return: The replaced distributions: the data of the locus result and its ArrayLengthsDistrib.
+    :rtype: list of (dict, ArrayLengthsDistrib)
+    """
+    replaced = list()
+    for spl in samples:
+        for locus in spl.loci.values():
+            for locus_res in locus.results.values():
+                if locus_res.data is not None and isinstance(locus_res.data.get("lengths"), ArrayLengthsDistrib):
+                    replaced.append((locus_res.data, locus_res.data["lengths"]))
+                    locus_res.data["lengths"] = toDictLengths(locus_res.data["lengths"])
+    return replaced
+
+
+def toArrayLengths(lengths):
+    """
+    Return the lengths distribution as ArrayLengthsDistrib. The distribution is returned as is if it is already an ArrayLengthsDistrib.
+
+    :param lengths: The lengths distribution.
+    :type lengths: anacore.msi.locus.LocusDataDistrib
+    :return: The lengths distribution.
+    :rtype: ArrayLengthsDistrib
+    """
+    if isinstance(lengths, ArrayLengthsDistrib):
+        return lengths
+    return ArrayLengthsDistrib.fromItems(lengths.items(), lengths.mode)
+
+
+def toDictLengths(lengths):
+    """
+    Return the lengths distribution as anacore.msi.locus.LocusDataDistrib. The distribution is returned as is if it is not an ArrayLengthsDistrib.
+
+    :param lengths: The lengths distribution.
+    :type lengths: anacore.msi.locus.LocusDataDistrib
+    :return: The lengths distribution.
+    :rtype: anacore.msi.locus.LocusDataDistrib
+    """
+    if not isinstance(lengths, ArrayLengthsDistrib):
+        return lengths
+    return LocusDataDistrib(lengths.ct_by_len, lengths.mode)
+
+
+########################################################################
+#
+# CLASSES
+#
+########################################################################
+class ArrayLengthsDistrib(LocusDataDistrib):
+    """
+    Read-only lengths distribution stored as the length of the first count and a contiguous array of counts. The array can be a row of the binary model counts array.
+
+    The attribute ct_by_len is built on demand, so the functions of anacore working on anacore.msi.locus.LocusDataDistrib can be used without modification. The instances cannot be serialized by anacore.msi.reportIO.ReportIO.write(), use miniti.reportIO.writeSamples() which converts them back to anacore.msi.locus.LocusDataDistrib.
+    """
+
+    def __init__(self, counts, min_len, mode="reads"):
+        """
+        Build and return an instance of ArrayLengthsDistrib.
+
+        :param counts: Count by length from min_len.
+        :type counts: numpy.ndarray
+        :param min_len: Length of the first count.
+        :type min_len: int
+        :param mode: Counted elements: reads or fragments.
+        :type mode: str
+        :return: The new instance.
+        :rtype: ArrayLengthsDistrib
+        """
+        self.counts = counts
+        self.min_len = min_len
+        self.mode = mode
+        self._count = None
+
+    @property
+    def ct_by_len(self):
+        """
+        Return count by length for lengths with count, sorted by length.
+
+        :return: Count by length.
+        :rtype: dict
+        """
+        return dict(self.items())
+
+    @staticmethod
+    def fromDict(data):
+        """
+        Return instance from lengths distribution in MSIReport format.
+
+        :param data: Lengths distribution in MSIReport format (keys: "ct_by_len" and "mode").
+        :type data: dict
+        :return: The new instance.
+        :rtype: ArrayLengthsDistrib
+        """
+        return ArrayLengthsDistrib.fromItems(data["ct_by_len"].items(), data["mode"])
+
+    @staticmethod
+    def fromItems(items, mode="reads"):
+        """
+        Return instance from lengths and their counts.
+
+        :param items: Lengths (int or str) and their counts.
+        :type items: iterable of (int, int)
+        :param mode: Counted elements: reads or fragments.
+        :type mode: str
+        :return: The new instance.
+        :rtype: ArrayLengthsDistrib
+        """
+        items = [(int(length), count) for length, count in items]
+        min_len = min(length for length, count in items) if len(items) != 0 else 0
+        max_len = max(length for length, count in items) if len(items) != 0 else 0
+        counts = np.zeros(max_len - min_len + 1, dtype=np.int32)
+        for length, count in items:
+            counts[length - min_len] = count
+        return ArrayLengthsDistrib(counts, min_len, mode)
+
+    def getCount(self):
+        """
+        Return number of reads/fragments.
+
+        :return: Number of reads/fragments.
+        :rtype: int
+        """
+        if self._count is None:
+            self._count = int(self.counts.sum(dtype=np.int64))
+        return self._count
+
+    def getHigherPeak(self):
+        """
+        Return length of the higher peak. When several lengths have the higher count, the longest is selected.
+
+        :return: Length of the higher peak. None if the distribution is empty.
+        :rtype: int
+        """
+        peak_len, support = getPeaks(self.counts, self.min_len)
+        return None if support == 0 else int(peak_len)
+
+    def getMaxLength(self):
+        """
+        Return the longest length with count.
+
+        :return: The longest length with count. None if the distribution is empty.
+        :rtype: int
+        """
+        offsets = np.flatnonzero(self.counts)
+        return None if len(offsets) == 0 else self.min_len + int(offsets[-1])
+
+    def getMinLength(self):
+        """
+        Return the shortest length with count.
+
+        :return: The shortest length with count. None if the distribution is empty.
+        :rtype: int
+        """
+        offsets = np.flatnonzero(self.counts)
+        return None if len(offsets) == 0 else self.min_len + int(offsets[0])
+
+    def items(self):
+        """
+        Return lengths and their counts, sorted by length and only for lengths with count.
+
+        :return: Lengths and their counts.
+        :rtype: list of (int, int)
+        """
+        offsets = np.flatnonzero(self.counts)
+        return list(zip((offsets + self.min_len).tolist(), self.counts[offsets].tolist()))
@@ -0,0 +1,160 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.1.0'
+
+import contextlib
+import cProfile
+import json
+import linecache
+from miniti.compression import removeCompressionExt
+import os
+import resource
+import time
+import tracemalloc
+
+
+PROFILE_ENV_VAR = "MINITI_PROFILE"
+
+
+def getMetricsPath(path):
+    """
+    Return path to the metrics file of the output (example: splA_stabilityStatus_metrics.json for splA_stabilityStatus.json or splA_stabilityStatus.json.gz).
+
+    :param path: Path to the script output.
+    :type path: str
+    :return: Path to the metrics file.
+    :rtype: str
+    """
+    return os.path.splitext(removeCompressionExt(path.rstrip(os.sep)))[0] + "_metrics.json"
+
+
+def getPeakRSS():
+    """
+    Return the peak resident set size of the current process.
+
+    :return: Peak RSS in kilobytes.
+    :rtype: int
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def getProfileModes():
+    """
+    Return the profilers activated by the environment variable MINITI_PROFILE (comma separated list of "tracemalloc" and "cprofile").
+
+    :return: Names of the activated profilers.
+    :rtype: set
+    """
+    modes = {elt.strip().lower() for elt in os.environ.get(PROFILE_ENV_VAR, "").split(",") if elt.strip() != ""}
+    unknown_modes = modes - {"cprofile", "tracemalloc"}
+    if len(unknown_modes) != 0:
+        raise Exception('The profilers {} in environment variable {} are invalid. Only "cprofile" and "tracemalloc" can be used.'.format(sorted(unknown_modes), PROFILE_ENV_VAR))
+    return modes
+
+
+def getStage(metrics, name, nb_items=None):
+    """
+    Return context recording the stage in metrics or a context doing nothing if metrics is None.
+
+    :param metrics: The metrics of the script.
+    :type metrics: ScriptMetrics
+    :param name: Name of the stage.
+    :type name: str
+    :param nb_items: Number of items processed in the stage.
+    :type nb_items: int
+    :return: Context manager returning the stage record.
+    :rtype: contextlib.AbstractContextManager
+    """
+    if metrics is None:
+        return contextlib.nullcontext({"name": name, "nb_items": nb_items})
+    return metrics.stage(name, nb_items)
+
+
+class ScriptMetrics:
+    """Record wall time, CPU time, peak RSS and number of processed items by stage of a script and write them in a JSON file next to the script output. With MINITI_PROFILE, the tracemalloc peak is added on each stage and the allocations and/or the cProfile statistics are dumped next to the output."""
+
+    def __init__(self, script_name):
+        """
+        Build and return an instance of ScriptMetrics. The timers and the profilers start with the instance.
+
+        :param script_name: Name of the script.
+        :type script_name: str
+        :return: The new instance.
+        :rtype: ScriptMetrics
+        """
+        self.script_name = script_name
+        self.stages = list()
+        self.profile_modes = getProfileModes()
+        self._profiler = None
+        if "tracemalloc" in self.profile_modes:
+            tracemalloc.start()
+        if "cprofile" in self.profile_modes:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    @contextlib.contextmanager
+    def stage(self, name, nb_items=None):
+        """
+        Context recording one stage. The number of processed items can be set during the stage in the "nb_items" of the returned record.
+
+        :param name: Name of the stage.
+        :type name: str
+        :param nb_items: Number of items processed in the stage.
+        :type nb_items: int
+        :return: The stage record.
+        :rtype: dict
+        """
+        record = {"name": name, "nb_items": nb_items}
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_time"] = time.perf_counter() - start_wall
+            record["cpu_time"] = time.process_time() - start_cpu
+            record["peak_rss"] = getPeakRSS()
+            if tracemalloc.is_tracing():
+                record["traced_peak"] = tracemalloc.get_traced_memory()[1] // 1024
+            self.stages.append(record)
+
+    def write(self, output_path):
+        """
+        Stop profilers and write metrics and profiles next to the output.
+
+        :param output_path: Path to the main output of the script. The metrics are written next to this file (see getMetricsPath()).
+        :type output_path: str
+        """
+        wall_time = time.perf_counter() - self._start_wall
+        cpu_time = time.process_time() - self._start_cpu
+        out_prefix = os.path.splitext(removeCompressionExt(output_path.rstrip(os.sep)))[0]
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(out_prefix + "_cprofile.prof")
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, cProfile.__file__),
+                tracemalloc.Filter(False, linecache.__file__),
+                tracemalloc.Filter(False, tracemalloc.__file__)
+            ])
+            tracemalloc.stop()
+            with open(out_prefix + "_tracemalloc.txt", "w") as writer:
+                for stat in snapshot.statistics("lineno")[:50]:
+                    writer.write(str(stat) + "\n")
+        with open(getMetricsPath(output_path), "w") as writer:
+            json.dump(
+                {
+                    "script": self.script_name,
+                    "output": output_path,
+                    "wall_time": wall_time,
+                    "cpu_time": cpu_time,
+                    "children_cpu_time": sum(resource.getrusage(resource.RUSAGE_CHILDREN)[:2]),  # Workers of multiprocessing
+                    "peak_rss": getPeakRSS(),
+                    "stages": self.stages
+                },
+                writer
+            )
@@ -0,0 +1,792 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.9.0'
+
+from anacore.msi.base import Status
+from anacore.msi.locus import LocusRes
+import json
+from miniti.checksum import checksum, checksumFromDigest
+from miniti.compression import dumpJSON, getCompression, getCompressionFromName, getContent, loadJSON, openFile
+from miniti.lengths import ArrayLengthsDistrib, getCountsMatrix, getPeaks, getPrctFeatures
+import numpy as np
+import os
+import re
+import shutil
+import tempfile
+
+
+BINARY_MODEL_VERSION = 1
+BINARY_MODEL_STATUS = ["MSS", "MSI", "Undetermined", None]  # Index of each status in status array
+BINARY_MODEL_NO_LOCUS = -2  # Status code when the locus is missing in sample
+BINARY_MODEL_NO_RESULT = -1  # Status code when the locus has no result for the model method
+BINARY_MODEL_TRAIN_STATUS = [BINARY_MODEL_STATUS.index(Status.stable), BINARY_MODEL_STATUS.index(Status.unstable)]  # Status codes usable in training
+JSON_SCALAR_END_RE = re.compile(rb'[\s,\]}]')
+JSON_STRING_END_RE = re.compile(rb'["\\]')
+JSON_STRUCT_RE = re.compile(rb'["{}\[\]]')
+JSON_WHITESPACE_RE = re.compile(rb'\s*')
+OPENED_MODEL_BY_PATH = dict()  # Models readers of the process and signature of their files (see openModel())
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def _getJSONMembers(buffer, pos):
+    """
+    Return members of the JSON object starting at position: key and span of the value for each member.
+
+    :param buffer: JSON content.
+    :type buffer: bytes or mmap.mmap
+    :param pos: Position of the first character of the object.
+    :type pos: int
+    :return: Key, start and end of the value for each member and the position after the object.
+    :rtype: (list of (str, int, int), int)
+    """
+    members = list()
+    pos = _skipJSONWhitespace(buffer, pos)
+    if buffer[pos:pos + 1] != b"{":
+        raise Exception("JSON object is expected at position {}.".format(pos))
+    pos = _skipJSONWhitespace(buffer, pos + 1)
+    if buffer[pos:pos + 1] == b"}":
+        return members, pos + 1
+    while True:
+        key_end = _skipJSONValue(buffer, pos)
+        key = json.loads(buffer[pos:key_end])
+        pos = _skipJSONWhitespace(buffer, key_end) + 1  # Skip ":"
+        value_start = _skipJSONWhitespace(buffer, pos)
+        value_end = _skipJSONValue(buffer, value_start)
+        members.append((key, value_start, value_end))
+        pos = _skipJSONWhitespace(buffer, value_end)
+        if buffer[pos:pos + 1] == b"}":
+            return members, pos + 1
+        pos = _skipJSONWhitespace(buffer, pos + 1)  # Skip ","
+
+
+def _skipJSONValue(buffer, pos):
+    """
+    Return position after the JSON value starting at position. The value is not decoded.
+
+    :param buffer: JSON content.
+    :type buffer: bytes or mmap.mmap
+    :param pos: Position of the first character of the value.
+    :type pos: int
+    :return: Position after the value.
+    :rtype: int
+    """
+    first_char = buffer[pos:pos + 1]
+    if first_char == b'"':  # String
+        while True:
+            match = JSON_STRING_END_RE.search(buffer, pos + 1)
+            if match.group() == b"\\":
+                pos = match.start() + 1  # Skip escaped character
+            else:
+                return match.end()
+    elif first_char in {b"{", b"["}:  # Object or array
+        depth = 0
+        while True:
+            match = JSON_STRUCT_RE.search(buffer, pos)
+            if match.group() == b'"':
+                pos = _skipJSONValue(buffer, match.start())
+            else:
+                depth += 1 if match.group() in {b"{", b"["} else -1
+                pos = match.end()
+                if depth == 0:
+                    return pos
+    match = JSON_SCALAR_END_RE.search(buffer, pos)  # Number, boolean or null
+    return len(buffer) if match is None else match.start()
+
+
+def _rfindNonWhitespace(handle, end_pos):
+    """
+    Return position of the last non-whitespace byte before end_pos in file. The file is read backward by chunks.
+
+    :param handle: File handle opened in binary mode.
+    :type handle: file object
+    :param end_pos: The search ends before this position.
+    :type end_pos: int
+    :return: Position of the last non-whitespace byte. -1 if there is only whitespaces before end_pos.
+    :rtype: int
+    """
+    while end_pos > 0:
+        read_size = min(end_pos, 1024)
+        end_pos -= read_size
+        handle.seek(end_pos)
+        chunk = handle.read(read_size).rstrip()
+        if len(chunk) != 0:
+            return end_pos + len(chunk) - 1
+    return -1
+
+
+def _skipJSONWhitespace(buffer, pos):
+    """
+    Return position of the next non-whitespace character.
+
+    :param buffer: JSON content.
+    :type buffer: bytes or mmap.mmap
+    :param pos: Start position.
+    :type pos: int
+    :return: Position of the next non-whitespace character.
+    :rtype: int
+    """
+    return JSON_WHITESPACE_RE.match(buffer, pos).end()
+
+
+def appendJSONModelSamples(model_path, new_samples_path, out_path):
+    """
+    Write model with the samples of new_samples_path appended after its samples. The model is not decoded: the new samples are inserted before its closing bracket. A compressed model or output (see miniti.compression.openFile()) is decompressed in memory. The output is written in a temporary file moved on out_path at the end, so the model is never left partially written.
+
+    :param model_path: Path to the model (format: MSIReport).
+    :type model_path: str
+    :param new_samples_path: Path to the new references samples (format: MSIReport).
+    :type new_samples_path: str
+    :param out_path: Path to the outputted model (format: MSIReport). It can be model_path to update the model in place.
+    :type out_path: str
+    """
+    with openFile(new_samples_path, "rb") as reader:
+        new_content = reader.read().strip()
+    if new_content[:1] != b"[" or new_content[-1:] != b"]":
+        raise Exception("The file {} must contain a list of samples.".format(new_samples_path))
+    new_content = new_content[1:-1].strip()
+    out_folder = os.path.dirname(os.path.abspath(out_path))
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=out_folder, prefix=".tmp_", suffix="_" + os.path.basename(out_path))  # Same extension for compression
+    os.close(tmp_fd)
+    try:
+        if getCompression(model_path) is not None or getCompressionFromName(out_path) is not None:
+            with openFile(model_path, "rb") as reader:
+                content = reader.read().rstrip()
+            if content[-1:] != b"]":
+                raise Exception("The model {} must contain a list of samples.".format(model_path))
+            content = content[:-1].rstrip()
+            if len(new_content) != 0:
+                content += (b"" if content[-1:] == b"[" else b", ") + new_content
+            with openFile(tmp_path, "wb") as writer:
+                writer.write(content + b"]")
+        else:
+            with open(model_path, "rb") as reader:
+                # Find closing bracket
+                closing_pos = _rfindNonWhitespace(reader, reader.seek(0, os.SEEK_END))
+                reader.seek(max(closing_pos, 0))
+                if closing_pos == -1 or reader.read(1) != b"]":
+                    raise Exception("The model {} must contain a list of samples.".format(model_path))
+                # Find whether the list is empty
+                last_pos = _rfindNonWhitespace(reader, closing_pos)
+                reader.seek(max(last_pos, 0))
+                is_empty = reader.read(1) == b"["
+                # Copy model before closing bracket and append
+                reader.seek(0)
+                with open(tmp_path, "wb") as writer:
+                    remaining = closing_pos
+                    while remaining > 0:
+                        chunk = reader.read(min(remaining, 1024 * 1024))
+                        writer.write(chunk)
+                        remaining -= len(chunk)
+                    if len(new_content) != 0:
+                        writer.write((b"" if is_empty else b", ") + new_content)
+                    writer.write(b"]")
+        shutil.copymode(model_path, tmp_path)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def closeModel(path=None):
+    """
+    Close the model reader opened by openModel() and remove it from the readers of the process.
+
+    :param path: Path to the model (format: MSIReport or binary model folder). With None all the models opened by the process are closed.
+    :type path: str
+    """
+    paths = list(OPENED_MODEL_BY_PATH) if path is None else [path]
+    for curr_path in paths:
+        if curr_path in OPENED_MODEL_BY_PATH:
+            OPENED_MODEL_BY_PATH.pop(curr_path)[0].close()
+
+
+def getLocusModelResults(path, locus_id, model_method_name="model"):
+    """
+    Return the results of the locus for the samples of the model.
+
+    :param path: Path to the model (format: MSIReport or binary model folder).
+    :type path: str
+    :param locus_id: The locus ID.
+    :type locus_id: str
+    :param model_method_name: The name of the method storing status and data in model.
+    :type model_method_name: str
+    :return: Results of the locus in each model sample containing this locus and method.
+    :rtype: list of anacore.msi.locus.LocusRes
+    """
+    return openModel(path).getLocusResults(locus_id, model_method_name)
+
+
+def getLocusTrainData(path, locus_id, model_method_name="model"):
+    """
+    Return the data of the locus usable to fit a classifier: the percentages of reads/fragments by length and the status of the model samples with known status (stable or unstable). With a binary model the percentages are read from the arrays computed at its creation.
+
+    :param path: Path to the model (format: MSIReport or binary model folder).
+    :type path: str
+    :param locus_id: The locus ID.
+    :type locus_id: str
+    :param model_method_name: The name of the method storing status and data in model.
+    :type model_method_name: str
+    :return: The training data (see getTrainData()). None if the model does not contain any sample with known status and reads/fragments for the locus.
+    :rtype: dict
+    """
+    return openModel(path).getLocusTrainData(locus_id, model_method_name)
+
+
+def getModelChecksum(path):
+    """
+    Return checksum of the model. For a binary model this is the checksum of the MSIReport model used to produce it, so classifiers and baselines computed from one format can be used with the other.
+
+    :param path: Path to the model (format: MSIReport or binary model folder).
+    :type path: str
+    :return: Checksum of the model.
+    :rtype: str
+    """
+    if isBinaryModel(path):
+        return openModel(path).header["model_md5"]
+    return checksumFromDigest(path)
+
+
+def getModelStablePeaks(path, model_method_name="model"):
+    """
+    Return by locus the length of the higher peak and the number of reads/fragments of each stable sample of the model.
+
+    :param path: Path to the model (format: MSIReport or binary model folder).
+    :type path: str
+    :param model_method_name: The name of the method storing status and data in model.
+    :type model_method_name: str
+    :return: By locus ID the list of [peak length, number of reads/fragments] of the stable samples with at least one read/fragment. Lists are sorted by length.
+    :rtype: dict
+    """
+    return openModel(path).getStablePeaks(model_method_name)
+
+
+def getModelSignature(path):
+    """
+    Return size and modification time of the model file (the header for a binary model). They are used to detect a model modified after its opening.
+
+    :param path: Path to the model (format: MSIReport or binary model folder).
+    :type path: str
+    :return: Size and modification time in nanoseconds.
+    :rtype: (int, int)
+    """
+    file_stat = os.stat(os.path.join(path, "header.json") if isBinaryModel(path) else path)
+    return (file_stat.st_size, file_stat.st_mtime_ns)
+
+
+def getModelLociIds(path, sort=True):
+    """
+    Return IDs of the loci in model.
+
+    :param path: Path to the model (format: MSIReport or binary model folder).
+    :type path: str
+    :param sort: With False the IDs are returned in model order: order of first occurrence in the samples.
+    :type sort: bool
+    :return: IDs of the loci in model.
+    :rtype: list
+    """
+    return openModel(path).getLociIds(sort)
+
+
+def getTrainData(counts, min_len, labels):
+    """
+    Return the data usable to fit a classifier from the lengths distributions and the status of the samples with known status.
+
+    :param counts: Counts by length from min_len (one row by sample).
+    :type counts: numpy.ndarray
+    :param min_len: Length of the first column of counts.
+    :type min_len: int
+    :param labels: Status of each sample.
+    :type labels: list
+    :return: The percentages of reads/fragments by length (key: "features", see miniti.lengths.getPrctFeatures()), the status (key: "labels") and the first and last lengths of features (keys: "min_len" and "max_len"). None if there is no sample or no read/fragment.
+    :rtype: dict
+    """
+    if len(labels) == 0:
+        return None
+    features = getPrctFeatures(counts, min_len)
+    if features is None:
+        return None
+    return {
+        "features": features[0],
+        "labels": np.asarray(labels),
+        "min_len": features[1],
+        "max_len": features[2]
+    }
+
+
+def isBinaryModel(path):
+    """
+    Return True if the model is in binary format (see writeBinaryModel()).
+
+    :param path: Path to the model.
+    :type path: str
+    :return: True if the model is in binary format.
+    :rtype: bool
+    """
+    return os.path.isdir(path)
+
+
+def openModel(path):
+    """
+    Return model reader. The model is opened only once by process and loci results are read on demand. The reader is kept until closeModel() or until the model file is modified: it is then opened again.
+
+    :param path: Path to the model (format: MSIReport or binary model folder).
+    :type path: str
+    :return: The model reader.
+    :rtype: BinaryModel or JSONModel
+    """
+    signature = getModelSignature(path)
+    if path in OPENED_MODEL_BY_PATH and OPENED_MODEL_BY_PATH[path][1] != signature:
+        closeModel(path)
+    if path not in OPENED_MODEL_BY_PATH:
+        OPENED_MODEL_BY_PATH[path] = (BinaryModel(path) if isBinaryModel(path) else JSONModel(path), signature)
+    return OPENED_MODEL_BY_PATH[path][0]
+
+
+def shareModel(model):
+    """
+    Set model reader returned by openModel() for its path in the current process. It is used as initializer of the pools of processes: the workers receive the reader opened by the parent process with its index instead of opening and indexing the model again.
+
+    :param model: The model reader.
+    :type model: BinaryModel or JSONModel
+    """
+    OPENED_MODEL_BY_PATH[model.path] = (model, getModelSignature(model.path))
+
+
+def writeBinaryModel(in_path, out_path, model_method_name="model"):
+    """
+    Write MSIReport model in binary format: a folder containing a JSON header and arrays (format: npy) with one row by locus and one column by sample. The training data of the loci (see getTrainData()) are also stored: features of all loci are concatenated in train_features and train_index contains by locus the start of its features (-1 without training data) and their first and last lengths.
+
+    :param in_path: Path to the model (format: MSIReport).
+    :type in_path: str
+    :param out_path: Path to the output folder.
+    :type out_path: str
+    :param model_method_name: The name of the method storing status and data in model.
+    :type model_method_name: str
+    """
+    samples = loadJSON(in_path)
+    # Loci
+    loci = dict()
+    for spl in samples:
+        for locus_id, locus in spl["loci"].items():
+            if locus_id not in loci:
+                loci[locus_id] = {"id": locus_id, "name": locus.get("name"), "position": locus["position"]}
+    loci = list(loci.values())  # Model order
+    # Lengths range
+    min_len = np.zeros(len(loci), dtype=np.int32)
+    nb_len = 1
+    lengths_mode = None
+    for locus_idx, locus in enumerate(loci):
+        locus_lengths = [
+            int(length)
+            for spl in samples if locus["id"] in spl["loci"] and model_method_name in spl["loci"][locus["id"]]["results"]
+            for length in spl["loci"][locus["id"]]["results"][model_method_name]["data"]["lengths"]["ct_by_len"]
+        ]
+        if len(locus_lengths) != 0:
+            min_len[locus_idx] = min(locus_lengths)
+            nb_len = max(nb_len, max(locus_lengths) - min(locus_lengths) + 1)
+    # Arrays
+    shape = (len(loci), len(samples))
+    arrays = {
+        "counts": np.zeros(shape + (nb_len,), dtype=np.int32),
+        "status": np.full(shape, BINARY_MODEL_NO_LOCUS, dtype=np.int8),
+        "score": np.full(shape, np.nan),
+        "nb_peaks": np.full(shape, -1, dtype=np.int32),
+        "peak_height_cutoff": np.full(shape, np.nan),
+        "pro_p": np.full(shape, np.nan),
+        "pro_q": np.full(shape, np.nan)
+    }
+    for locus_idx, locus in enumerate(loci):
+        for spl_idx, spl in enumerate(samples):
+            if locus["id"] in spl["loci"]:
+                arrays["status"][locus_idx, spl_idx] = BINARY_MODEL_NO_RESULT
+                locus_res = spl["loci"][locus["id"]]["results"].get(model_method_name)
+                if locus_res is not None:
+                    arrays["status"][locus_idx, spl_idx] = BINARY_MODEL_STATUS.index(locus_res["status"])
+                    if locus_res.get("score") is not None:
+                        arrays["score"][locus_idx, spl_idx] = locus_res["score"]
+                    data = locus_res["data"]
+                    if lengths_mode is None:
+                        lengths_mode = data["lengths"]["mode"]
+                    elif lengths_mode != data["lengths"]["mode"]:
+                        raise Exception("Lengths distributions in model must have the same mode to be stored in binary format.")
+                    for length, count in data["lengths"]["ct_by_len"].items():
+                        arrays["counts"][locus_idx, spl_idx, int(length) - min_len[locus_idx]] = count
+                    if "mSINGS" in data:
+                        if data["mSINGS"].get("nb_peaks") is not None:  # Missing on loci without reads in models produced by previous versions
+                            arrays["nb_peaks"][locus_idx, spl_idx] = data["mSINGS"]["nb_peaks"]
+                        arrays["peak_height_cutoff"][locus_idx, spl_idx] = data["mSINGS"]["peak_height_cutoff"]
+                    if "MSIsensor-pro" in data:
+                        arrays["pro_p"][locus_idx, spl_idx] = data["MSIsensor-pro"]["pro_p"]
+                        arrays["pro_q"][locus_idx, spl_idx] = data["MSIsensor-pro"]["pro_q"]
+    # Training data
+    train_features = list()
+    arrays["train_index"] = np.full((len(loci), 3), -1, dtype=np.int64)
+    nb_features = 0
+    for locus_idx in range(len(loci)):
+        train_spl_idx = np.flatnonzero(np.isin(arrays["status"][locus_idx], BINARY_MODEL_TRAIN_STATUS))
+        train_data = getTrainData(
+            arrays["counts"][locus_idx, train_spl_idx],
+            int(min_len[locus_idx]),
+            arrays["status"][locus_idx, train_spl_idx]
+        )
+        if train_data is not None:
+            arrays["train_index"][locus_idx] = [nb_features, train_data["min_len"], train_data["max_len"]]
+            train_features.append(train_data["features"].ravel())
+            nb_features += train_data["features"].size
+    arrays["train_features"] = np.concatenate(train_features) if len(train_features) != 0 else np.zeros(0)
+    # Write
+    os.makedirs(out_path, exist_ok=True)
+    for array_name, array in arrays.items():
+        np.save(os.path.join(out_path, array_name + ".npy"), array)
+    np.save(os.path.join(out_path, "min_len.npy"), min_len)
+    with open(os.path.join(out_path, "header.json"), "w") as writer:
+        json.dump(
+            {
+                "lengths_mode": lengths_mode,
+                "loci": loci,
+                "method_name": model_method_name,
+                "model_md5": checksum(in_path),
+                "samples": [{"name": spl["name"], "results": spl.get("results", {})} for spl in samples],
+                "version": BINARY_MODEL_VERSION
+            },
+            writer
+        )
+
+
+def writeJSONModel(in_path, out_path):
+    """
+    Write binary model in MSIReport format. The output is compressed according to its extension (see miniti.compression.getCompressionFromName()).
+
+    :param in_path: Path to the binary model folder.
+    :type in_path: str
+    :param out_path: Path to the output file (format: MSIReport).
+    :type out_path: str
+    """
+    model = BinaryModel(in_path)
+    samples = [
+        {"loci": dict(), "name": spl["name"], "results": spl["results"]} for spl in model.header["samples"]
+    ]
+    for locus_idx, locus in enumerate(model.header["loci"]):
+        for spl_idx, spl in enumerate(samples):
+            status_idx = int(model.status[locus_idx, spl_idx])
+            if status_idx != BINARY_MODEL_NO_LOCUS:
+                locus_results = dict()
+                if status_idx != BINARY_MODEL_NO_RESULT:
+                    locus_results[model.header["method_name"]] = model.getResultDict(locus_idx, spl_idx)
+                spl["loci"][locus["id"]] = {"name": locus["name"], "position": locus["position"], "results": locus_results}
+    dumpJSON(samples, out_path)
+
+
+########################################################################
+#
+# CLASSES
+#
+########################################################################
+class BinaryModel:
+    """Model stored in binary format (see writeBinaryModel()). Arrays are memory-mapped."""
+
+    def __init__(self, path):
+        """
+        Build and return an instance of BinaryModel.
+
+        :param path: Path to the binary model folder.
+        :type path: str
+        :return: The new instance.
+        :rtype: BinaryModel
+        """
+        self.path = path
+        with open(os.path.join(path, "header.json")) as reader:
+            self.header = json.load(reader)
+        if self.header["version"] != BINARY_MODEL_VERSION:
+            raise Exception("Binary model {} has version {} but only version {} is managed.".format(path, self.header["version"], BINARY_MODEL_VERSION))
+        self.idx_by_locus = {locus["id"]: idx for idx, locus in enumerate(self.header["loci"])}
+        self.min_len = np.load(os.path.join(path, "min_len.npy"))
+        for array_name in ["counts", "status", "score", "nb_peaks", "peak_height_cutoff", "pro_p", "pro_q"]:
+            setattr(self, array_name, np.load(os.path.join(path, array_name + ".npy"), mmap_mode="r"))
+        self.train_features = None
+        self.train_index = None
+        if os.path.exists(os.path.join(path, "train_index.npy")):  # Missing in binary models produced before storage of training data
+            train_features = np.load(os.path.join(path, "train_features.npy"), mmap_mode="r")
+            if train_features.dtype == np.float64:  # Features stored in float32 by previous versions are computed again from counts
+                self.train_features = train_features
+                self.train_index = np.load(os.path.join(path, "train_index.npy"))
+
+    def __getstate__(self):
+        return {"path": self.path}  # Arrays are memory-mapped again instead of being copied
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def _getData(self, locus_idx, spl_idx):
+        data = {
+            "lengths": ArrayLengthsDistrib(
+                self.counts[locus_idx, spl_idx],
+                int(self.min_len[locus_idx]),
+                self.header["lengths_mode"]
+            )
+        }
+        if not np.isnan(self.peak_height_cutoff[locus_idx, spl_idx]):
+            data["mSINGS"] = dict()
+            if self.nb_peaks[locus_idx, spl_idx] != -1:
+                data["mSINGS"]["nb_peaks"] = int(self.nb_peaks[locus_idx, spl_idx])
+            data["mSINGS"]["peak_height_cutoff"] = float(self.peak_height_cutoff[locus_idx, spl_idx])
+        if not np.isnan(self.pro_p[locus_idx, spl_idx]):
+            data["MSIsensor-pro"] = {
+                "pro_p": float(self.pro_p[locus_idx, spl_idx]),
+                "pro_q": float(self.pro_q[locus_idx, spl_idx])
+            }
+        return data
+
+    def _getScore(self, locus_idx, spl_idx):
+        score = self.score[locus_idx, spl_idx]
+        return None if np.isnan(score) else float(score)
+
+    def close(self):
+        """Release the memory-mapped arrays."""
+        for array_name in ["counts", "status", "score", "nb_peaks", "peak_height_cutoff", "pro_p", "pro_q", "train_features"]:
+            setattr(self, array_name, None)
+
+    def getLocusResults(self, locus_id, model_method_name="model"):
+        """
+        Return the results of the locus for the samples of the model.
+
+        :param locus_id: The locus ID.
+        :type locus_id: str
+        :param model_method_name: The name of the method storing status and data in model.
+        :type model_method_name: str
+        :return: Results of the locus in each model sample containing this locus and method.
+        :rtype: list of anacore.msi.locus.LocusRes
+        """
+        locus_results = []
+        if model_method_name == self.header["method_name"] and locus_id in self.idx_by_locus:
+            locus_idx = self.idx_by_locus[locus_id]
+            for spl_idx, status_idx in enumerate(self.status[locus_idx]):
+                if status_idx >= 0:
+                    locus_results.append(
+                        LocusRes(
+                            BINARY_MODEL_STATUS[status_idx],
+                            self._getScore(locus_idx, spl_idx),
+                            self._getData(locus_idx, spl_idx)
+                        )
+                    )
+        return locus_results
+
+    def getLociIds(self, sort=True):
+        """
+        Return IDs of the loci in model.
+
+        :param sort: With False the IDs are returned in model order (order in header, sorted in binary models produced before storage of this order).
+        :type sort: bool
+        :return: IDs of the loci in model.
+        :rtype: list
+        """
+        return sorted(self.idx_by_locus) if sort else list(self.idx_by_locus)
+
+    def getLocusTrainData(self, locus_id, model_method_name="model"):
+        """
+        Return the data of the locus usable to fit a classifier. The features are memory-mapped from the arrays written with the model or, for older binary models, computed from the counts array.
+
+        :param locus_id: The locus ID.
+        :type locus_id: str
+        :param model_method_name: The name of the method storing status and data in model.
+        :type model_method_name: str
+        :return: The training data (see getTrainData()). None if the model does not contain any sample with known status and reads/fragments for the locus.
+        :rtype: dict
+        """
+        if model_method_name != self.header["method_name"] or locus_id not in self.idx_by_locus:
+            return None
+        locus_idx = self.idx_by_locus[locus_id]
+        train_spl_idx = np.flatnonzero(np.isin(self.status[locus_idx], BINARY_MODEL_TRAIN_STATUS))
+        labels = [BINARY_MODEL_STATUS[status_idx] for status_idx in self.status[locus_idx, train_spl_idx]]
+        if self.train_index is None:
+            return getTrainData(self.counts[locus_idx, train_spl_idx], int(self.min_len[locus_idx]), labels)
+        features_start, min_len, max_len = (int(elt) for elt in self.train_index[locus_idx])
+        if features_start == -1:
+            return None
+        nb_features = len(labels) * (max_len - min_len + 1)
+        return {
+            "features": self.train_features[features_start:features_start + nb_features].reshape(len(labels), -1),
+            "labels": np.asarray(labels),
+            "min_len": min_len,
+            "max_len": max_len
+        }
+
+    def getStablePeaks(self, model_method_name="model"):
+        """
+        Return by locus the length of the higher peak and the number of reads/fragments of each stable sample of the model. The peaks of all loci are computed on the counts array.
+
+        :param model_method_name: The name of the method storing status and data in model.
+        :type model_method_name: str
+        :return: By locus ID the list of [peak length, number of reads/fragments] of the stable samples with at least one read/fragment. Lists are sorted by length.
+        :rtype: dict
+        """
+        peaks_by_locus = {locus_id: [] for locus_id in self.getLociIds()}
+        if model_method_name == self.header["method_name"]:
+            peak_len, support = getPeaks(self.counts, self.min_len[:, np.newaxis])
+            is_selected = (self.status == BINARY_MODEL_STATUS.index(Status.stable)) & (support > 0)
+            for locus_id, locus_idx in self.idx_by_locus.items():
+                spl_idx = np.flatnonzero(is_selected[locus_idx])
+                peaks_by_locus[locus_id] = [
+                    list(elt) for elt in sorted(zip(peak_len[locus_idx, spl_idx].tolist(), support[locus_idx, spl_idx].tolist()))
+                ]
+        return peaks_by_locus
+
+    def getResultDict(self, locus_idx, spl_idx):
+        """
+        Return result of the locus in the sample in MSIReport format.
+
+        :param locus_idx: Index of the locus.
+        :type locus_idx: int
+        :param spl_idx: Index of the sample.
+        :type spl_idx: int
+        :return: Result of the locus in the sample in MSIReport format.
+        :rtype: dict
+        """
+        data = self._getData(locus_idx, spl_idx)
+        data["lengths"] = {
+            "ct_by_len": {str(length): count for length, count in data["lengths"].items()},
+            "mode": data["lengths"].mode
+        }
+        return {
+            "data": data,
+            "score": self._getScore(locus_idx, spl_idx),
+            "status": BINARY_MODEL_STATUS[int(self.status[locus_idx, spl_idx])]
+        }
+
+
+class JSONModel:
+    """Model in MSIReport format indexed by locus. The positions of the loci in the file are kept in memory and the results of a locus are decoded on demand. Only the results of the last requested locus are kept by the instance. The file is memory-mapped and a compressed model is decompressed in a temporary file (see miniti.compression.getContent())."""
+
+    def __init__(self, path):
+        """
+        Build and return an instance of JSONModel.
+
+        :param path: Path to the model (format: MSIReport).
+        :type path: str
+        :return: The new instance.
+        :rtype: JSONModel
+        """
+        self.path = path
+        self._buffer = getContent(path)
+        self._last_results = None
+        self.samples_names = list()
+        self.spans_by_locus = dict()
+        self._index()
+
+    def __getstate__(self):
+        return {"path": self.path, "samples_names": self.samples_names, "spans_by_locus": self.spans_by_locus}  # The index is kept, the content is read again
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._buffer = getContent(self.path)
+        self._last_results = None
+        self.samples_names = state["samples_names"]
+        self.spans_by_locus = state["spans_by_locus"]
+
+    def close(self):
+        """Close the memory-mapped content."""
+        self._last_results = None
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+
+    def _index(self):
+        """Store name of each sample and position in file of each locus of each sample."""
+        pos = _skipJSONWhitespace(self._buffer, 0)
+        if self._buffer[pos:pos + 1] != b"[":
+            raise Exception("The model {} must contain a list of samples.".format(self.path))
+        pos = _skipJSONWhitespace(self._buffer, pos + 1)
+        while self._buffer[pos:pos + 1] != b"]":
+            if self._buffer[pos:pos + 1] == b",":
+                pos = _skipJSONWhitespace(self._buffer, pos + 1)
+            spl_members, pos = _getJSONMembers(self._buffer, pos)
+            spl_idx = len(self.samples_names)
+            self.samples_names.append(None)
+            for key, value_start, value_end in spl_members:
+                if key == "name":
+                    self.samples_names[spl_idx] = json.loads(self._buffer[value_start:value_end])
+                elif key == "loci":
+                    for locus_id, locus_start, locus_end in _getJSONMembers(self._buffer, value_start)[0]:
+                        if locus_id not in self.spans_by_locus:
+                            self.spans_by_locus[locus_id] = list()
+                        self.spans_by_locus[locus_id].append((spl_idx, locus_start, locus_end))
+            pos = _skipJSONWhitespace(self._buffer, pos)
+
+    def getLociIds(self, sort=True):
+        """
+        Return IDs of the loci in model.
+
+        :param sort: With False the IDs are returned in model order: order of first occurrence in the samples.
+        :type sort: bool
+        :return: IDs of the loci in model.
+        :rtype: list
+        """
+        return sorted(self.spans_by_locus) if sort else list(self.spans_by_locus)
+
+    def getLocusResults(self, locus_id, model_method_name="model"):
+        """
+        Return the results of the locus for the samples of the model. The results of the last requested locus are kept and shared between consecutive calls for this locus: they must not be modified.
+
+        :param locus_id: The locus ID.
+        :type locus_id: str
+        :param model_method_name: The name of the method storing status and data in model.
+        :type model_method_name: str
+        :return: Results of the locus in each model sample containing this locus and method.
+        :rtype: list of anacore.msi.locus.LocusRes
+        """
+        cache_key = (locus_id, model_method_name)
+        if self._last_results is None or self._last_results[0] != cache_key:
+            locus_results = []
+            for spl_idx, locus_start, locus_end in self.spans_by_locus.get(locus_id, []):
+                locus = json.loads(self._buffer[locus_start:locus_end])
+                if model_method_name in locus["results"]:
+                    res = locus["results"][model_method_name]
+                    data = res.get("data", dict())
+                    if "lengths" in data:
+                        data["lengths"] = ArrayLengthsDistrib.fromDict(data["lengths"])
+                    locus_results.append(LocusRes(res["status"], res.get("score"), data))
+            self._last_results = (cache_key, locus_results)
+        return list(self._last_results[1])
+
+    def getLocusTrainData(self, locus_id, model_method_name="model"):
+        """
+        Return the data of the locus usable to fit a classifier.
+
+        :param locus_id: The locus ID.
+        :type locus_id: str
+        :param model_method_name: The name of the method storing status and data in model.
+        :type model_method_name: str
+        :return: The training data (see getTrainData()). None if the model does not contain any sample with known status and reads/fragments for the locus.
+        :rtype: dict
+        """
+        train_results = [
+            locus_res for locus_res in self.getLocusResults(locus_id, model_method_name)
+            if locus_res.status in {Status.stable, Status.unstable}
+        ]
+        counts, min_len = getCountsMatrix([locus_res.data["lengths"] for locus_res in train_results])
+        return getTrainData(counts, min_len, [locus_res.status for locus_res in train_results])
+
+    def getStablePeaks(self, model_method_name="model"):
+        """
+        Return by locus the length of the higher peak and the number of reads/fragments of each stable sample of the model.
+
+        :param model_method_name: The name of the method storing status and data in model.
+        :type model_method_name: str
+        :return: By locus ID the list of [peak length, number of reads/fragments] of the stable samples with at least one read/fragment. Lists are sorted by length.
+        :rtype: dict
+        """
+        peaks_by_locus = dict()
+        for locus_id in self.getLociIds():
+            locus_peaks = list()
+            for locus_res in self.getLocusResults(locus_id, model_method_name):
+                if locus_res.status == Status.stable and "lengths" in locus_res.data:
+                    support = locus_res.data["lengths"].getCount()
+                    if support > 0:
+                        locus_peaks.append([locus_res.data["lengths"].getHigherPeak(), support])
+            peaks_by_locus[locus_id] = sorted(locus_peaks)
+        return peaks_by_locus
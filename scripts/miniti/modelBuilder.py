@@ -0,0 +1,66 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.1'
+
+from anacore.msi.msings import MSINGSEval
+from anacore.msi.msisensorpro import ProEval
+from anacore.sv import HashedSVIO
+
+
+def createModel(samples, status_by_spl, min_support, peak_height_cutoff=0.05, method_name="model"):
+    """
+    Set known status and pre-calculated classifiers features on lengths distributions of the references samples. The samples are modified in place and can be written as model with anacore.msi.reportIO.ReportIO.write().
+
+    :param samples: References samples with lengths distributions stored in method_name.
+    :type samples: list of anacore.msi.sample.MSISample
+    :param status_by_spl: By sample name the known status by locus name (see getKnownStatus()).
+    :type status_by_spl: dict
+    :param min_support: Minimum number of reads/fragments to use the locus status in model. Loci with a lower support or without reads keep an unknown status (None).
+    :type min_support: int
+    :param peak_height_cutoff: [mSINGS] Minimum height of a peak to be counted, expressed as a proportion of the highest peak.
+    :type peak_height_cutoff: float
+    :param method_name: The name of the method storing distributions and where the status is set.
+    :type method_name: str
+    :return: The references samples.
+    :rtype: list of anacore.msi.sample.MSISample
+    """
+    for spl in samples:
+        if spl.name not in status_by_spl:
+            raise Exception("Sample {} has no known status.".format(spl.name))
+        spl_status = status_by_spl[spl.name]
+        for locus in spl.loci.values():
+            locus_res = locus.results[method_name]
+            lengths = locus_res.data["lengths"]
+            locus_res.status = None
+            locus_res.score = None
+            locus_res.data = {
+                "lengths": lengths,
+                "mSINGS": {"nb_peaks": 0, "peak_height_cutoff": peak_height_cutoff}
+            }
+            nb_reads = lengths.getCount()
+            if nb_reads > 0:
+                locus_res.data["mSINGS"]["nb_peaks"] = MSINGSEval.getNbPeaks(lengths, peak_height_cutoff)
+                pro_p, pro_q = ProEval.getSlippageScores(lengths, locus.length)
+                locus_res.data["MSIsensor-pro"] = {"pro_p": pro_p, "pro_q": pro_q}
+            if nb_reads > 0 and nb_reads >= min_support:  # Loci without reads have no scores for the baselines
+                locus_res.status = spl_status.get(locus.name) or None
+    return samples
+
+
+def getKnownStatus(path):
+    """
+    Return by sample the known status of each locus from the file used in learn step.
+
+    :param path: Path to the file describing status (MSI or MSS or Undetermined) of each locus (columns) for each sample (rows) (format: TSV). See example test/config/known_status.tsv.
+    :type path: str
+    :return: By sample name the status by locus name.
+    :rtype: dict
+    """
+    status_by_spl = dict()
+    with HashedSVIO(path, title_starter="") as reader:
+        for record in reader:
+            status_by_spl[record["sample"]] = {
+                locus_name: status for locus_name, status in record.items() if locus_name not in {"sample", "status"}
+            }
+    return status_by_spl
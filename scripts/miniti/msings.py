@@ -0,0 +1,177 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2022 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.3.0'
+
+from anacore.msi.base import Status
+from anacore.msi.locus import LocusRes
+from anacore.msi.msings import MSINGSEval
+from miniti.baseline import fitGaussianNB, getScoresStats, getScoresStd, mergeScoresStats, setScores, updateGaussianNB, upgradeGaussianNB
+from miniti.model import getLocusModelResults
+
+
+def getModelBaseline(locus_results, std_dev_rate=None):
+    """
+    Return sufficient statistics of the number of peaks of stable samples in model, the gaussian naive Bayes parameters fitted on the number of peaks of stable and unstable samples, the instability threshold and peak_height_cutoff used. The numbers of peaks of the samples are not kept: the baseline size does not depend on the number of samples in model.
+
+    :param locus_results: Results of the locus for each sample in model (see miniti.model.getLocusModelResults()).
+    :type locus_results: list of anacore.msi.locus.LocusRes
+    :param std_dev_rate: A locus is tagged as unstable if the number of peaks is upper than models_avg_nb_peaks + std_dev_rate * models_std_dev_nb_peaks. With None the threshold is not computed (see setThreshold()).
+    :type std_dev_rate: float
+    :return: Sufficient statistics of the number of peaks for stable samples in model (see miniti.baseline.getScoresStats()), the gaussian naive Bayes parameters, the instability threshold and peak_height_cutoff used.
+    :rtype: dict
+    """
+    baseline = {
+        "gaussian_nb": None,
+        "stable_stats": None,
+        "threshold": None,
+        "peak_height_cutoff": None
+    }
+    scores = getModelScores(baseline, locus_results)
+    baseline["gaussian_nb"] = fitGaussianNB(scores)
+    baseline["stable_stats"] = getScoresStats(scores[Status.stable])
+    if std_dev_rate is not None:
+        setThreshold(baseline, std_dev_rate)
+    return baseline
+
+
+def getModelScores(baseline, locus_results):
+    """
+    Return number of peaks by status (stable and unstable) of the model samples and set peak_height_cutoff in baseline.
+
+    :param baseline: Baseline of the locus. It is modified in place.
+    :type baseline: dict
+    :param locus_results: Results of the locus for each sample in model.
+    :type locus_results: list of anacore.msi.locus.LocusRes
+    :return: Number of peaks by status.
+    :rtype: dict
+    """
+    scores = {Status.stable: [], Status.unstable: []}
+    for curr_ref in locus_results:
+        baseline["peak_height_cutoff"] = curr_ref.data["mSINGS"]["peak_height_cutoff"]
+        curr_status = curr_ref.status
+        if curr_status in {Status.stable, Status.unstable}:
+            scores[curr_status].append(
+                curr_ref.data["mSINGS"]["nb_peaks"]
+            )
+    return scores
+
+
+def updateModelBaseline(baseline, locus_results):
+    """
+    Update baseline with the results of new samples in model. The sufficient statistics and the gaussian naive Bayes parameters are updated from the previous ones (see miniti.baseline.mergeScoresStats() and miniti.baseline.updateGaussianNB()).
+
+    :param baseline: Baseline of the locus computed on the samples already in model (see getModelBaseline()). It is modified in place.
+    :type baseline: dict
+    :param locus_results: Results of the locus for each new sample in model.
+    :type locus_results: list of anacore.msi.locus.LocusRes
+    :return: The updated baseline.
+    :rtype: dict
+    """
+    upgradeModelBaseline(baseline)
+    new_scores = getModelScores(baseline, locus_results)
+    baseline["gaussian_nb"] = updateGaussianNB(baseline["gaussian_nb"], new_scores)
+    baseline["stable_stats"] = mergeScoresStats(baseline["stable_stats"], new_scores[Status.stable])
+    return baseline
+
+
+def upgradeModelBaseline(baseline):
+    """
+    Replace in place the numbers of peaks stored in baselines produced before the storage of sufficient statistics by these statistics.
+
+    :param baseline: Baseline of the locus (see getModelBaseline()).
+    :type baseline: dict
+    :return: The upgraded baseline.
+    :rtype: dict
+    """
+    if "scores" in baseline:
+        scores = baseline.pop("scores")
+        upgradeGaussianNB(baseline["gaussian_nb"], scores)
+        baseline["stable_stats"] = getScoresStats(scores[Status.stable])
+    return baseline
+
+
+def getStatus(nb_peaks, baseline_locus):
+    """
+    Return predicted status.
+
+    :param nb_peaks: Number of peaks for locus in sample.
+    :type nb_peaks: float
+    :param baseline_locus: Baseline of the locus (see getModelBaseline()).
+    :type baseline_locus: dict
+    :return: Predicted status.
+    :rtype: anacore.msi.base.Status
+    """
+    if nb_peaks > baseline_locus["threshold"]:
+        status = Status.unstable
+    else:
+        status = Status.stable
+    return status
+
+
+def setThreshold(baseline_locus, std_dev_rate):
+    """
+    Set instability threshold in baseline from the sufficient statistics of the number of peaks of stable samples in model. The threshold is identical to MSINGSEval.getThresholdFromNbPeaks() on these numbers of peaks.
+
+    :param baseline_locus: Baseline of the locus (see getModelBaseline()). It is modified in place.
+    :type baseline_locus: dict
+    :param std_dev_rate: A locus is tagged as unstable if the number of peaks is upper than models_avg_nb_peaks + std_dev_rate * models_std_dev_nb_peaks.
+    :type std_dev_rate: float
+    """
+    stable_stats = baseline_locus["stable_stats"]
+    if stable_stats["count"] == 0:  # Average of empty list
+        baseline_locus["threshold"] = float("nan")
+    else:
+        baseline_locus["threshold"] = stable_stats["mean"] + getScoresStd(stable_stats) * std_dev_rate
+
+
+def setLociStatus(eval_list, model_path, data_method="mSINGSUp", status_method="mSINGSUp", min_depth=60, std_dev_rate=2.0, baselines=None):
+    """
+    Predict stability classes and scores for loci using mSINGS v4.0 like algorithm. The baselines computed in learn step are used when they are provided, otherwise they are computed from the model.
+
+    :param eval_list: Evaluated samples.
+    :type eval_list: list of anacore.msi.sample.MSISample
+    :param model_path: Path to the file containing the references samples used in learn step (format: MSIReport or binary model folder).
+    :type model_path: str
+    :param data_method: The name of the method storing locus metrics.
+    :type data_method: str
+    :param status_method: The name of the method where the status will be set.
+    :type status_method: str
+    :param min_depth: The minimum numbers of reads or fragments to determine the status.
+    :type min_depth: int
+    :param std_dev_rate: A locus is tagged as unstable if the number of peaks is upper than models_avg_nb_peaks + std_dev_rate * models_std_dev_nb_peaks.
+    :type std_dev_rate: float
+    :param baselines: By locus position the baselines computed in learn step (see miniti.baseline.loadBaselines()).
+    :type baselines: dict
+    """
+    model_baseline = dict()
+    evaluated_res = list()
+    evaluated_scores = list()
+    evaluated_gaussian_nb = list()
+    for curr_spl in eval_list:
+        for locus_id, locus in curr_spl.loci.items():
+            # Model
+            if locus.position not in model_baseline:
+                if baselines is not None and locus.position in baselines:
+                    model_baseline[locus.position] = upgradeModelBaseline(dict(baselines[locus.position]["mSINGS"]))
+                    setThreshold(model_baseline[locus.position], std_dev_rate)
+                else:
+                    model_baseline[locus.position] = getModelBaseline(
+                        getLocusModelResults(model_path, locus.position),
+                        std_dev_rate
+                    )
+            baseline_locus = model_baseline[locus.position]
+            # Classify
+            locus_data = locus.results[data_method].data
+            if data_method != status_method:  # Data come from another method
+                locus_data = {"lengths": locus_data["lengths"]}
+            locus_res = LocusRes(Status.undetermined, None, locus_data)
+            if locus_data["lengths"].getCount() >= min_depth:
+                locus_data["nb_peaks"] = MSINGSEval.getNbPeaks(locus_data["lengths"], baseline_locus["peak_height_cutoff"])
+                locus_res.status = getStatus(locus_data["nb_peaks"], baseline_locus)
+                evaluated_res.append(locus_res)
+                evaluated_scores.append(locus_data["nb_peaks"])
+                evaluated_gaussian_nb.append(baseline_locus["gaussian_nb"])
+            locus.results[status_method] = locus_res
+    # Prediction confidence scores for all loci of all samples
+    setScores(evaluated_res, evaluated_scores, evaluated_gaussian_nb)
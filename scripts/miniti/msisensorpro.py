@@ -0,0 +1,175 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2022 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.3.0'
+
+from anacore.msi.base import Status
+from anacore.msi.locus import LocusRes
+from anacore.msi.msisensorpro import ProEval
+from miniti.baseline import fitGaussianNB, getScoresStats, getScoresStd, mergeScoresStats, setScores, updateGaussianNB, upgradeGaussianNB
+from miniti.model import getLocusModelResults
+
+
+def getModelBaseline(locus_results):
+    """
+    Return sufficient statistics of the pro_p scores of stable samples in model, the gaussian naive Bayes parameters fitted on the pro_p scores of stable and unstable samples and the instability threshold. The scores of the samples are not kept: the baseline size does not depend on the number of samples in model.
+
+    :param locus_results: Results of the locus for each sample in model (see miniti.model.getLocusModelResults()).
+    :type locus_results: list of anacore.msi.locus.LocusRes
+    :return: Sufficient statistics of the rounded pro_p scores for stable samples in model (see getRoundedScores() and miniti.baseline.getScoresStats()), the gaussian naive Bayes parameters and the instability threshold.
+    :rtype: dict
+    """
+    scores = getModelScores(locus_results)
+    return {
+        "gaussian_nb": fitGaussianNB(scores),
+        "stable_stats": getScoresStats(getRoundedScores(scores[Status.stable])),
+        "threshold": ProEval.getThresholdFromScores(scores[Status.stable])
+    }
+
+
+def getModelScores(locus_results):
+    """
+    Return pro_p scores by status (stable and unstable) of the model samples.
+
+    :param locus_results: Results of the locus for each sample in model.
+    :type locus_results: list of anacore.msi.locus.LocusRes
+    :return: Pro_p scores by status.
+    :rtype: dict
+    """
+    scores = {Status.stable: [], Status.unstable: []}
+    for curr_ref in locus_results:
+        curr_status = curr_ref.status
+        if curr_status in {Status.stable, Status.unstable}:
+            scores[curr_status].append(
+                curr_ref.data["MSIsensor-pro"]["pro_p"]
+            )
+    return scores
+
+
+def getRoundedScores(scores):
+    """
+    Return pro_p scores rounded and scaled as in ProEval.getThresholdFromScores().
+
+    :param scores: Pro_p scores.
+    :type scores: list of float
+    :return: Pro_p scores rounded to 6 decimals and multiplied by 1000000.
+    :rtype: list of float
+    """
+    return [round(score, 6) * 1000000 for score in scores]
+
+
+def getThresholdFromStats(stable_stats):
+    """
+    Return the minimum score to classify locus as unstable from the sufficient statistics of the pro_p scores of stable samples (see ProEval.getThresholdFromScores()).
+
+    :param stable_stats: Sufficient statistics of the rounded pro_p scores of stable samples (see getRoundedScores() and miniti.baseline.getScoresStats()).
+    :type stable_stats: dict
+    :return: Minimum score to classify locus as unstable. NaN with less than two stable samples.
+    :rtype: float
+    """
+    return (stable_stats["mean"] + 3 * getScoresStd(stable_stats, 1)) / 1000000
+
+
+def updateModelBaseline(baseline, locus_results):
+    """
+    Update baseline with the results of new samples in model. The sufficient statistics and the gaussian naive Bayes parameters are updated from the previous ones (see miniti.baseline.mergeScoresStats() and miniti.baseline.updateGaussianNB()) and the instability threshold is recomputed from these statistics.
+
+    :param baseline: Baseline of the locus computed on the samples already in model (see getModelBaseline()). It is modified in place.
+    :type baseline: dict
+    :param locus_results: Results of the locus for each new sample in model.
+    :type locus_results: list of anacore.msi.locus.LocusRes
+    :return: The updated baseline.
+    :rtype: dict
+    """
+    upgradeModelBaseline(baseline)
+    new_scores = getModelScores(locus_results)
+    baseline["gaussian_nb"] = updateGaussianNB(baseline["gaussian_nb"], new_scores)
+    if len(new_scores[Status.stable]) != 0:
+        baseline["stable_stats"] = mergeScoresStats(baseline["stable_stats"], getRoundedScores(new_scores[Status.stable]))
+        baseline["threshold"] = getThresholdFromStats(baseline["stable_stats"])
+    return baseline
+
+
+def upgradeModelBaseline(baseline):
+    """
+    Replace in place the pro_p scores stored in baselines produced before the storage of sufficient statistics by these statistics.
+
+    :param baseline: Baseline of the locus (see getModelBaseline()).
+    :type baseline: dict
+    :return: The upgraded baseline.
+    :rtype: dict
+    """
+    if "scores" in baseline:
+        scores = baseline.pop("scores")
+        upgradeGaussianNB(baseline["gaussian_nb"], scores)
+        baseline["stable_stats"] = getScoresStats(getRoundedScores(scores[Status.stable]))
+    return baseline
+
+
+def getStatus(pro_p, baseline_locus):
+    """
+    Return predicted status.
+
+    :param pro_p: Pro_p score for locus in sample.
+    :type pro_p: float
+    :param baseline_locus: Baseline of the locus (see getModelBaseline()).
+    :type baseline_locus: dict
+    :return: Predicted status.
+    :rtype: anacore.msi.base.Status
+    """
+    if pro_p > baseline_locus["threshold"]:
+        status = Status.unstable
+    else:
+        status = Status.stable
+    return status
+
+
+def setLociStatus(eval_list, model_path, data_method="MSIsensor-pro_pro", status_method="MSIsensor-pro_pro", min_depth=60, baselines=None):
+    """
+    Predict stability classes and scores for loci using MSIsensor-pro pro v1.2.0 like algorithm. The baselines computed in learn step are used when they are provided, otherwise they are computed from the model.
+
+    :param eval_list: Evaluated samples.
+    :type eval_list: list of anacore.msi.sample.MSISample
+    :param model_path: Path to the file containing the references samples used in learn step (format: MSIReport or binary model folder).
+    :type model_path: str
+    :param data_method: The name of the method storing locus metrics.
+    :type data_method: str
+    :param status_method: The name of the method where the status will be set.
+    :type status_method: str
+    :param min_depth: The minimum numbers of reads or fragments to determine the status.
+    :type min_depth: int
+    :param baselines: By locus position the baselines computed in learn step (see miniti.baseline.loadBaselines()).
+    :type baselines: dict
+    """
+    model_baseline = dict()
+    evaluated_res = list()
+    evaluated_scores = list()
+    evaluated_gaussian_nb = list()
+    for curr_spl in eval_list:
+        for locus_id, locus in curr_spl.loci.items():
+            # Model
+            if locus.position not in model_baseline:
+                if baselines is not None and locus.position in baselines:
+                    model_baseline[locus.position] = baselines[locus.position]["MSIsensor-pro"]
+                else:
+                    model_baseline[locus.position] = getModelBaseline(
+                        getLocusModelResults(model_path, locus.position)
+                    )
+            baseline_locus = model_baseline[locus.position]
+            # Classify
+            locus_data = locus.results[data_method].data
+            if data_method != status_method:  # Data come from another method
+                locus_data = {"lengths": locus_data["lengths"]}
+            locus_res = LocusRes(Status.undetermined, None, locus_data)
+            if locus_data["lengths"].getCount() >= min_depth:
+                locus_data["pro_p"], locus_data["pro_q"] = ProEval.getSlippageScores(
+                    locus_data["lengths"],
+                    locus.length
+                )
+                locus_res.status = getStatus(locus_data["pro_p"], baseline_locus)
+                evaluated_res.append(locus_res)
+                evaluated_scores.append(locus_data["pro_p"])
+                evaluated_gaussian_nb.append(baseline_locus["gaussian_nb"])
+            locus.results[status_method] = locus_res
+    # Prediction confidence scores for all loci of all samples
+    setScores(evaluated_res, evaluated_scores, evaluated_gaussian_nb)
@@ -0,0 +1,214 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.4.1'
+
+from anacore.msi.reportIO import ReportIO
+from anacore.msi.sample import MSISample
+import json
+from miniti.compression import getCompression, getCompressionFromName, loadJSON, openFile, removeCompressionExt
+from miniti.lengths import setArrayLengths, setDictLengths
+import os
+import shutil
+import tempfile
+
+
+SIDECARS_SUFFIXES = ("_digest.json", "_metrics.json", "_summary.json")
+
+
+def getEvaluatedPaths(inputs):
+    """
+    Return paths to the evaluated reports from a list of files and folders. Folders are replaced by the JSON files, compressed or not, they contain except sidecars (digest, metrics and summary).
+
+    :param inputs: Paths to evaluated reports or to folders containing them.
+    :type inputs: list
+    :return: Paths to the evaluated reports.
+    :rtype: list
+    """
+    evaluated_paths = []
+    for curr_input in inputs:
+        if os.path.isdir(curr_input):
+            evaluated_paths.extend(
+                sorted(os.path.join(curr_input, filename) for filename in os.listdir(curr_input) if removeCompressionExt(filename).endswith(".json") and not filename.endswith(SIDECARS_SUFFIXES))
+            )
+        else:
+            evaluated_paths.append(curr_input)
+    return evaluated_paths
+
+
+def getDuplicates(paths):
+    """
+    Return the paths present several times in list. Paths are compared after resolution.
+
+    :param paths: The paths.
+    :type paths: list
+    :return: The duplicated paths.
+    :rtype: list
+    """
+    real_paths = [os.path.realpath(path) for path in paths]
+    return sorted({path for path, real_path in zip(paths, real_paths) if real_paths.count(real_path) > 1})
+
+
+def getSummaryPath(path):
+    """
+    Return path to the summary file of the report (example: splA_stabilityStatus_summary.json for splA_stabilityStatus.json or splA_stabilityStatus.json.gz).
+
+    :param path: Path to the report.
+    :type path: str
+    :return: Path to the summary file.
+    :rtype: str
+    """
+    return os.path.splitext(removeCompressionExt(path))[0] + "_summary.json"
+
+
+def getSamplesSummary(samples):
+    """
+    Return by sample the name and, for each method, the status, the score and the numbers of determined and unstable loci.
+
+    :param samples: The samples.
+    :type samples: list of anacore.msi.sample.MSISample
+    :return: One record by sample with keys "name" and "results" (by method name: status, score, nb_determined and nb_unstable).
+    :rtype: list
+    """
+    return [
+        {
+            "name": spl.name,
+            "results": {
+                method_name: {
+                    "status": spl_res.status,
+                    "score": spl_res.score,
+                    "nb_determined": spl.getNbDetermined(method_name),
+                    "nb_unstable": spl.getNbUnstable(method_name)
+                } for method_name, spl_res in spl.results.items()
+            }
+        } for spl in samples
+    ]
+
+
+def loadSummary(path):
+    """
+    Return samples summary of the report or None if the summary file is missing or does not correspond to the current report (size or modification time).
+
+    :param path: Path to the report.
+    :type path: str
+    :return: Samples summary (see getSamplesSummary()) or None.
+    :rtype: list
+    """
+    summary_path = getSummaryPath(path)
+    if not os.path.exists(summary_path):
+        return None
+    with open(summary_path) as reader:
+        summary = json.load(reader)
+    report_stat = os.stat(path)
+    if summary["report"]["size"] != report_stat.st_size or summary["report"]["mtime_ns"] != report_stat.st_mtime_ns:
+        return None
+    return summary["samples"]
+
+
+def parseReport(path):
+    """
+    Return samples from report with lengths distributions stored in compact arrays (see miniti.lengths.ArrayLengthsDistrib). They are written back in MSIReport format by writeSamples(). The report can be compressed with gzip or zstd (see miniti.compression.getCompression()).
+
+    :param path: Path to the report (format: MSIReport).
+    :type path: str
+    :return: The samples.
+    :rtype: list of anacore.msi.sample.MSISample
+    """
+    if getCompression(path) is None:
+        samples = ReportIO.parse(path)
+    else:
+        samples = [MSISample.fromDict(spl) for spl in loadJSON(path)]
+    return setArrayLengths(samples)
+
+
+def parseReports(paths):
+    """
+    Return samples by report (see parseReport()).
+
+    :param paths: Paths to the reports (format: MSIReport).
+    :type paths: list
+    :return: Samples by report path in the same order as paths.
+    :rtype: dict
+    """
+    duplicated_paths = getDuplicates(paths)
+    if len(duplicated_paths) != 0:
+        raise Exception("The reports {} are present several times in inputs.".format(duplicated_paths))
+    return {path: parseReport(path) for path in paths}
+
+
+def writeReport(samples, path):
+    """
+    Write samples in report and their summary next to it (see getSummaryPath()). The summary is linked to the report by its size and modification time. The report is compressed according to its extension (see writeSamples()).
+
+    :param samples: The samples.
+    :type samples: list of anacore.msi.sample.MSISample
+    :param path: Path to the report (format: MSIReport).
+    :type path: str
+    """
+    writeSamples(samples, path)
+    report_stat = os.stat(path)
+    with open(getSummaryPath(path), "w") as writer:
+        json.dump(
+            {
+                "report": {"size": report_stat.st_size, "mtime_ns": report_stat.st_mtime_ns},
+                "samples": getSamplesSummary(samples)
+            },
+            writer
+        )
+
+
+def writeSamples(samples, path):
+    """
+    Write samples in report with anacore.msi.reportIO.ReportIO.write(). The lengths distributions stored in arrays (see miniti.lengths.ArrayLengthsDistrib) are converted in the current MSIReport format for the writing and restored after. The report is compressed with gzip if path ends with ".gz" and with zstd if path ends with ".zst": it is first written in a temporary file next to path.
+
+    :param samples: The samples.
+    :type samples: list of anacore.msi.sample.MSISample
+    :param path: Path to the report (format: MSIReport).
+    :type path: str
+    """
+    array_lengths = setDictLengths(samples)
+    try:
+        if getCompressionFromName(path) is None:
+            ReportIO.write(samples, path)
+        else:
+            tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp_", suffix=".json")
+            os.close(tmp_fd)
+            try:
+                ReportIO.write(samples, tmp_path)
+                with open(tmp_path, "rb") as reader:
+                    with openFile(path, "wb") as writer:
+                        shutil.copyfileobj(reader, writer, 1024 * 1024)
+            finally:
+                os.remove(tmp_path)
+    finally:
+        for locus_data, lengths in array_lengths:
+            locus_data["lengths"] = lengths
+
+
+def writeReports(dataset_by_path, outputs_report=None, output_pattern=None):
+    """
+    Write classified samples with one output by evaluated report or, if output_pattern is set, one output by sample. Each output comes with its summary (see writeReport()).
+
+    :param dataset_by_path: Samples by evaluated report path.
+    :type dataset_by_path: dict
+    :param outputs_report: Paths to the outputs in the same order as dataset_by_path.
+    :type outputs_report: list
+    :param output_pattern: Path pattern to the outputs where the tag "{sample}" is replaced by the sample name.
+    :type output_pattern: str
+    :return: Paths to the written outputs.
+    :rtype: list
+    """
+    if output_pattern is not None:
+        out_paths = [output_pattern.replace("{sample}", spl.name) for dataset in dataset_by_path.values() for spl in dataset]
+        out_samples = [[spl] for dataset in dataset_by_path.values() for spl in dataset]
+    else:
+        if len(outputs_report) != len(dataset_by_path):
+            raise Exception("The number of outputs reports ({}) must be equal to the number of evaluated reports ({}).".format(len(outputs_report), len(dataset_by_path)))
+        out_paths = list(outputs_report)
+        out_samples = list(dataset_by_path.values())
+    duplicated_paths = getDuplicates(out_paths)
+    if len(duplicated_paths) != 0:
+        raise Exception("The outputs {} are written several times. Each output must be different.".format(duplicated_paths))
+    for out_path, samples in zip(out_paths, out_samples):
+        writeReport(samples, out_path)
+    return out_paths
@@ -0,0 +1,29 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+
+def setSamplesStatus(samples, method_name, min_voting_loci, instability_ratio, undetermined_weight, locus_weight_is_score, model_md5):
+    """
+    Set status and score of samples from the status of their loci.
+
+    :param samples: Samples with classified loci.
+    :type samples: list of anacore.msi.sample.MSISample
+    :param method_name: The name of the method storing loci status and where the sample status will be set.
+    :type method_name: str
+    :param min_voting_loci: Minimum number of voting loci (stable + unstable) to determine the sample status.
+    :type min_voting_loci: float
+    :param instability_ratio: If the ratio unstable/(stable + unstable) is superior than this value the status of the sample will be unstable otherwise it will be stable.
+    :type instability_ratio: float
+    :param undetermined_weight: The weight of the undetermined loci in sample score calculation.
+    :type undetermined_weight: float
+    :param locus_weight_is_score: Use the prediction score of each locus as wheight of this locus in sample prediction score calculation.
+    :type locus_weight_is_score: bool
+    :param model_md5: Checksum of the model used in loci classification.
+    :type model_md5: str
+    """
+    for spl in samples:
+        spl.setStatusByInstabilityRatio(method_name, min_voting_loci, instability_ratio)
+        spl.setScore(method_name, undetermined_weight, locus_weight_is_score)
+        spl.results[method_name].param["model_md5"] = model_md5
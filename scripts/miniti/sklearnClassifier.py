@@ -0,0 +1,407 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2018 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.6.1'
+
+from anacore.msi.base import LocusClassifier, Status
+from anacore.msi.locus import LocusRes
+import json
+import logging
+import multiprocessing
+from miniti.lengths import getCountsMatrix, getPrctFeatures, getPrctMatrix
+from miniti.model import getLocusTrainData, getModelLociIds, openModel, shareModel
+import os
+import pickle
+from sklearn.tree import DecisionTreeClassifier as DecisionTree
+from sklearn.neighbors import KNeighborsClassifier as KNeighbors
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier as RandomForest
+from sklearn.svm import SVC
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def _classifyLocus(task):
+    """
+    Return predicted classes and scores for the evaluated lengths distributions of one locus. The classifier is fitted before prediction if it is not pre-fitted. This function is executed by the workers of setLociStatus().
+
+    :param task: The locus classifier (fitted or not), the path to the model and the lengths distributions to classify.
+    :type task: (SklearnClassifier, str, list)
+    :return: The fitted classifier, the predicted class and the score of this class by lengths distribution (see SklearnClassifier.predictLengths()).
+    :rtype: (SklearnClassifier, list, list)
+    """
+    locus_clf, model_path, test_lengths = task
+    if not locus_clf.isFitted():
+        train_data = getLocusTrainData(model_path, locus_clf.locus_id)
+        if train_data is None:
+            raise Exception("The model does not contain any sample with known status and reads/fragments for the locus {}.".format(locus_clf.locus_id))
+        locus_clf.fitFeatures(train_data["features"], train_data["labels"], train_data["min_len"], train_data["max_len"])
+    return (locus_clf, *locus_clf.predictLengths(test_lengths))
+
+
+def _fitLocus(task):
+    """
+    Return classifier fitted on model for one locus. None is returned if the model does not contain any sample with known status and reads/fragments for this locus. This function is executed by the workers of fitClassifiers().
+
+    :param task: The locus classifier and the path to the model.
+    :type task: (SklearnClassifier, str)
+    :return: The fitted classifier.
+    :rtype: SklearnClassifier
+    """
+    locus_clf, model_path = task
+    train_data = getLocusTrainData(model_path, locus_clf.locus_id)
+    if train_data is None:
+        return None
+    locus_clf.fitFeatures(train_data["features"], train_data["labels"], train_data["min_len"], train_data["max_len"])
+    return locus_clf
+
+
+def fitClassifiers(model_path, loci_ids, clf="SVC", clf_params=None, threads=1):
+    """
+    Return classifiers fitted on model for each locus. Loci without sample with known status and reads/fragments in model are missing in result.
+
+    :param model_path: Path to the file containing the references samples used in learn step (format: MSIReport or binary model folder).
+    :type model_path: str
+    :param loci_ids: The loci IDs.
+    :type loci_ids: list
+    :param clf: The classifier name.
+    :type clf: str
+    :param clf_params: The classifier parameters.
+    :type clf_params: dict
+    :param threads: Number of processes used to fit loci.
+    :type threads: int
+    :return: Fitted classifier by locus ID.
+    :rtype: dict
+    """
+    tasks = [(SklearnClassifier(locus_id, clf, "model", clf, clf_params), model_path) for locus_id in loci_ids]
+    if threads > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(min(threads, len(tasks)), initializer=shareModel, initargs=(openModel(model_path),)) as pool:  # Workers receive the model index
+            fitted = pool.map(_fitLocus, tasks, chunksize=1)
+    else:
+        fitted = map(_fitLocus, tasks)
+    return {
+        locus_id: locus_clf for locus_id, locus_clf in zip(loci_ids, fitted) if locus_clf is not None
+    }
+
+
+def getEstimatorKey(locus_id, clf, clf_params, random_seed):
+    """
+    Return key used to store a fitted classifier in estimators bundle.
+
+    :param locus_id: The locus ID.
+    :type locus_id: str
+    :param clf: The classifier name.
+    :type clf: str
+    :param clf_params: The classifier parameters provided by user.
+    :type clf_params: dict
+    :param random_seed: The seed used by the random number generator in the classifier.
+    :type random_seed: int
+    :return: Key used to store a fitted classifier in estimators bundle.
+    :rtype: str
+    """
+    return json.dumps(
+        {"locus": locus_id, "classifier": clf, "params": clf_params, "seed": random_seed},
+        sort_keys=True
+    )
+
+
+def getLengthsPrct(lengths, min_len, max_len):
+    """
+    Return percentage of reads/fragments by length between min_len and max_len.
+
+    :param lengths: The lengths distribution.
+    :type lengths: anacore.msi.locus.LocusDataDistrib
+    :param min_len: The first length of the range.
+    :type min_len: int
+    :param max_len: The last length of the range.
+    :type max_len: int
+    :return: Percentage of reads/fragments by length (one value by length from min_len to max_len).
+    :rtype: numpy.ndarray
+    """
+    return getPrctMatrix([lengths], min_len, max_len)[0]
+
+
+def loadEstimators(path, model_md5):
+    """
+    Return fitted classifiers by key from estimators bundle. If the bundle has been produced from another model, no classifier is returned.
+
+    :param path: Path to the estimators bundle (format: pickle).
+    :type path: str
+    :param model_md5: Checksum of the model currently used.
+    :type model_md5: str
+    :return: Fitted classifiers by key (see getEstimatorKey) and loci IDs of the model.
+    :rtype: (dict, list)
+    """
+    log = logging.getLogger(__name__)
+    if path is None or not os.path.exists(path):
+        log.warning("Estimators bundle is missing, classifiers will be fitted.")
+        return {}, None
+    with open(path, "rb") as reader:
+        bundle = pickle.load(reader)
+    if bundle["model_md5"] != model_md5:
+        log.warning(
+            "Estimators bundle {} has been produced from another model (md5 {} vs {}), classifiers will be fitted.".format(
+                path, bundle["model_md5"], model_md5
+            )
+        )
+        return {}, None
+    return bundle["classifiers"], bundle["loci"]
+
+
+def setLociStatus(test_dataset, model_path, model_md5, data_method, status_method, min_depth=60, clf="SVC", clf_params=None, random_seed=None, estimators_path=None, threads=1, fitted_by_key=None):
+    """
+    Predict stability classes and scores for loci using an sklearn classifier. Each locus classifier is fitted or loaded only once for all the evaluated samples. With several threads loci are classified concurrently by a pool of processes, each locus classifier keeps its own random state so results do not depend on the number of threads.
+
+    :param test_dataset: Evaluated samples.
+    :type test_dataset: list of anacore.msi.sample.MSISample
+    :param model_path: Path to the file containing the references samples used in learn step (format: MSIReport or binary model folder).
+    :type model_path: str
+    :param model_md5: Checksum of the model.
+    :type model_md5: str
+    :param data_method: The name of the method storing locus metrics.
+    :type data_method: str
+    :param status_method: The name of the method where the status will be set.
+    :type status_method: str
+    :param min_depth: The minimum numbers of reads or fragments to determine the status.
+    :type min_depth: int
+    :param clf: The classifier name.
+    :type clf: str
+    :param clf_params: The classifier parameters.
+    :type clf_params: dict
+    :param random_seed: The seed used by the random number generator in the classifier.
+    :type random_seed: int
+    :param estimators_path: Path to the classifiers pre-fitted on model in learn step (format: pickle).
+    :type estimators_path: str
+    :param threads: Number of processes used to fit and predict loci.
+    :type threads: int
+    :param fitted_by_key: Fitted classifiers by key (see getEstimatorKey) shared between calls. When it is provided the estimators bundle is not loaded and the classifiers fitted by this call are added in it.
+    :type fitted_by_key: dict
+    """
+    loci_ids = None
+    if fitted_by_key is None:
+        fitted_by_key = dict()
+        if estimators_path is not None:
+            fitted_by_key, loci_ids = loadEstimators(estimators_path, model_md5)
+    if loci_ids is None:
+        loci_ids = getModelLociIds(model_path)
+    tasks = list()
+    tasks_results = list()
+    for locus_id in loci_ids:
+        # Select the samples with a sufficient number of fragment to classify distribution
+        evaluated_test_dataset = []
+        for spl in test_dataset:
+            locus = spl.loci[locus_id]
+            locus_data = locus.results[data_method].data
+            if data_method != status_method:  # Data come from another method
+                locus_data = {"lengths": locus_data["lengths"]}
+            locus.results[status_method] = LocusRes(
+                Status.undetermined, None, locus_data
+            )
+            if locus_data["lengths"].getCount() >= min_depth:
+                evaluated_test_dataset.append(locus.results[status_method])
+        # Classifier
+        if len(evaluated_test_dataset) != 0:
+            estimator_key = getEstimatorKey(locus_id, clf, clf_params, random_seed)
+            if estimator_key in fitted_by_key:  # Use classifier pre-fitted in learn step
+                locus_clf = fitted_by_key[estimator_key]
+            else:
+                locus_clf = SklearnClassifier(locus_id, status_method, "model", clf, clf_params)
+            tasks_results.append(evaluated_test_dataset)
+            tasks.append((locus_clf, model_path, [locus_res.data["lengths"] for locus_res in evaluated_test_dataset]))
+    # Classify
+    if threads > 1 and len(tasks) > 1:
+        pool_kwargs = dict()
+        if any(not locus_clf.isFitted() for locus_clf, task_model_path, test_lengths in tasks):  # Workers receive the model index
+            pool_kwargs = {"initializer": shareModel, "initargs": (openModel(model_path),)}
+        with multiprocessing.Pool(min(threads, len(tasks)), **pool_kwargs) as pool:
+            predictions = pool.map(_classifyLocus, tasks, chunksize=1)
+    else:
+        predictions = map(_classifyLocus, tasks)
+    for locus_results, (locus_clf, labels, scores) in zip(tasks_results, predictions):
+        fitted_by_key[getEstimatorKey(locus_clf.locus_id, clf, clf_params, random_seed)] = locus_clf
+        setResultsStatus(locus_results, labels, scores)
+
+
+def setResultsStatus(locus_results, labels, scores):
+    """
+    Set status and score for each locus result.
+
+    :param locus_results: Results of the evaluated loci.
+    :type locus_results: list of anacore.msi.locus.LocusRes
+    :param labels: Predicted class by result.
+    :type labels: list
+    :param scores: Score of the predicted class by result.
+    :type scores: list
+    """
+    for locus_res, label, score in zip(locus_results, labels, scores):
+        locus_res.status = label
+        locus_res.score = score
+
+
+def writeEstimators(path, classifier_by_key, loci_ids, model_md5):
+    """
+    Write fitted classifiers bundle.
+
+    :param path: Path to the output file (format: pickle).
+    :type path: str
+    :param classifier_by_key: Fitted classifiers by key (see getEstimatorKey).
+    :type classifier_by_key: dict
+    :param loci_ids: Loci IDs of the model.
+    :type loci_ids: list
+    :param model_md5: Checksum of the model used in fit.
+    :type model_md5: str
+    """
+    with open(path, "wb") as writer:
+        pickle.dump(
+            {"classifiers": classifier_by_key, "loci": loci_ids, "model_md5": model_md5},
+            writer
+        )
+
+
+########################################################################
+#
+# CLASSES
+#
+########################################################################
+class SklearnClassifier(LocusClassifier):
+    """
+    Classifier for one locus based on an sklearn estimator. Features are the percentages of reads/fragments by length on the lengths range observed in model, in float64 as in anacore.msi.locus.LocusDataDistrib.getDensePrct().
+
+    Once fitted the classifier keeps only the estimator and the lengths range, it can be pickled and applied without model.
+    """
+
+    def __init__(self, locus_id, method_name="MIAmS", model_method_name="model", clf="SVC", clf_params=None):
+        clf_params = {} if clf_params is None else dict(clf_params)
+        clf_obj = self._getClassifier(clf, clf_params)
+        super().__init__(locus_id, method_name, clf_obj, model_method_name)
+        self.min_len = None
+        self.max_len = None
+
+    def _getClassifier(self, clf, clf_params):
+        clf_obj = None
+        if clf == "SVC":  # The argument "probability" must be set to True to use predict_proba()
+            clf_params["probability"] = True
+            clf_params["gamma"] = "auto"
+            clf_obj = SVC(**clf_params)
+        elif clf == "KNeighbors":  # The KNeighbors does not accept the argument "random_state"
+            if "n_neighbors" in clf_params:
+                clf_params["n_neighbors"] = 2
+            if "random_state" in clf_params:
+                del clf_params["random_state"]
+            clf_obj = KNeighbors(**clf_params)
+        else:
+            try:
+                clf_obj = globals()[clf](**clf_params)
+            except Exception:
+                raise Exception('The classifier "{}" is not implemented in MIAmSClassifier.'.format(clf))
+        return clf_obj
+
+    def _getFeatures(self, lengths_distribs):
+        """
+        Return features matrix from lengths distributions.
+
+        :param lengths_distribs: Lengths distributions.
+        :type lengths_distribs: list of anacore.msi.locus.LocusDataDistrib
+        :return: Features matrix (one row by distribution).
+        :rtype: numpy.ndarray
+        """
+        return getPrctMatrix(lengths_distribs, self.min_len, self.max_len)
+
+    def fit(self, train_results):
+        """
+        Fit estimator on model results with known status for the locus.
+
+        :param train_results: The locus results with known status (stable or unstable).
+        :type train_results: list of anacore.msi.locus.LocusRes
+        """
+        counts, min_len = getCountsMatrix([locus_res.data["lengths"] for locus_res in train_results])
+        features = getPrctFeatures(counts, min_len)
+        if features is None:
+            raise Exception("The training data for the locus {} does not contain any read/fragment.".format(self.locus_id))
+        self.fitFeatures(features[0], [locus_res.status for locus_res in train_results], features[1], features[2])
+
+    def fitFeatures(self, features, labels, min_len, max_len):
+        """
+        Fit estimator on features matrix (see miniti.model.getLocusTrainData()).
+
+        :param features: Percentages of reads/fragments by length from min_len to max_len (one row by sample).
+        :type features: numpy.ndarray
+        :param labels: Status of each sample.
+        :type labels: list
+        :param min_len: The first length of the features.
+        :type min_len: int
+        :param max_len: The last length of the features.
+        :type max_len: int
+        """
+        self.min_len = min_len
+        self.max_len = max_len
+        self.classifier.fit(features, labels)
+
+    def isFitted(self):
+        """
+        Return True if the estimator has been fitted.
+
+        :return: True if the estimator has been fitted.
+        :rtype: bool
+        """
+        return self.min_len is not None
+
+    def predictLengths(self, lengths_distribs):
+        """
+        Return predicted class and score for each lengths distribution of the locus. As in anacore.msi.base.LocusClassifier.set_status(), the class comes from the estimator predict() and the score is the probability of this class rounded to 6 decimals (None if the estimator cannot return probabilities).
+
+        :param lengths_distribs: Lengths distributions of the locus.
+        :type lengths_distribs: list of anacore.msi.locus.LocusDataDistrib
+        :return: Predicted class by distribution and score of this class by distribution.
+        :rtype: (list, list)
+        """
+        features = self._getFeatures(lengths_distribs)
+        labels = [str(label) for label in self.classifier.predict(features)]
+        scores = None
+        proba_idx_by_label = {str(label): idx for idx, label in enumerate(self.classifier.classes_)}
+        try:
+            proba = self.classifier.predict_proba(features)
+            scores = [float(round(spl_proba[proba_idx_by_label[spl_label]], 6)) for spl_proba, spl_label in zip(proba, labels)]
+        except Exception:
+            scores = [None for spl_label in labels]
+        return labels, scores
+
+    def predictLengthsProba(self, lengths_distribs):
+        """
+        Return probability of each class for each lengths distribution of the locus.
+
+        :param lengths_distribs: Lengths distributions of the locus.
+        :type lengths_distribs: list of anacore.msi.locus.LocusDataDistrib
+        :return: Probability of each class (see self.classifier.classes_) by distribution.
+        :rtype: numpy.ndarray
+        """
+        return self.classifier.predict_proba(self._getFeatures(lengths_distribs))
+
+    def predict_proba(self, test_dataset):
+        """
+        Return probability of each class for the locus of each sample.
+
+        :param test_dataset: The evaluated samples.
+        :type test_dataset: list of anacore.msi.sample.MSISample
+        :return: Probability of each class (see self.classifier.classes_) by sample.
+        :rtype: numpy.ndarray
+        """
+        return self.predictLengthsProba(
+            [spl.loci[self.locus_id].results[self.method_name].data["lengths"] for spl in test_dataset]
+        )
+
+    def set_status(self, test_dataset):
+        """
+        Set status and score for the locus of each sample (see predictLengths()).
+
+        :param test_dataset: The evaluated samples.
+        :type test_dataset: list of anacore.msi.sample.MSISample
+        """
+        locus_results = [spl.loci[self.locus_id].results[self.method_name] for spl in test_dataset]
+        setResultsStatus(
+            locus_results,
+            *self.predictLengths([locus_res.data["lengths"] for locus_res in locus_results])
+        )
@@ -3,13 +3,14 @@
 __author__ = 'Frederic Escudie'
 __copyright__ = 'Copyright (C) 2023 CHU Toulouse'
 __license__ = 'GNU General Public License'
-__version__ = '1.0.0'
+__version__ = '1.4.1'
 
-from anacore.msi.base import Status
-from anacore.msi.reportIO import ReportIO
 import argparse
 import json
 import logging
+from miniti.baseline import loadBaselines
+from miniti.metrics import ScriptMetrics
+from miniti.model import getModelChecksum, getModelLociIds, getModelStablePeaks
 import os
 import sys
 
@@ -19,35 +20,47 @@ import sys
 # FUNCTIONS
 #
 ########################################################################
-def getHigherPeakByLocus(models, min_support_reads=0):
+def getHigherPeakByLocus(models, min_support_reads=0, baselines_path=None):
     """
-    Return length of the higher peak of each model by locus.
+    Return length of the higher peak of each stable model by locus. When several lengths have the higher count, the longest is selected.
 
-    :param models: The list of MSIReport representing the models (status known and stored in Expected result).
-    :type models: list
+    :param models: Path to the model (format: MSIReport or binary model folder). Status are known and stored in "model" result.
+    :type models: str
     :param min_support_reads: The minimum number of reads on locus to use the stability status of the current model.
     :type min_support_reads: int
-    :return: By locus the list of higher peak length.
+    :param baselines_path: Path to the baselines computed from model in learn step (format: JSON). With this file the model samples are not read.
+    :type baselines_path: str
+    :return: By locus the list of higher peak length. Loci are in model order.
     :rtype: dict
     """
-    higher_by_locus = {}
-    models_samples = ReportIO.parse(models)
-    for curr_spl in models_samples:
-        for locus_id, curr_locus in curr_spl.loci.items():
-            if locus_id not in higher_by_locus:
-                higher_by_locus[locus_id] = []
-            if "model" in curr_locus.results:
-                locus_res = curr_locus.results["model"]
-                if locus_res.status == Status.stable and locus_res.data["lengths"].getCount() > min_support_reads / 2:
-                    max_peak = None
-                    max_count = -1
-                    for length, count in locus_res.data["lengths"].items():
-                        if count >= max_count:  # "=" for select the tallest
-                            max_count = count
-                            max_peak = int(length)
-                    higher_by_locus[locus_id].append(max_peak)
-            higher_by_locus[locus_id] = sorted(higher_by_locus[locus_id])
-    return higher_by_locus
+    peaks_by_locus = None
+    if baselines_path is not None:
+        baselines = loadBaselines(baselines_path, getModelChecksum(models))
+        if baselines is not None:
+            if all("stable_peaks" in locus_baseline for locus_baseline in baselines.values()):
+                peaks_by_locus = {locus_id: locus_baseline["stable_peaks"] for locus_id, locus_baseline in baselines.items()}
+            else:
+                log = logging.getLogger(__name__)
+                log.warning("Baselines file {} does not contain stable peaks, they will be computed from model.".format(baselines_path))
+    if peaks_by_locus is None:
+        peaks_by_locus = getModelStablePeaks(models)
+    return {
+        locus_id: [length for length, support in peaks_by_locus[locus_id] if support > min_support_reads / 2]  # Already sorted by length
+        for locus_id in getModelLociIds(models, sort=False)
+    }
+
+
+def writeAsset(higher_peaks_by_locus, out_path):
+    """
+    Write the peaks by locus in a JavaScript file defining the variable MODEL_PEAKS. This file is shared by the samples HTML reports of the run and can be loaded from local files by a script tag.
+
+    :param higher_peaks_by_locus: By locus the list of higher peak length (see getHigherPeakByLocus()).
+    :type higher_peaks_by_locus: dict
+    :param out_path: Path to the outputted file (format: JS).
+    :type out_path: str
+    """
+    with open(out_path, "w") as writer:
+        writer.write("var MODEL_PEAKS = {};\n".format(json.dumps(higher_peaks_by_locus)))
 
 
 ########################################################################
@@ -61,9 +74,11 @@ if __name__ == "__main__":
     parser.add_argument('-s', '--min-support', default=0, type=int, help='Minimum number of reads/fragments in size distribution to keep a model sample in the stable model peak retrieval process. [Default: %(default)s]')
     parser.add_argument('-v', '--version', action='version', version=__version__)
     group_input = parser.add_argument_group('Inputs')
-    group_input.add_argument('-m', '--input-model', required=True, help='Path to the model file (format: MSIReport).')
+    group_input.add_argument('-m', '--input-model', required=True, help='Path to the model file (format: MSIReport or binary model folder).')
+    group_input.add_argument('-b', '--input-baselines', help='Path to the baselines computed from model by microsatModelBaseline.py in learn step. With this file the model samples are not read (format: JSON).')
     group_output = parser.add_argument_group('Outputs')
     group_output.add_argument('-o', '--output-peaks', help='Path to the outputted the stable microsatellites most represented length by locus from model (format: JSON).')
+    group_output.add_argument('-a', '--output-asset', help='Path to the outputted the stable microsatellites most represented length by locus from model shared by the samples HTML reports (format: JS). See --model-peaks-asset in wfSplReport.py.')
     args = parser.parse_args()
 
     # Logger
@@ -73,7 +88,14 @@ if __name__ == "__main__":
     log.info("Command: " + " ".join(sys.argv))
 
     # Process
-    higher_peaks_by_locus = getHigherPeakByLocus(args.input_model, args.min_support)
-    with open(args.output_peaks, "w") as writer:
-        json.dump(higher_peaks_by_locus, writer)
+    metrics = ScriptMetrics(os.path.basename(__file__))
+    with metrics.stage("peaks") as stage:
+        higher_peaks_by_locus = getHigherPeakByLocus(args.input_model, args.min_support, args.input_baselines)
+        stage["nb_items"] = len(higher_peaks_by_locus)
+    with metrics.stage("write", 1):
+        with open(args.output_peaks, "w") as writer:
+            json.dump(higher_peaks_by_locus, writer)
+        if args.output_asset is not None:
+            writeAsset(higher_peaks_by_locus, args.output_asset)
+    metrics.write(args.output_peaks)
     log.info("End of job")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import sys
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def getMetricsPaths(inputs_metrics):
+    """
+    Return paths to the metrics files. Folders are scanned recursively for files ending with "_metrics.json".
+
+    :param inputs_metrics: Paths to metrics files or to folders containing these files.
+    :type inputs_metrics: list
+    :return: Paths to the metrics files.
+    :rtype: list
+    """
+    metrics_paths = list()
+    for path in inputs_metrics:
+        if os.path.isdir(path):
+            metrics_paths.extend(sorted(glob.glob(os.path.join(path, "**", "*_metrics.json"), recursive=True)))
+        else:
+            metrics_paths.append(path)
+    return metrics_paths
+
+
+def getJobsRows(metrics_paths):
+    """
+    Return one row by job (stage "total") and by stage of job.
+
+    :param metrics_paths: Paths to the metrics files (format: JSON).
+    :type metrics_paths: list
+    :return: Rows with keys script, output, stage, nb_items, wall_time, cpu_time, children_cpu_time, peak_rss and traced_peak.
+    :rtype: list
+    """
+    rows = list()
+    for path in metrics_paths:
+        with open(path) as reader:
+            job = json.load(reader)
+        rows.append({
+            "script": job["script"],
+            "output": job["output"],
+            "stage": "total",
+            "nb_items": None,
+            "wall_time": job["wall_time"],
+            "cpu_time": job["cpu_time"],
+            "children_cpu_time": job["children_cpu_time"],
+            "peak_rss": job["peak_rss"],
+            "traced_peak": None
+        })
+        for stage in job["stages"]:
+            rows.append({
+                "script": job["script"],
+                "output": job["output"],
+                "stage": stage["name"],
+                "nb_items": stage["nb_items"],
+                "wall_time": stage["wall_time"],
+                "cpu_time": stage["cpu_time"],
+                "children_cpu_time": None,
+                "peak_rss": stage["peak_rss"],
+                "traced_peak": stage.get("traced_peak")
+            })
+    return rows
+
+
+def getRunRows(jobs_rows):
+    """
+    Return one row by script and stage summarizing the jobs of the run.
+
+    :param jobs_rows: Rows by job and stage (see getJobsRows()).
+    :type jobs_rows: list
+    :return: Rows with keys script, stage, nb_jobs, nb_items, wall_time_sum, wall_time_max, cpu_time_sum, children_cpu_time_sum and peak_rss_max.
+    :rtype: list
+    """
+    row_by_key = dict()
+    for job_row in jobs_rows:
+        key = (job_row["script"], job_row["stage"])
+        if key not in row_by_key:
+            row_by_key[key] = {
+                "script": job_row["script"],
+                "stage": job_row["stage"],
+                "nb_jobs": 0,
+                "nb_items": None,
+                "wall_time_sum": 0,
+                "wall_time_max": 0,
+                "cpu_time_sum": 0,
+                "children_cpu_time_sum": None,
+                "peak_rss_max": 0
+            }
+        run_row = row_by_key[key]
+        run_row["nb_jobs"] += 1
+        if job_row["nb_items"] is not None:
+            run_row["nb_items"] = job_row["nb_items"] + (0 if run_row["nb_items"] is None else run_row["nb_items"])
+        run_row["wall_time_sum"] += job_row["wall_time"]
+        run_row["wall_time_max"] = max(run_row["wall_time_max"], job_row["wall_time"])
+        run_row["cpu_time_sum"] += job_row["cpu_time"]
+        if job_row["children_cpu_time"] is not None:
+            run_row["children_cpu_time_sum"] = job_row["children_cpu_time"] + (0 if run_row["children_cpu_time_sum"] is None else run_row["children_cpu_time_sum"])
+        run_row["peak_rss_max"] = max(run_row["peak_rss_max"], job_row["peak_rss"])
+    return sorted(row_by_key.values(), key=lambda row: row["script"])  # Stages stay in execution order
+
+
+def writeRows(rows, out_path):
+    """
+    Write rows in TSV file. None values are written as empty fields.
+
+    :param rows: The rows.
+    :type rows: list
+    :param out_path: Path to the output file (format: TSV).
+    :type out_path: str
+    """
+    with open(out_path, "w", newline="") as writer:
+        if len(rows) == 0:
+            return
+        tsv_writer = csv.DictWriter(writer, fieldnames=list(rows[0]), delimiter="\t", lineterminator="\n")
+        tsv_writer.writeheader()
+        for row in rows:
+            tsv_writer.writerow({key: ("" if val is None else val) for key, val in row.items()})
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    # Manage parameters
+    parser = argparse.ArgumentParser(description="Aggregate the metrics written by the workflow scripts next to their outputs (files *_metrics.json) in a run-wide performance table.")
+    parser.add_argument('-v', '--version', action='version', version=__version__)
+    group_input = parser.add_argument_group('Inputs')
+    group_input.add_argument('-i', '--inputs-metrics', required=True, nargs='+', help='Paths to metrics files or to folders scanned recursively for files ending with "_metrics.json" (format: JSON).')
+    group_output = parser.add_argument_group('Outputs')
+    group_output.add_argument('-o', '--output-table', required=True, help='Path to the table with one row by script and stage summarizing the jobs of the run (format: TSV).')
+    group_output.add_argument('-d', '--output-details', help='Path to the table with one row by job and stage of job (format: TSV).')
+    args = parser.parse_args()
+
+    # Logger
+    logging.basicConfig(format='%(asctime)s - %(name)s [%(levelname)s] %(message)s')
+    log = logging.getLogger(os.path.basename(__file__))
+    log.setLevel(logging.INFO)
+    log.info("Command: " + " ".join(sys.argv))
+
+    # Process
+    metrics_paths = getMetricsPaths(args.inputs_metrics)
+    log.info("{} metrics files found.".format(len(metrics_paths)))
+    jobs_rows = getJobsRows(metrics_paths)
+    writeRows(getRunRows(jobs_rows), args.output_table)
+    if args.output_details is not None:
+        writeRows(jobs_rows, args.output_details)
+    log.info("End of job")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def getResourcesHash(folder):
+    """
+    Return hash of the relative paths and of the content of the files in folder.
+
+    :param folder: Path to the resources folder.
+    :type folder: str
+    :return: The SHA-256 hexadecimal digest.
+    :rtype: str
+    """
+    folder_hash = hashlib.sha256()
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for filename in sorted(files):
+            filepath = os.path.join(root, filename)
+            folder_hash.update(os.path.relpath(filepath, folder).encode("utf-8") + b"\0")
+            with open(filepath, "rb") as reader:
+                for chunk in iter(lambda: reader.read(1024 * 1024), b""):
+                    folder_hash.update(chunk)
+            folder_hash.update(b"\0")
+    return folder_hash.hexdigest()
+
+
+def getStoredResources(in_folder, store_folder):
+    """
+    Return path to the copy of the resources in the shared store. The copy is named by the hash of the resources content and is created only if it does not exist.
+
+    :param in_folder: Path to the resources folder.
+    :type in_folder: str
+    :param store_folder: Path to the folder containing resources shared by the reports of several runs.
+    :type store_folder: str
+    :return: Path to the resources in store.
+    :rtype: str
+    """
+    stored_folder = os.path.join(store_folder, getResourcesHash(in_folder)[:16])
+    if not os.path.exists(stored_folder):
+        os.makedirs(store_folder, exist_ok=True)
+        tmp_folder = tempfile.mkdtemp(dir=store_folder, prefix=".tmp_")
+        try:
+            shutil.copytree(in_folder, os.path.join(tmp_folder, "resources"))
+            try:
+                os.rename(os.path.join(tmp_folder, "resources"), stored_folder)
+            except OSError:  # Created by another run in the meantime
+                if not os.path.exists(stored_folder):
+                    raise
+        finally:
+            shutil.rmtree(tmp_folder)
+    return stored_folder
+
+
+def linkOrCopy(src, dst):
+    """
+    Create hard link dst on src or copy src in dst if the link is impossible (example: different file systems).
+
+    :param src: Path to the source file.
+    :type src: str
+    :param dst: Path to the destination.
+    :type dst: str
+    :return: Path to the destination.
+    :rtype: str
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+def setResources(in_folder, out_folder, mode="copy"):
+    """
+    Set resources folder of a report.
+
+    :param in_folder: Path to the resources folder.
+    :type in_folder: str
+    :param out_folder: Path to the resources folder of the report.
+    :type out_folder: str
+    :param mode: "copy" to copy files, "hardlink" to create hard links on files or "symlink" to create relative symbolic link on folder.
+    :type mode: str
+    """
+    if mode == "copy":
+        shutil.copytree(in_folder, out_folder)
+    elif mode == "hardlink":
+        shutil.copytree(in_folder, out_folder, copy_function=linkOrCopy)
+    elif mode == "symlink":
+        os.symlink(
+            os.path.relpath(os.path.realpath(in_folder), os.path.realpath(os.path.dirname(os.path.abspath(out_folder)))),
+            out_folder
+        )
+    else:
+        raise Exception('The mode "{}" is invalid for setting resources.'.format(mode))
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    # Manage parameters
+    parser = argparse.ArgumentParser(description="Set web resources of the HTML reports. Resources can be copied in reports folder or stored once in a shared folder, named by their content hash, and linked from the reports folder.")
+    parser.add_argument('-m', '--mode', default="copy", choices=["copy", "hardlink", "symlink"], help='With "copy" the report folder is portable. With "hardlink" the files are hard links on the stored resources (copied if the link is impossible). With "symlink" the resources folder is a relative symbolic link on the stored resources. [Default: %(default)s]')
+    parser.add_argument('-v', '--version', action='version', version=__version__)
+    group_input = parser.add_argument_group('Inputs')
+    group_input.add_argument('-i', '--input-resources', required=True, help='Path to the resources folder.')
+    group_input.add_argument('-s', '--resources-store', help='Path to the folder containing resources shared by the reports of several runs. It is required with "symlink" mode.')
+    group_output = parser.add_argument_group('Outputs')
+    group_output.add_argument('-o', '--output-resources', required=True, help='Path to the outputted resources folder of the report.')
+    args = parser.parse_args()
+    if args.mode == "symlink" and args.resources_store is None:
+        parser.error('--resources-store is required with "symlink" mode.')
+
+    # Logger
+    logging.basicConfig(format='%(asctime)s - %(name)s [%(levelname)s] %(message)s')
+    log = logging.getLogger(os.path.basename(__file__))
+    log.setLevel(logging.INFO)
+    log.info("Command: " + " ".join(sys.argv))
+
+    # Process
+    resources_folder = args.input_resources
+    if args.resources_store is not None:
+        resources_folder = getStoredResources(args.input_resources, args.resources_store)
+        log.info("Resources stored in {}.".format(resources_folder))
+    os.makedirs(os.path.dirname(os.path.abspath(args.output_resources)), exist_ok=True)
+    setResources(resources_folder, args.output_resources, args.mode)
+    log.info("End of job")
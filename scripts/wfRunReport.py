@@ -3,14 +3,16 @@
 __author__ = 'Frederic Escudie'
 __copyright__ = 'Copyright (C) 2020 CHU Toulouse'
 __license__ = 'GNU General Public License'
-__version__ = '1.0.0'
+__version__ = '1.3.0'
 
 import os
 import sys
 import json
 import logging
 import argparse
-from anacore.msi.reportIO import ReportIO
+from miniti.metrics import ScriptMetrics
+from miniti.reportIO import getSamplesSummary, loadSummary, parseReport
+import multiprocessing
 
 
 ########################################################################
@@ -29,6 +31,58 @@ class ScoreClassAction(argparse.Action):
         setattr(namespace, self.dest, class_by_score)
 
 
+def getSummaryFromReport(report_path):
+    """
+    Return summary of the first sample of the report from its full parsing.
+
+    :param report_path: Path to the report (format: MSIReport).
+    :type report_path: str
+    :return: The sample summary (see miniti.reportIO.getSamplesSummary()).
+    :rtype: dict
+    """
+    return getSamplesSummary(parseReport(report_path)[:1])[0]
+
+
+def getSamplesRows(reports_paths, method_name, nb_threads=1):
+    """
+    Return the run table rows from the summaries written next to the reports. Reports without valid summary are fully parsed in parallel.
+
+    :param reports_paths: Pathes to MSI reports (format: MSIReport).
+    :type reports_paths: list
+    :param method_name: The name of the method storing results in MSISample.
+    :type method_name: str
+    :param nb_threads: Number of processes used to parse reports without summary.
+    :type nb_threads: int
+    :return: Rows of the run table and number of reports fully parsed.
+    :rtype: (list, int)
+    """
+    summary_by_path = dict()
+    missing_paths = list()
+    for curr_path in reports_paths:
+        report_summary = loadSummary(curr_path)
+        if report_summary is None:
+            missing_paths.append(curr_path)
+        else:
+            summary_by_path[curr_path] = report_summary[0]
+    if len(missing_paths) > 1 and nb_threads > 1:
+        with multiprocessing.Pool(min(nb_threads, len(missing_paths))) as pool:
+            summary_by_path.update(zip(missing_paths, pool.map(getSummaryFromReport, missing_paths)))
+    else:
+        summary_by_path.update(zip(missing_paths, map(getSummaryFromReport, missing_paths)))
+    samples = []
+    for curr_path in reports_paths:
+        spl_summary = summary_by_path[curr_path]
+        spl_res = spl_summary["results"][method_name]
+        samples.append({
+            "Name": spl_summary["name"],
+            "Rate": None if spl_res["nb_determined"] == 0 else spl_res["nb_unstable"] / spl_res["nb_determined"],
+            "Score": spl_res["score"],
+            "Status": spl_res["status"],
+            "Support": spl_res["nb_determined"]
+        })
+    return samples, len(missing_paths)
+
+
 def getTemplate():
     return """<html>
     <head>
@@ -143,9 +197,10 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Create HTML report for run.")
     parser.add_argument('-c', '--class-by-score', action=ScoreClassAction, default={0.70: "warning", 0.95: "good"}, help='Minimum score for each score class "warning, "succes" and "good" (format "warning:0.7 success:0.9". The others values have the class "danger". [Default: %(default)s]')
     parser.add_argument('-m', '--classification-method-name', default="SVC", help='The name of the method storing results in MSISample. [Default: %(default)s]')
+    parser.add_argument('-t', '--threads', default=1, type=int, help='Number of processes used to parse the reports without summary (see miniti.reportIO.writeReport()). [Default: %(default)s]')
     parser.add_argument('-v', '--version', action='version', version=__version__)
     group_input = parser.add_argument_group('Inputs')
-    group_input.add_argument('-r', '--inputs-report', required=True, nargs='+', help='Pathes to MSI reports (format: MSIReport).')
+    group_input.add_argument('-r', '--inputs-report', required=True, nargs='+', help='Pathes to MSI reports, compressed with gzip or zstd or not (format: MSIReport). The summaries written next to the reports by classification scripts are used instead of the reports when they are up to date.')
     group_output = parser.add_argument_group('Outputs')
     group_output.add_argument('-o', '--output-report', help='Path to the outputted report file (format: HTML).')
     args = parser.parse_args()
@@ -157,20 +212,17 @@ if __name__ == "__main__":
     log.info("Command: " + " ".join(sys.argv))
 
     # Process
+    metrics = ScriptMetrics(os.path.basename(__file__))
     report_content = getTemplate()
     report_content = report_content.replace("##report_version##", __version__)
     report_content = report_content.replace("##class_by_score##", json.dumps(args.class_by_score))
-    samples = []
-    for curr_report in args.inputs_report:
-        msi_spl = ReportIO.parse(curr_report)[0]
-        samples.append({
-            "Name": msi_spl.name,
-            "Rate": None if msi_spl.getNbDetermined(args.classification_method_name) == 0 else msi_spl.getNbUnstable(args.classification_method_name) / msi_spl.getNbDetermined(args.classification_method_name),
-            "Score": msi_spl.results[args.classification_method_name].score,
-            "Status": msi_spl.results[args.classification_method_name].status,
-            "Support": msi_spl.getNbDetermined(args.classification_method_name)
-        })
-    report_content = report_content.replace("##samples##", json.dumps(samples))
-    with open(args.output_report, "w") as writer:
-        writer.write(report_content)
+    with metrics.stage("parse", len(args.inputs_report)):
+        samples, nb_parsed = getSamplesRows(args.inputs_report, args.classification_method_name, args.threads)
+    if nb_parsed != 0:
+        log.info("{}/{} reports without summary have been fully parsed.".format(nb_parsed, len(args.inputs_report)))
+    with metrics.stage("write", 1):
+        report_content = report_content.replace("##samples##", json.dumps(samples))
+        with open(args.output_report, "w") as writer:
+            writer.write(report_content)
+    metrics.write(args.output_report)
     log.info("End of job")
@@ -3,13 +3,15 @@
 __author__ = 'Frederic Escudie'
 __copyright__ = 'Copyright (C) 2020 CHU Toulouse'
 __license__ = 'GNU General Public License'
-__version__ = '1.0.0'
+__version__ = '1.3.0'
 
 import os
 import sys
 import json
 import logging
 import argparse
+from miniti.compression import loadJSON
+from miniti.metrics import ScriptMetrics
 
 
 ########################################################################
@@ -17,6 +19,52 @@ import argparse
 # FUNCTIONS
 #
 ########################################################################
+def getLociData(report_data):
+    """
+    Remove lengths distributions from the report and return them by locus. The distributions shared by several methods are stored once and each result keeps its number of reads in data["support"].
+
+    :param report_data: The report loaded from MSIReport file. It is modified in place.
+    :type report_data: list
+    :return: By locus ID the distinct distributions ("distribs") and by sample index the index of the distribution of each method ("idx_by_method").
+    :rtype: dict
+    """
+    data_by_locus = dict()
+    for spl_idx, spl in enumerate(report_data):
+        for locus_id, locus in spl["loci"].items():
+            if locus_id not in data_by_locus:
+                data_by_locus[locus_id] = {"distribs": [], "idx_by_method": [dict() for spl in report_data]}
+            locus_data = data_by_locus[locus_id]
+            distrib_idx_by_key = {json.dumps(distrib, sort_keys=True): idx for idx, distrib in enumerate(locus_data["distribs"])}
+            for method_name, method_res in locus["results"].items():
+                if method_res.get("data") is not None and "lengths" in method_res["data"]:
+                    lengths = method_res["data"].pop("lengths")
+                    method_res["data"]["support"] = sum(lengths["ct_by_len"].values())
+                    lengths_key = json.dumps(lengths, sort_keys=True)
+                    if lengths_key not in distrib_idx_by_key:
+                        distrib_idx_by_key[lengths_key] = len(locus_data["distribs"])
+                        locus_data["distribs"].append(lengths)
+                    locus_data["idx_by_method"][spl_idx][method_name] = distrib_idx_by_key[lengths_key]
+    return data_by_locus
+
+
+def getLociDataBlocks(data_by_locus):
+    """
+    Return HTML blocks containing the lengths distributions of each locus. These JSON blocks are parsed by the report only when the locus graph is displayed.
+
+    :param data_by_locus: By locus ID the distributions (see getLociData()).
+    :type data_by_locus: dict
+    :return: The HTML blocks.
+    :rtype: str
+    """
+    blocks = list()
+    for locus_id, locus_data in data_by_locus.items():
+        blocks.append('<script type="application/json" id="locus_data_{}">{}</script>'.format(
+            locus_id,
+            json.dumps(locus_data).replace("</", "<\\/")
+        ))
+    return "\n        ".join(blocks)
+
+
 def getTemplate():
     return """<html>
     <head>
@@ -47,6 +95,7 @@ def getTemplate():
         <link type="text/css" charset="utf8" rel="stylesheet" href="resources/webCmpt.min.css"></script>
         <script type="text/javascript" charset="utf8" src="resources/vue_2.6.10.min.js"></script>
         <script type="text/javascript" charset="utf8" src="resources/webCmpt.min.js"></script>
+        ##model_peaks_asset##
     </head>
     <body>
         <nav class="navbar fixed-top justify-content-center">
@@ -75,7 +124,42 @@ def getTemplate():
                 </div>
             </div>
         </div>
+        ##loci_data##
         <script>
+            // Lazy loading of lengths distributions
+            const loci_data = {}
+            function getLocusData(locus_id){
+                if(!loci_data.hasOwnProperty(locus_id)){
+                    loci_data[locus_id] = JSON.parse(document.getElementById("locus_data_" + locus_id).textContent)
+                }
+                return loci_data[locus_id]
+            }
+            function setLazyLengths(report){
+                report.forEach(function(spl, spl_idx){
+                    Object.keys(spl.loci).forEach(function(locus_id){
+                        const results = spl.loci[locus_id].results
+                        Object.keys(results).forEach(function(method){
+                            const data = results[method].data
+                            if(data && data.hasOwnProperty("support")){
+                                Object.defineProperty(data, "lengths", {
+                                    configurable: true,
+                                    enumerable: true,
+                                    get: function(){
+                                        const locus_data = getLocusData(locus_id)
+                                        return locus_data.distribs[locus_data.idx_by_method[spl_idx][method]]
+                                    }
+                                })
+                            }
+                        })
+                    })
+                })
+                return report
+            }
+            const getLengthsSupport = MSILocus.prototype.support
+            MSILocus.prototype.support = function(method){
+                const data = this.results[method].data
+                return data.hasOwnProperty("support") ? data.support : getLengthsSupport.call(this, method)
+            }
             // Navbar
             new Vue({
                 el: "nav.fixed-top",
@@ -96,7 +180,7 @@ def getTemplate():
                 },
                 methods: {
                     loadData: function(){
-                        this.msi = MSIReport.fromJSON(##msi_data##)
+                        this.msi = setLazyLengths(MSIReport.fromJSON(##msi_data##))
                     }
                 }
             })
@@ -117,8 +201,10 @@ if __name__ == "__main__":
     parser.add_argument('-s', '--sample-name', help='The sample name.')
     parser.add_argument('-v', '--version', action='version', version=__version__)
     group_input = parser.add_argument_group('Inputs')
-    group_input.add_argument('-i', '--input-report', required=True, help='Path to the MSI report file (format: MSIReport).')
-    group_input.add_argument('-p', '--input-stable-peaks', required=True, help='Path to the most represented lengths by locus from stable microsatellites model (format: JSON).')
+    group_input.add_argument('-i', '--input-report', required=True, help='Path to the MSI report file, compressed with gzip or zstd or not (format: MSIReport).')
+    group_peaks = group_input.add_mutually_exclusive_group(required=True)
+    group_peaks.add_argument('-p', '--input-stable-peaks', help='Path to the most represented lengths by locus from stable microsatellites model. Its content is included in the report (format: JSON).')
+    group_peaks.add_argument('-a', '--model-peaks-asset', help='Path to the most represented lengths by locus from stable microsatellites model shared by the reports of the run. This path must be relative to the outputted report (format: JS). See --output-asset in modelToStablePeaks.py.')
     group_output = parser.add_argument_group('Outputs')
     group_output.add_argument('-o', '--output-report', help='Path to the outputted report file (format: HTML).')
     args = parser.parse_args()
@@ -130,14 +216,25 @@ if __name__ == "__main__":
     log.info("Command: " + " ".join(sys.argv))
 
     # Process
-    report_content = getTemplate()
-    report_content = report_content.replace("##report_version##", __version__)
-    report_content = report_content.replace("##sample_name##", json.dumps(args.sample_name))
-    report_content = report_content.replace("##data_method##", args.data_method_name)
-    with open(args.input_stable_peaks) as reader_peaks:
-        report_content = report_content.replace("##model_peaks##", json.dumps(json.load(reader_peaks)))
-    with open(args.input_report) as reader:
-        report_content = report_content.replace("##msi_data##", json.dumps(json.load(reader)))
-    with open(args.output_report, "w") as writer:
-        writer.write(report_content)
+    metrics = ScriptMetrics(os.path.basename(__file__))
+    with metrics.stage("render", 1):
+        report_content = getTemplate()
+        report_content = report_content.replace("##report_version##", __version__)
+        report_content = report_content.replace("##sample_name##", json.dumps(args.sample_name))
+        report_content = report_content.replace("##data_method##", args.data_method_name)
+        if args.model_peaks_asset is not None:
+            report_content = report_content.replace("##model_peaks_asset##", '<script type="text/javascript" charset="utf8" src="{}"></script>'.format(args.model_peaks_asset))
+            report_content = report_content.replace("##model_peaks##", "MODEL_PEAKS")
+        else:
+            report_content = report_content.replace("##model_peaks_asset##", "")
+            with open(args.input_stable_peaks) as reader_peaks:
+                report_content = report_content.replace("##model_peaks##", json.dumps(json.load(reader_peaks)))
+        report_data = loadJSON(args.input_report)
+        data_by_locus = getLociData(report_data)
+        report_content = report_content.replace("##loci_data##", getLociDataBlocks(data_by_locus))
+        report_content = report_content.replace("##msi_data##", json.dumps(report_data))
+    with metrics.stage("write", 1):
+        with open(args.output_report, "w") as writer:
+            writer.write(report_content)
+    metrics.write(args.output_report)
     log.info("End of job")
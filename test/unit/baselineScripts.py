@@ -0,0 +1,229 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+from helpers import getEvaluatedSamples, MODEL_PATH  # Adds the scripts folder in sys.path
+from anacore.msi.base import LocusClassifier, Status
+from anacore.msi.locus import LocusRes
+from anacore.msi.msings import MSINGSEval
+from anacore.msi.msisensorpro import ProEval
+from anacore.msi.reportIO import ReportIO
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.svm import SVC
+from sklearn.tree import DecisionTreeClassifier
+
+
+"""
+Classifications of the evaluated samples of the test (see helpers.getEvaluatedSamples()) as done by the classifier scripts before their optimization. Each locus is classified from all the model samples with the classes of anacore: they are the references of the tests.
+"""
+
+
+def getBaselineEstimator(clf, random_seed):
+    """
+    Return the estimator built by microsatSklearnClassify.py.
+
+    :param clf: The classifier name.
+    :type clf: str
+    :param random_seed: The seed used by the random number generator in the classifier.
+    :type random_seed: int
+    :return: The estimator.
+    :rtype: sklearn estimator
+    """
+    if clf == "SVC":
+        return SVC(probability=True, gamma="auto", random_state=random_seed)
+    if clf == "KNeighbors":
+        return KNeighborsClassifier()
+    return {
+        "DecisionTree": DecisionTreeClassifier,
+        "LogisticRegression": LogisticRegression,
+        "RandomForest": RandomForestClassifier
+    }[clf](random_state=random_seed)
+
+
+def getGaussianNBProba(scores_by_status, score, status):
+    """
+    Return probability of the status for the score with a GaussianNB fitted on model scores (see getScore() in microsatMsingsClassify.py and microsatMSIsensorproProClassify.py).
+
+    :param scores_by_status: Scores of the model samples by status.
+    :type scores_by_status: dict
+    :param score: The evaluated score.
+    :type score: float
+    :param status: The predicted status.
+    :type status: str
+    :return: Probability of the status.
+    :rtype: float
+    """
+    scores = [[curr_score] for curr_score in scores_by_status[Status.stable]]
+    scores += [[curr_score] for curr_score in scores_by_status[Status.unstable]]
+    labels = [Status.stable for curr_score in scores_by_status[Status.stable]]
+    labels += [Status.unstable for curr_score in scores_by_status[Status.unstable]]
+    clf = GaussianNB()
+    clf.fit(scores, labels)
+    spl_proba = clf.predict_proba([[score]])[0]
+    idx_by_cls = {cls: idx for idx, cls in enumerate(clf.classes_)}
+    return spl_proba[idx_by_cls[status]]
+
+
+def getModelScores(locus_id, score_method, score_name, models):
+    """
+    Return scores of the model samples by status for the locus.
+
+    :param locus_id: The locus ID.
+    :type locus_id: str
+    :param score_method: Name of the data containing the score in model ("mSINGS" or "MSIsensor-pro").
+    :type score_method: str
+    :param score_name: Name of the score ("nb_peaks" or "pro_p").
+    :type score_name: str
+    :param models: The model samples.
+    :type models: list of anacore.msi.sample.MSISample
+    :return: Scores of the model samples by status and the data of the method in the last model sample.
+    :rtype: (dict, dict)
+    """
+    scores_by_status = {Status.stable: [], Status.unstable: []}
+    method_data = None
+    for curr_model in models:
+        if locus_id in curr_model.loci and "model" in curr_model.loci[locus_id].results:
+            model_res = curr_model.loci[locus_id].results["model"]
+            method_data = model_res.data[score_method]
+            if model_res.status in scores_by_status:
+                scores_by_status[model_res.status].append(method_data[score_name])
+    return scores_by_status, method_data
+
+
+def getStatus(samples, method_name):
+    """
+    Return status and score of loci and samples.
+
+    :param samples: Classified samples.
+    :type samples: list of anacore.msi.sample.MSISample
+    :param method_name: The name of the method storing the status.
+    :type method_name: str
+    :return: Status and score by sample name and locus ID (None for the sample).
+    :rtype: dict
+    """
+    status = dict()
+    for spl in samples:
+        status[(spl.name, None)] = (spl.results[method_name].status, spl.results[method_name].score)
+        for locus_id, locus in spl.loci.items():
+            status[(spl.name, locus_id)] = (locus.results[method_name].status, locus.results[method_name].score)
+    return status
+
+
+def setSamplesStatus(samples, method_name, min_voting_loci=0.5, instability_ratio=0.2, undetermined_weight=0, locus_weight_is_score=False):
+    """
+    Set status and score of samples as the classifier scripts (parameters default values are those of the scripts).
+
+    :param samples: Samples with classified loci.
+    :type samples: list of anacore.msi.sample.MSISample
+    :param method_name: The name of the method storing loci status and where the sample status will be set.
+    :type method_name: str
+    :param min_voting_loci: Minimum number of voting loci (stable + unstable) to determine the sample status.
+    :type min_voting_loci: float
+    :param instability_ratio: If the ratio unstable/(stable + unstable) is superior than this value the status of the sample will be unstable otherwise it will be stable.
+    :type instability_ratio: float
+    :param undetermined_weight: The weight of the undetermined loci in sample score calculation.
+    :type undetermined_weight: float
+    :param locus_weight_is_score: Use the prediction score of each locus as wheight of this locus in sample prediction score calculation.
+    :type locus_weight_is_score: bool
+    """
+    for spl in samples:
+        spl.setStatusByInstabilityRatio(method_name, min_voting_loci, instability_ratio)
+        spl.setScore(method_name, undetermined_weight, locus_weight_is_score)
+
+
+def getMsingsSamples(data_method, status_method="mSINGSUp", min_depth=60, std_dev_rate=2.0):
+    """
+    Return evaluated samples classified as in microsatMsingsClassify.py.
+
+    :param data_method: The name of the method storing lengths distributions.
+    :type data_method: str
+    :param status_method: The name of the method where the status will be set.
+    :type status_method: str
+    :param min_depth: The minimum numbers of reads or fragments to determine the status.
+    :type min_depth: int
+    :param std_dev_rate: The locus is tagged as unstable if the number of peaks is upper than models_avg_nb_peaks + std_dev_rate * models_std_dev_nb_peaks.
+    :type std_dev_rate: float
+    :return: The classified samples.
+    :rtype: list of anacore.msi.sample.MSISample
+    """
+    models = ReportIO.parse(MODEL_PATH)
+    test_dataset = getEvaluatedSamples(data_method)
+    for spl in test_dataset:
+        for locus_id, locus in spl.loci.items():
+            scores_by_status, model_data = getModelScores(locus_id, "mSINGS", "nb_peaks", models)
+            threshold = MSINGSEval.getThresholdFromNbPeaks(scores_by_status[Status.stable], std_dev_rate)
+            locus_data = {"lengths": locus.results[data_method].data["lengths"]}
+            locus_res = LocusRes(Status.undetermined, None, locus_data)
+            if locus_data["lengths"].getCount() >= min_depth:
+                locus_data["nb_peaks"] = MSINGSEval.getNbPeaks(locus_data["lengths"], model_data["peak_height_cutoff"])
+                locus_res.status = Status.unstable if locus_data["nb_peaks"] > threshold else Status.stable
+                locus_res.score = round(getGaussianNBProba(scores_by_status, locus_data["nb_peaks"], locus_res.status), 6)
+            locus.results[status_method] = locus_res
+    setSamplesStatus(test_dataset, status_method)
+    return test_dataset
+
+
+def getProSamples(data_method, status_method="MSIsensor-pro_pro", min_depth=60):
+    """
+    Return evaluated samples classified as in microsatMSIsensorproProClassify.py.
+
+    :param data_method: The name of the method storing lengths distributions.
+    :type data_method: str
+    :param status_method: The name of the method where the status will be set.
+    :type status_method: str
+    :param min_depth: The minimum numbers of reads or fragments to determine the status.
+    :type min_depth: int
+    :return: The classified samples.
+    :rtype: list of anacore.msi.sample.MSISample
+    """
+    models = ReportIO.parse(MODEL_PATH)
+    test_dataset = getEvaluatedSamples(data_method)
+    for spl in test_dataset:
+        for locus_id, locus in spl.loci.items():
+            scores_by_status, model_data = getModelScores(locus_id, "MSIsensor-pro", "pro_p", models)
+            threshold = ProEval.getThresholdFromScores(scores_by_status[Status.stable])
+            locus_data = {"lengths": locus.results[data_method].data["lengths"]}
+            locus_res = LocusRes(Status.undetermined, None, locus_data)
+            if locus_data["lengths"].getCount() >= min_depth:
+                locus_data["pro_p"], locus_data["pro_q"] = ProEval.getSlippageScores(locus_data["lengths"], locus.length)
+                locus_res.status = Status.unstable if locus_data["pro_p"] > threshold else Status.stable
+                locus_res.score = round(getGaussianNBProba(scores_by_status, locus_data["pro_p"], locus_res.status), 6)
+            locus.results[status_method] = locus_res
+    setSamplesStatus(test_dataset, status_method)
+    return test_dataset
+
+
+def getSklearnSamples(clf, method_name, random_seed=0, min_depth=60):
+    """
+    Return evaluated samples classified as in microsatSklearnClassify.py: one anacore.msi.base.LocusClassifier fitted by locus on all the model samples.
+
+    :param clf: The classifier name.
+    :type clf: str
+    :param method_name: The name of the method storing lengths distributions and where the status will be set.
+    :type method_name: str
+    :param random_seed: The seed used by the random number generator in the classifier.
+    :type random_seed: int
+    :param min_depth: The minimum numbers of reads or fragments to determine the status.
+    :type min_depth: int
+    :return: The classified samples.
+    :rtype: list of anacore.msi.sample.MSISample
+    """
+    train_dataset = ReportIO.parse(MODEL_PATH)
+    test_dataset = getEvaluatedSamples(method_name)
+    for locus_id in sorted(train_dataset[0].loci.keys()):
+        evaluated_test_dataset = []
+        for spl in test_dataset:
+            locus_res = spl.loci[locus_id].results[method_name]
+            locus_res.status = Status.undetermined
+            if locus_res.data["lengths"].getCount() >= min_depth:
+                evaluated_test_dataset.append(spl)
+        if len(evaluated_test_dataset) != 0:
+            locus_clf = LocusClassifier(locus_id, method_name, getBaselineEstimator(clf, random_seed), "model")
+            locus_clf.fit(train_dataset)
+            locus_clf.set_status(evaluated_test_dataset)
+    setSamplesStatus(test_dataset, method_name)
+    return test_dataset
@@ -0,0 +1,52 @@
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+import os
+import sys
+
+TEST_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.dirname(TEST_DIR)
+MODEL_PATH = os.path.join(TEST_DIR, "config", "microsat_model.json")
+SCRIPTS_DIR = os.path.join(APP_DIR, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+from anacore.msi.locus import LocusRes  # noqa: E402
+from anacore.msi.reportIO import ReportIO  # noqa: E402
+
+
+def getEvaluatedSamples(data_method, model_path=MODEL_PATH):
+    """
+    Return the samples of the model as evaluated samples: the result of the method "model" is replaced by a result of data_method containing only the lengths distribution.
+
+    :param data_method: The name of the method storing the lengths distributions.
+    :type data_method: str
+    :param model_path: Path to the model (format: MSIReport).
+    :type model_path: str
+    :return: The evaluated samples.
+    :rtype: list of anacore.msi.sample.MSISample
+    """
+    samples = ReportIO.parse(model_path)
+    for spl in samples:
+        spl.name = "eval_" + spl.name
+        for locus in spl.loci.values():
+            locus.results = {
+                data_method: LocusRes(None, None, {"lengths": locus.results["model"].data["lengths"]})
+            }
+    return samples
+
+
+def writeEvaluatedSamples(out_path, data_method, model_path=MODEL_PATH):
+    """
+    Write the samples of the model as evaluated samples (see getEvaluatedSamples()).
+
+    :param out_path: Path to the output file (format: MSIReport).
+    :type out_path: str
+    :param data_method: The name of the method storing the lengths distributions.
+    :type data_method: str
+    :param model_path: Path to the model (format: MSIReport).
+    :type model_path: str
+    """
+    ReportIO.write(getEvaluatedSamples(data_method, model_path), out_path)
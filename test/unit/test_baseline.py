@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+from helpers import MODEL_PATH  # Adds the scripts folder in sys.path
+from anacore.msi.base import Status
+from anacore.msi.msings import MSINGSEval
+from anacore.msi.msisensorpro import ProEval
+import copy
+from miniti.baseline import fitGaussianNB, getScoresStats, getScoresStd, getStatusProba, mergeScoresStats, updateGaussianNB
+from miniti.model import getLocusModelResults, getModelLociIds
+import miniti.msings as msings
+import miniti.msisensorpro as msisensorpro
+import numpy as np
+import unittest
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def assertGaussianNBAlmostEqual(observed, expected):
+    """
+    Raise AssertionError if the gaussian naive Bayes parameters are not almost equal.
+
+    :param observed: Parameters of the gaussian naive Bayes classifier (see miniti.baseline.fitGaussianNB()).
+    :type observed: dict
+    :param expected: Expected parameters of the gaussian naive Bayes classifier.
+    :type expected: dict
+    """
+    assert observed["classes"] == expected["classes"], "{} != {}".format(observed["classes"], expected["classes"])
+    assert observed["class_count"] == expected["class_count"], "{} != {}".format(observed["class_count"], expected["class_count"])
+    np.testing.assert_allclose(observed["class_prior"], expected["class_prior"], rtol=1e-12)
+    np.testing.assert_allclose(observed["theta"], expected["theta"], rtol=1e-9)
+    np.testing.assert_allclose(observed["var"], expected["var"], rtol=1e-6)  # Variance smoothing of the first fit is kept
+
+
+def getOldBaseline(baseline, scores_by_status):
+    """
+    Return baseline in the format produced before the storage of sufficient statistics: scores of all the model samples and gaussian naive Bayes parameters without number of samples by class and without variance smoothing.
+
+    :param baseline: Baseline of the locus (see miniti.msings.getModelBaseline() or miniti.msisensorpro.getModelBaseline()).
+    :type baseline: dict
+    :param scores_by_status: Scores of the model samples by status.
+    :type scores_by_status: dict
+    :return: The baseline in old format.
+    :rtype: dict
+    """
+    old_baseline = copy.deepcopy(baseline)
+    del old_baseline["stable_stats"]
+    old_baseline["scores"] = copy.deepcopy(scores_by_status)
+    if old_baseline["gaussian_nb"] is not None:
+        del old_baseline["gaussian_nb"]["class_count"]
+        del old_baseline["gaussian_nb"]["epsilon"]
+    return old_baseline
+
+
+########################################################################
+#
+# CLASSES
+#
+########################################################################
+class TestScoresStats(unittest.TestCase):
+    def testGetScoresStats(self):
+        for scores in [[3], [1, 2, 2, 5], [0.123457, 0.5, 0.25, 1e-6, 0.75], list(range(100))]:
+            stats = getScoresStats(scores)
+            self.assertEqual(stats["count"], len(scores))
+            self.assertEqual(stats["mean"], np.mean(scores))
+            self.assertEqual(getScoresStd(stats), np.std(scores))
+            if len(scores) > 1:
+                self.assertEqual(getScoresStd(stats, 1), np.std(scores, ddof=1))
+        self.assertTrue(np.isnan(getScoresStd(getScoresStats([]))))
+        self.assertTrue(np.isnan(getScoresStd(getScoresStats([3]), 1)))
+
+    def testMergeScoresStats(self):
+        past_scores = [0.25, 1, 3.5, 2, 2]
+        new_scores = [5, 0.5, 8]
+        observed = mergeScoresStats(getScoresStats(past_scores), new_scores)
+        expected = getScoresStats(past_scores + new_scores)
+        self.assertEqual(observed["count"], expected["count"])
+        self.assertAlmostEqual(observed["mean"], expected["mean"], places=12)
+        self.assertAlmostEqual(observed["m2"], expected["m2"], places=10)
+        self.assertEqual(mergeScoresStats(getScoresStats([]), new_scores), getScoresStats(new_scores))
+        self.assertEqual(mergeScoresStats(getScoresStats(past_scores), []), getScoresStats(past_scores))
+
+
+class TestGaussianNB(unittest.TestCase):
+    def testUpdateVsRefit(self):
+        for method_name, score_name in [("mSINGS", "nb_peaks"), ("MSIsensor-pro", "pro_p")]:
+            for locus_id in getModelLociIds(MODEL_PATH):
+                scores = [
+                    (locus_res.status, locus_res.data[method_name][score_name])
+                    for locus_res in getLocusModelResults(MODEL_PATH, locus_id)
+                    if locus_res.status in {Status.stable, Status.unstable}
+                ]
+                for nb_past in [1, len(scores) // 2, len(scores) - 1]:
+                    past_scores = {status: [score for curr_status, score in scores[:nb_past] if curr_status == status] for status in [Status.stable, Status.unstable]}
+                    new_scores = {status: [score for curr_status, score in scores[nb_past:] if curr_status == status] for status in [Status.stable, Status.unstable]}
+                    all_scores = {status: past_scores[status] + new_scores[status] for status in [Status.stable, Status.unstable]}
+                    expected = fitGaussianNB(all_scores)
+                    observed = updateGaussianNB(fitGaussianNB(past_scores), new_scores)
+                    assertGaussianNBAlmostEqual(observed, expected)
+                    # Probabilities
+                    eval_scores = [score for curr_status, score in scores]
+                    eval_status = [curr_status for curr_status, score in scores]
+                    np.testing.assert_allclose(
+                        getStatusProba(eval_scores, eval_status, [observed] * len(scores)),
+                        getStatusProba(eval_scores, eval_status, [expected] * len(scores)),
+                        atol=1e-6
+                    )
+
+    def testUpdateWithoutPast(self):
+        new_scores = {Status.stable: [1, 2, 2], Status.unstable: [5, 6]}
+        self.assertEqual(updateGaussianNB(None, new_scores), fitGaussianNB(new_scores))
+        # Class missing in past
+        past_scores = {Status.stable: [1, 2, 3], Status.unstable: []}
+        assertGaussianNBAlmostEqual(
+            updateGaussianNB(fitGaussianNB(past_scores), new_scores),
+            fitGaussianNB({status: past_scores[status] + new_scores[status] for status in new_scores})
+        )
+
+
+class TestModelBaseline(unittest.TestCase):
+    def setUp(self):
+        self.loci_ids = getModelLociIds(MODEL_PATH)
+
+    def testMsingsThreshold(self):
+        for locus_id in self.loci_ids:
+            locus_results = getLocusModelResults(MODEL_PATH, locus_id)
+            stable_nb_peaks = [locus_res.data["mSINGS"]["nb_peaks"] for locus_res in locus_results if locus_res.status == Status.stable]
+            baseline = msings.getModelBaseline(locus_results)
+            self.assertNotIn("scores", baseline)
+            for std_dev_rate in [1.0, 2.0, 2.5]:
+                msings.setThreshold(baseline, std_dev_rate)
+                self.assertEqual(baseline["threshold"], MSINGSEval.getThresholdFromNbPeaks(stable_nb_peaks, std_dev_rate))
+
+    def testProThreshold(self):
+        for locus_id in self.loci_ids:
+            locus_results = getLocusModelResults(MODEL_PATH, locus_id)
+            stable_pro_p = [locus_res.data["MSIsensor-pro"]["pro_p"] for locus_res in locus_results if locus_res.status == Status.stable]
+            baseline = msisensorpro.getModelBaseline(locus_results)
+            self.assertNotIn("scores", baseline)
+            self.assertEqual(baseline["threshold"], ProEval.getThresholdFromScores(stable_pro_p))
+            self.assertAlmostEqual(msisensorpro.getThresholdFromStats(baseline["stable_stats"]), baseline["threshold"], places=12)
+
+    def testUpdateModelBaseline(self):
+        for module in [msings, msisensorpro]:
+            method_name = "mSINGS" if module is msings else "MSIsensor-pro"
+            score_name = "nb_peaks" if module is msings else "pro_p"
+            for locus_id in self.loci_ids:
+                locus_results = getLocusModelResults(MODEL_PATH, locus_id)
+                nb_past = len(locus_results) // 2
+                expected = module.getModelBaseline(locus_results)
+                past_baseline = module.getModelBaseline(locus_results[:nb_past])
+                past_scores = {
+                    status: [locus_res.data[method_name][score_name] for locus_res in locus_results[:nb_past] if locus_res.status == status]
+                    for status in [Status.stable, Status.unstable]
+                }
+                for baseline in [past_baseline, getOldBaseline(past_baseline, past_scores)]:
+                    observed = module.updateModelBaseline(baseline, locus_results[nb_past:])
+                    self.assertEqual(sorted(observed), sorted(expected))
+                    self.assertEqual(observed["stable_stats"]["count"], expected["stable_stats"]["count"])
+                    self.assertAlmostEqual(observed["stable_stats"]["mean"], expected["stable_stats"]["mean"], places=6)
+                    np.testing.assert_allclose(observed["stable_stats"]["m2"], expected["stable_stats"]["m2"], rtol=1e-9)
+                    assertGaussianNBAlmostEqual(observed["gaussian_nb"], expected["gaussian_nb"])
+                    if module is msings:
+                        msings.setThreshold(observed, 2.0)
+                        msings.setThreshold(expected, 2.0)
+                    self.assertAlmostEqual(observed["threshold"], expected["threshold"], places=9)
+
+    def testOldBaselineClassification(self):
+        for module in [msings, msisensorpro]:
+            method_name = "mSINGS" if module is msings else "MSIsensor-pro"
+            score_name = "nb_peaks" if module is msings else "pro_p"
+            for locus_id in self.loci_ids:
+                locus_results = getLocusModelResults(MODEL_PATH, locus_id)
+                baseline = module.getModelBaseline(locus_results)
+                scores = {
+                    status: [locus_res.data[method_name][score_name] for locus_res in locus_results if locus_res.status == status]
+                    for status in [Status.stable, Status.unstable]
+                }
+                upgraded = module.upgradeModelBaseline(getOldBaseline(baseline, scores))
+                self.assertEqual(upgraded["stable_stats"], baseline["stable_stats"])
+                self.assertEqual(upgraded["gaussian_nb"], baseline["gaussian_nb"])
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+from helpers import MODEL_PATH  # Adds the scripts folder in sys.path
+import hashlib
+import json
+from miniti.checksum import checksum, checksumFromDigest, getDigestPath, writeDigest
+from miniti.model import getModelChecksum
+import os
+import shutil
+import tempfile
+import unittest
+
+
+########################################################################
+#
+# CLASSES
+#
+########################################################################
+class TestChecksum(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmp_dir.name, "microsatModel.json")
+        shutil.copy(MODEL_PATH, self.model_path)
+        with open(MODEL_PATH, "rb") as reader:
+            self.expected = hashlib.md5(reader.read()).hexdigest()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def testChecksum(self):
+        self.assertEqual(checksum(self.model_path), self.expected)
+        self.assertEqual(checksum(self.model_path, chunk_size=7), self.expected)
+        self.assertEqual(checksumFromDigest(self.model_path), self.expected)  # Without digest
+
+    def testGetDigestPath(self):
+        expected = os.path.join(self.tmp_dir.name, "microsatModel_digest.json")
+        self.assertEqual(getDigestPath(self.model_path), expected)
+        self.assertEqual(getDigestPath(self.model_path + ".gz"), expected)
+        self.assertEqual(getDigestPath(self.model_path + ".zst"), expected)
+
+    def testDigestIsRead(self):
+        writeDigest(self.model_path)
+        digest_path = getDigestPath(self.model_path)
+        with open(digest_path) as reader:
+            digest = json.load(reader)
+        self.assertEqual(digest["checksum"], self.expected)
+        self.assertEqual(digest["size"], os.path.getsize(self.model_path))
+        # The checksum comes from the digest when it corresponds to the file
+        digest["checksum"] = "from_digest"
+        with open(digest_path, "w") as writer:
+            json.dump(digest, writer)
+        self.assertEqual(checksumFromDigest(self.model_path), "from_digest")
+        self.assertEqual(getModelChecksum(self.model_path), "from_digest")
+        # Another algorithm is computed
+        self.assertEqual(checksumFromDigest(self.model_path, "sha1"), checksum(self.model_path, "sha1"))
+
+    def testDigestInvalidation(self):
+        writeDigest(self.model_path)
+        self.assertEqual(getModelChecksum(self.model_path), self.expected)
+        # Modified content with the same size and modification time as in digest
+        file_stat = os.stat(self.model_path)
+        with open(self.model_path, "rb") as reader:
+            content = reader.read()
+        with open(self.model_path, "wb") as writer:
+            writer.write(content.replace(b'"MSS"', b'"MSI"', 1))
+        os.utime(self.model_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+        self.assertEqual(getModelChecksum(self.model_path), self.expected)  # Limit of the digest: same size and time are not checked
+        # Modification time changed
+        os.utime(self.model_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 10**9))
+        modified_checksum = hashlib.md5(content.replace(b'"MSS"', b'"MSI"', 1)).hexdigest()
+        self.assertEqual(getModelChecksum(self.model_path), modified_checksum)
+        # Size changed
+        with open(self.model_path, "wb") as writer:
+            writer.write(content + b"\n")
+        self.assertEqual(getModelChecksum(self.model_path), hashlib.md5(content + b"\n").hexdigest())
+        # Digest updated
+        writeDigest(self.model_path)
+        with open(getDigestPath(self.model_path)) as reader:
+            self.assertEqual(json.load(reader)["checksum"], hashlib.md5(content + b"\n").hexdigest())
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+from helpers import MODEL_PATH, SCRIPTS_DIR, writeEvaluatedSamples  # Adds the scripts folder in sys.path
+from baselineScripts import getMsingsSamples, getProSamples, getSklearnSamples, getStatus
+from miniti.reportIO import parseReport
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import warnings
+
+
+CLF = "SVC"
+METHODS = ["mSINGSUp", "MSIsensor-pro_pro", CLF]
+RANDOM_SEED = 0
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def runScript(script_name, args):
+    """
+    Run script of the folder scripts with the current python interpreter.
+
+    :param script_name: The script file name.
+    :type script_name: str
+    :param args: The script arguments.
+    :type args: list
+    :return: The completed process.
+    :rtype: subprocess.CompletedProcess
+    """
+    return subprocess.run(
+        [sys.executable, os.path.join(SCRIPTS_DIR, script_name)] + args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+
+
+def startService(socket_path, model_path, log_path, timeout=120):
+    """
+    Start microsatClassifyServer.py and wait until it listens.
+
+    :param socket_path: Path to the Unix socket where the service listens.
+    :type socket_path: str
+    :param model_path: Path to the model (format: MSIReport or binary model folder).
+    :type model_path: str
+    :param log_path: Path to the file receiving the service log.
+    :type log_path: str
+    :param timeout: Maximum time in seconds to wait the socket.
+    :type timeout: int
+    :return: The service process.
+    :rtype: subprocess.Popen
+    """
+    with open(log_path, "w") as log_writer:
+        service = subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPTS_DIR, "microsatClassifyServer.py"), "-u", socket_path, "-r", model_path, "-s", str(RANDOM_SEED)],
+            stdout=subprocess.DEVNULL,
+            stderr=log_writer
+        )
+    start_time = time.time()
+    while not os.path.exists(socket_path):
+        if service.poll() is not None:
+            with open(log_path) as reader:
+                raise Exception("The service has stopped before listening: {}".format(reader.read()))
+        if time.time() - start_time > timeout:
+            service.kill()
+            raise Exception("The service does not listen after {} seconds.".format(timeout))
+        time.sleep(0.2)
+    return service
+
+
+########################################################################
+#
+# CLASSES
+#
+########################################################################
+class TestClassifyService(unittest.TestCase):
+    def setUp(self):
+        warnings.simplefilter("ignore", FutureWarning)  # SVC(probability=True) is deprecated in recent scikit-learn
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.in_path = os.path.join(self.tmp_dir.name, "evaluated.json")
+        writeEvaluatedSamples(self.in_path, CLF)
+        self.socket_path = os.path.join(self.tmp_dir.name, "service.sock")
+        self.service = startService(self.socket_path, MODEL_PATH, os.path.join(self.tmp_dir.name, "service.log"))
+
+    def tearDown(self):
+        if self.service.poll() is None:
+            self.service.kill()
+            self.service.wait()
+        self.tmp_dir.cleanup()
+
+    def testService(self):
+        expected = {
+            "mSINGSUp": getStatus(getMsingsSamples(CLF), "mSINGSUp"),
+            "MSIsensor-pro_pro": getStatus(getProSamples(CLF), "MSIsensor-pro_pro"),
+            CLF: getStatus(getSklearnSamples(CLF, CLF, RANDOM_SEED), CLF)
+        }
+        # Same results as the baseline scripts and as microsatClassify.py
+        script_out_path = os.path.join(self.tmp_dir.name, "script.json")
+        process = runScript("microsatClassify.py", ["-r", MODEL_PATH, "-s", str(RANDOM_SEED), "-e", self.in_path, "-o", script_out_path])
+        self.assertEqual(process.returncode, 0, process.stderr.decode("utf-8"))
+        service_out_path = os.path.join(self.tmp_dir.name, "service.json")
+        for idx in range(2):  # The second request uses the data loaded by the first
+            process = runScript("microsatClassifyClient.py", ["-u", self.socket_path, "-r", MODEL_PATH, "-s", str(RANDOM_SEED), "-e", self.in_path, "-o", service_out_path])
+            self.assertEqual(process.returncode, 0, process.stderr.decode("utf-8"))
+            for out_path in [script_out_path, service_out_path]:
+                samples = parseReport(out_path)
+                self.assertEqual({method_name: getStatus(samples, method_name) for method_name in METHODS}, expected)
+        # Request with other settings is rejected
+        rejected_out_path = os.path.join(self.tmp_dir.name, "rejected.json")
+        process = runScript("microsatClassifyClient.py", ["-u", self.socket_path, "-r", MODEL_PATH, "-s", str(RANDOM_SEED + 1), "-e", self.in_path, "-o", rejected_out_path])
+        self.assertNotEqual(process.returncode, 0)
+        self.assertIn("Classification service error", process.stderr.decode("utf-8"))
+        self.assertFalse(os.path.exists(rejected_out_path))
+        # Stop
+        process = runScript("microsatClassifyClient.py", ["-u", self.socket_path, "-x"])
+        self.assertEqual(process.returncode, 0, process.stderr.decode("utf-8"))
+        self.assertEqual(self.service.wait(timeout=60), 0)
+        self.assertFalse(os.path.exists(self.socket_path))
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    unittest.main()
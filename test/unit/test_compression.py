@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.1.0'
+
+from helpers import MODEL_PATH  # Adds the scripts folder in sys.path
+import gzip
+import mmap
+from miniti.compression import dumpJSON, getCompression, getCompressionFromName, getContent, loadJSON, openFile, removeCompressionExt
+import os
+import tempfile
+import unittest
+
+
+########################################################################
+#
+# CLASSES
+#
+########################################################################
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data = loadJSON(MODEL_PATH)[:2]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def testGetCompressionFromName(self):
+        self.assertEqual(getCompressionFromName("splA.json"), None)
+        self.assertEqual(getCompressionFromName("splA.json.gz"), "gzip")
+        self.assertEqual(getCompressionFromName("splA.json.zst"), "zstd")
+        self.assertEqual(getCompressionFromName("splA.gz.json"), None)
+        self.assertEqual(getCompressionFromName("folder.gz/splA.json"), None)
+
+    def testRemoveCompressionExt(self):
+        self.assertEqual(removeCompressionExt("splA.json"), "splA.json")
+        self.assertEqual(removeCompressionExt("splA.json.gz"), "splA.json")
+        self.assertEqual(removeCompressionExt("splA.json.zst"), "splA.json")
+        self.assertEqual(removeCompressionExt("folder.gz/splA.json"), "folder.gz/splA.json")
+
+    def testWriteAndRead(self):
+        for filename, expected_compression in [("splA.json", None), ("splA.json.gz", "gzip"), ("splA.json.zst", "zstd")]:
+            out_path = os.path.join(self.tmp_dir.name, filename)
+            dumpJSON(self.data, out_path)
+            self.assertEqual(getCompression(out_path), expected_compression, filename)
+            self.assertEqual(loadJSON(out_path), self.data, filename)
+            with openFile(out_path, "rb") as reader:
+                content = reader.read()
+            content_map = getContent(out_path)
+            self.assertIsInstance(content_map, mmap.mmap, filename)  # Compressed files are not loaded in memory
+            self.assertEqual(bytes(content_map), content, filename)
+            content_map.close()
+
+    def testDetectionFromContent(self):
+        # Compressed file without compression extension
+        gzip_path = os.path.join(self.tmp_dir.name, "splA.json")
+        with gzip.open(gzip_path, "wt") as writer:
+            writer.write('{"name": "splA"}')
+        self.assertEqual(getCompressionFromName(gzip_path), None)
+        self.assertEqual(getCompression(gzip_path), "gzip")
+        self.assertEqual(loadJSON(gzip_path), {"name": "splA"})
+        # Uncompressed file with compression extension
+        for filename in ["splB.json.gz", "splB.json.zst"]:
+            plain_path = os.path.join(self.tmp_dir.name, filename)
+            with open(plain_path, "w") as writer:
+                writer.write('{"name": "splB"}')
+            self.assertEqual(getCompression(plain_path), None, filename)
+            self.assertEqual(loadJSON(plain_path), {"name": "splB"}, filename)
+        # Empty and short files
+        for content in [b"", b"\x1f"]:
+            short_path = os.path.join(self.tmp_dir.name, "short.json")
+            with open(short_path, "wb") as writer:
+                writer.write(content)
+            self.assertEqual(getCompression(short_path), None)
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    unittest.main()
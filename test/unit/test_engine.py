@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+from helpers import getEvaluatedSamples, MODEL_PATH, writeEvaluatedSamples  # Adds the scripts folder in sys.path
+from baselineScripts import getMsingsSamples, getProSamples, getSklearnSamples, getStatus
+from miniti.baseline import writeBaselines
+from miniti.engine import ClassificationEngine, getModelBaselines
+from miniti.lengths import setArrayLengths
+from miniti.model import getModelChecksum, getModelLociIds, writeBinaryModel
+from miniti.reportIO import parseReport
+import miniti.sklearnClassifier as sklearnClassifier
+import os
+import tempfile
+import unittest
+import warnings
+
+
+CLF = "SVC"
+METHODS = ["mSINGSUp", "MSIsensor-pro_pro", CLF]
+RANDOM_SEED = 0
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def getBaselinesStatus():
+    """
+    Return status and score of loci and samples predicted by the three classifier scripts before their optimization.
+
+    :return: Status and score by method name (see baselineScripts.getStatus()).
+    :rtype: dict
+    """
+    return {
+        "mSINGSUp": getStatus(getMsingsSamples(CLF), "mSINGSUp"),
+        "MSIsensor-pro_pro": getStatus(getProSamples(CLF), "MSIsensor-pro_pro"),
+        CLF: getStatus(getSklearnSamples(CLF, CLF, RANDOM_SEED), CLF)
+    }
+
+
+def getEngine(model_path, baselines_path=None, estimators_path=None, threads=1):
+    """
+    Return a classification engine with the default parameters of microsatClassify.py.
+
+    :param model_path: Path to the model (format: MSIReport or binary model folder).
+    :type model_path: str
+    :param baselines_path: Path to the baselines computed from model (format: JSON).
+    :type baselines_path: str
+    :param estimators_path: Path to the classifiers pre-fitted on model (format: pickle).
+    :type estimators_path: str
+    :param threads: Number of processes used to fit and predict sklearn classifiers of loci.
+    :type threads: int
+    :return: The engine.
+    :rtype: miniti.engine.ClassificationEngine
+    """
+    return ClassificationEngine(
+        model_path, baselines_path, estimators_path, CLF, METHODS[0], METHODS[1], METHODS[2],
+        clf=CLF, clf_params={"random_state": RANDOM_SEED}, random_seed=RANDOM_SEED, threads=threads
+    )
+
+
+def getEngineStatus(samples):
+    """
+    Return status and score of loci and samples for the three methods.
+
+    :param samples: Samples classified by the engine.
+    :type samples: list of anacore.msi.sample.MSISample
+    :return: Status and score by method name (see baselineScripts.getStatus()).
+    :rtype: dict
+    """
+    return {method_name: getStatus(samples, method_name) for method_name in METHODS}
+
+
+########################################################################
+#
+# CLASSES
+#
+########################################################################
+class TestClassificationEngine(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter("ignore", FutureWarning)  # SVC(probability=True) is deprecated in recent scikit-learn
+        cls.expected = getBaselinesStatus()
+
+    def setUp(self):
+        warnings.simplefilter("ignore", FutureWarning)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def testClassify(self):
+        binary_model_path = os.path.join(self.tmp_dir.name, "model_bin")
+        writeBinaryModel(MODEL_PATH, binary_model_path)
+        for model_path in [MODEL_PATH, binary_model_path]:
+            engine = getEngine(model_path)
+            # First call computes baselines from model
+            test_dataset = setArrayLengths(getEvaluatedSamples(CLF))
+            engine.classify(test_dataset)
+            self.assertEqual(getEngineStatus(test_dataset), self.expected, model_path)
+            # Second call uses the classifiers fitted by the first
+            test_dataset = setArrayLengths(getEvaluatedSamples(CLF))
+            engine.classify(test_dataset)
+            self.assertEqual(getEngineStatus(test_dataset), self.expected, model_path)
+
+    def testClassifyWithLearnFiles(self):
+        baselines_path = os.path.join(self.tmp_dir.name, "baselines.json")
+        writeBaselines(baselines_path, getModelBaselines(MODEL_PATH), getModelChecksum(MODEL_PATH))
+        estimators_path = os.path.join(self.tmp_dir.name, "estimators.pkl")
+        loci_ids = getModelLociIds(MODEL_PATH)
+        classifier_by_key = {
+            sklearnClassifier.getEstimatorKey(locus_id, CLF, {"random_state": RANDOM_SEED}, RANDOM_SEED): locus_clf
+            for locus_id, locus_clf in sklearnClassifier.fitClassifiers(MODEL_PATH, loci_ids, CLF, {"random_state": RANDOM_SEED}).items()
+        }
+        sklearnClassifier.writeEstimators(estimators_path, classifier_by_key, loci_ids, getModelChecksum(MODEL_PATH))
+        engine = getEngine(MODEL_PATH, baselines_path, estimators_path)
+        self.assertIsNotNone(engine.baselines)
+        self.assertEqual(len(engine.fitted_by_key), len(loci_ids))
+        test_dataset = setArrayLengths(getEvaluatedSamples(CLF))
+        engine.classify(test_dataset)
+        self.assertEqual(getEngineStatus(test_dataset), self.expected)
+
+    def testClassifyReports(self):
+        in_path = os.path.join(self.tmp_dir.name, "evaluated.json")
+        writeEvaluatedSamples(in_path, CLF)
+        out_path = os.path.join(self.tmp_dir.name, "classified.json.gz")
+        engine = getEngine(MODEL_PATH, threads=2)
+        engine.warmUp()
+        self.assertEqual(engine.classifyReports([in_path], [out_path]), [out_path])
+        self.assertEqual(getEngineStatus(parseReport(out_path)), self.expected)
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    unittest.main()
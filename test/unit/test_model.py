@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.1.0'
+
+from helpers import MODEL_PATH  # Adds the scripts folder in sys.path
+from anacore.msi.reportIO import ReportIO
+from miniti.compression import loadJSON
+from miniti.model import BinaryModel, closeModel, getModelChecksum, JSONModel, openModel, OPENED_MODEL_BY_PATH, writeBinaryModel, writeJSONModel
+import mmap
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def getResultsValues(locus_results):
+    """
+    Return status, score and data of the loci results with lengths distributions as sorted list of (length, count).
+
+    :param locus_results: Results of a locus.
+    :type locus_results: list of anacore.msi.locus.LocusRes
+    :return: Status, score and data of each result.
+    :rtype: list
+    """
+    values = list()
+    for locus_res in locus_results:
+        data = dict(locus_res.data)
+        if "lengths" in data:
+            data["lengths"] = (sorted(data["lengths"].items()), data["lengths"].mode)
+        values.append((locus_res.status, locus_res.score, data))
+    return values
+
+
+########################################################################
+#
+# CLASSES
+#
+########################################################################
+class TestModelReaders(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.binary_model_path = os.path.join(self.tmp_dir.name, "model_bin")
+        writeBinaryModel(MODEL_PATH, self.binary_model_path)
+        self.json_model = JSONModel(MODEL_PATH)
+        self.binary_model = BinaryModel(self.binary_model_path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def testGetLociIds(self):
+        samples = ReportIO.parse(MODEL_PATH)
+        self.assertEqual(self.json_model.getLociIds(), sorted(samples[0].loci))
+        self.assertEqual(self.json_model.getLociIds(False), list(samples[0].loci))
+        self.assertEqual(self.binary_model.getLociIds(), self.json_model.getLociIds())
+        self.assertEqual(self.binary_model.getLociIds(False), self.json_model.getLociIds(False))
+
+    def testGetLocusResults(self):
+        samples = ReportIO.parse(MODEL_PATH)
+        for locus_id in self.json_model.getLociIds():
+            expected = getResultsValues([
+                spl.loci[locus_id].results["model"] for spl in samples
+                if locus_id in spl.loci and "model" in spl.loci[locus_id].results
+            ])
+            self.assertEqual(getResultsValues(self.json_model.getLocusResults(locus_id)), expected, locus_id)
+            self.assertEqual(getResultsValues(self.binary_model.getLocusResults(locus_id)), expected, locus_id)
+        # Missing locus or method
+        self.assertEqual(self.json_model.getLocusResults("missing"), [])
+        self.assertEqual(self.binary_model.getLocusResults("missing"), [])
+        locus_id = self.json_model.getLociIds()[0]
+        self.assertEqual(self.json_model.getLocusResults(locus_id, "missing"), [])
+        self.assertEqual(self.binary_model.getLocusResults(locus_id, "missing"), [])
+
+    def testGetLocusTrainData(self):
+        for locus_id in self.json_model.getLociIds():
+            expected = self.json_model.getLocusTrainData(locus_id)
+            observed = self.binary_model.getLocusTrainData(locus_id)
+            self.assertEqual(observed["features"].dtype, np.float64)
+            np.testing.assert_array_equal(observed["features"], expected["features"])
+            self.assertEqual(observed["labels"].tolist(), expected["labels"].tolist())
+            self.assertEqual((observed["min_len"], observed["max_len"]), (expected["min_len"], expected["max_len"]))
+        # Binary model without stored training data
+        for filename in ["train_features.npy", "train_index.npy"]:
+            os.remove(os.path.join(self.binary_model_path, filename))
+        old_binary_model = BinaryModel(self.binary_model_path)
+        self.assertIsNone(old_binary_model.train_index)
+        for locus_id in self.json_model.getLociIds():
+            expected = self.json_model.getLocusTrainData(locus_id)
+            observed = old_binary_model.getLocusTrainData(locus_id)
+            np.testing.assert_array_equal(observed["features"], expected["features"])
+            self.assertEqual(observed["labels"].tolist(), expected["labels"].tolist())
+
+    def testGetStablePeaks(self):
+        self.assertEqual(self.binary_model.getStablePeaks(), self.json_model.getStablePeaks())
+
+    def testRoundTrip(self):
+        self.assertEqual(getModelChecksum(self.binary_model_path), getModelChecksum(MODEL_PATH))
+        for filename in ["model.json", "model.json.gz"]:
+            out_path = os.path.join(self.tmp_dir.name, filename)
+            writeJSONModel(self.binary_model_path, out_path)
+            self.assertEqual(loadJSON(out_path), loadJSON(MODEL_PATH))
+
+
+class TestModelMemory(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmp_dir.name, "model.json")
+        shutil.copyfile(MODEL_PATH, self.model_path)
+        self.binary_model_path = os.path.join(self.tmp_dir.name, "model_bin")
+        writeBinaryModel(MODEL_PATH, self.binary_model_path)
+
+    def tearDown(self):
+        closeModel()
+        self.tmp_dir.cleanup()
+
+    def testCompressedModel(self):
+        compressed_path = os.path.join(self.tmp_dir.name, "model.json.gz")
+        writeJSONModel(self.binary_model_path, compressed_path)
+        compressed_model = JSONModel(compressed_path)
+        self.assertIsInstance(compressed_model._buffer, mmap.mmap)
+        json_model = JSONModel(self.model_path)
+        for locus_id in json_model.getLociIds():
+            self.assertEqual(
+                getResultsValues(compressed_model.getLocusResults(locus_id)),
+                getResultsValues(json_model.getLocusResults(locus_id)),
+                locus_id
+            )
+        compressed_model.close()
+        json_model.close()
+
+    def testLastLocusCache(self):
+        json_model = JSONModel(self.model_path)
+        locus_a, locus_b = json_model.getLociIds()[:2]
+        first_results = json_model.getLocusResults(locus_a)
+        self.assertIs(json_model.getLocusResults(locus_a)[0], first_results[0])  # Shared between consecutive calls
+        json_model.getLocusResults(locus_b)
+        self.assertEqual(json_model._last_results[0], (locus_b, "model"))  # Only the last locus is kept
+        self.assertIsNot(json_model.getLocusResults(locus_a)[0], first_results[0])
+        self.assertEqual(getResultsValues(json_model.getLocusResults(locus_a)), getResultsValues(first_results))
+        json_model.close()
+
+    def testOpenAndClose(self):
+        json_model = openModel(self.model_path)
+        binary_model = openModel(self.binary_model_path)
+        self.assertIs(openModel(self.model_path), json_model)
+        self.assertIs(openModel(self.binary_model_path), binary_model)
+        # Model modified after opening
+        file_stat = os.stat(self.model_path)
+        os.utime(self.model_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 10**9))
+        reopened_model = openModel(self.model_path)
+        self.assertIsNot(reopened_model, json_model)
+        self.assertIsNone(json_model._buffer)
+        self.assertEqual(reopened_model.getLociIds(), binary_model.getLociIds())
+        # Close
+        closeModel(self.model_path)
+        self.assertNotIn(self.model_path, OPENED_MODEL_BY_PATH)
+        self.assertIsNone(reopened_model._buffer)
+        self.assertIn(self.binary_model_path, OPENED_MODEL_BY_PATH)
+        closeModel()
+        self.assertEqual(len(OPENED_MODEL_BY_PATH), 0)
+        self.assertIsNone(binary_model.counts)
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.0.0'
+
+from helpers import MODEL_PATH  # Adds the scripts folder in sys.path
+from anacore.msi.locus import LocusDataDistrib
+from anacore.msi.reportIO import ReportIO
+import json
+from miniti.compression import getCompression, loadJSON
+from miniti.lengths import ArrayLengthsDistrib
+from miniti.reportIO import parseReport, writeReport, writeSamples
+import os
+import tempfile
+import unittest
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def getAllLengths(samples):
+    """
+    Return lengths distributions of all the loci results of the samples.
+
+    :param samples: The samples.
+    :type samples: list of anacore.msi.sample.MSISample
+    :return: The lengths distributions by sample name, locus ID and method name.
+    :rtype: dict
+    """
+    return {
+        (spl.name, locus_id, method_name): locus_res.data["lengths"]
+        for spl in samples
+        for locus_id, locus in spl.loci.items()
+        for method_name, locus_res in locus.results.items()
+        if "lengths" in locus_res.data
+    }
+
+
+########################################################################
+#
+# CLASSES
+#
+########################################################################
+class TestWriteSamples(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.in_path = MODEL_PATH
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def testRoundTrip(self):
+        expected = loadJSON(self.in_path)
+        for filename in ["report.json", "report.json.gz", "report.json.zst"]:
+            out_path = os.path.join(self.tmp_dir.name, filename)
+            samples = parseReport(self.in_path)
+            self.assertTrue(all(isinstance(lengths, ArrayLengthsDistrib) for lengths in getAllLengths(samples).values()))
+            writeSamples(samples, out_path)
+            # Written content
+            self.assertEqual(loadJSON(out_path), expected)
+            self.assertEqual(getCompression(out_path), {".json": None, ".gz": "gzip", ".zst": "zstd"}[os.path.splitext(filename)[1]])
+            self.assertEqual([name for name in os.listdir(self.tmp_dir.name) if name.startswith(".tmp_")], [])
+            # Samples are unchanged by writing
+            self.assertTrue(all(isinstance(lengths, ArrayLengthsDistrib) for lengths in getAllLengths(samples).values()))
+            # Parse written file
+            self.assertEqual(
+                {key: lengths.items() for key, lengths in getAllLengths(parseReport(out_path)).items()},
+                {key: lengths.items() for key, lengths in getAllLengths(samples).items()}
+            )
+
+    def testSameAsReportIO(self):
+        samples = ReportIO.parse(self.in_path)
+        self.assertTrue(all(type(lengths) is LocusDataDistrib for lengths in getAllLengths(samples).values()))
+        expected_path = os.path.join(self.tmp_dir.name, "expected.json")
+        ReportIO.write(samples, expected_path)
+        out_path = os.path.join(self.tmp_dir.name, "report.json")
+        writeSamples(parseReport(self.in_path), out_path)
+        with open(expected_path) as reader:
+            expected = reader.read()
+        with open(out_path) as reader:
+            self.assertEqual(reader.read(), expected)
+
+    def testWriteReport(self):
+        out_path = os.path.join(self.tmp_dir.name, "report.json.gz")
+        samples = parseReport(self.in_path)
+        writeReport(samples, out_path)
+        self.assertEqual(loadJSON(out_path), loadJSON(self.in_path))
+        with open(os.path.join(self.tmp_dir.name, "report_summary.json")) as reader:
+            summary = json.load(reader)
+        self.assertEqual(summary["report"]["size"], os.path.getsize(out_path))
+        self.assertEqual([spl["name"] for spl in summary["samples"]], [spl.name for spl in samples])
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    unittest.main()
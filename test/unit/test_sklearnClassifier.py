@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+__author__ = 'Frederic Escudie'
+__copyright__ = 'Copyright (C) 2024 CHU Toulouse'
+__license__ = 'GNU General Public License'
+__version__ = '1.1.0'
+
+from helpers import getEvaluatedSamples, MODEL_PATH  # Adds the scripts folder in sys.path
+from baselineScripts import getSklearnSamples, getStatus, setSamplesStatus
+from miniti.lengths import setArrayLengths
+from miniti.model import getModelChecksum, getModelLociIds, writeBinaryModel
+import miniti.sklearnClassifier as sklearnClassifier
+import os
+import tempfile
+import unittest
+import warnings
+
+
+CLASSIFIERS = ["DecisionTree", "KNeighbors", "LogisticRegression", "RandomForest", "SVC"]
+RANDOM_SEED = 0
+
+
+########################################################################
+#
+# FUNCTIONS
+#
+########################################################################
+def getMinitiStatus(model_path, clf, method_name, random_seed=RANDOM_SEED, min_depth=60, estimators_path=None, threads=1):
+    """
+    Return status and score of loci and samples predicted by miniti.sklearnClassifier.setLociStatus(). The samples status and score are set with the default parameters of microsatSklearnClassify.py.
+
+    :param model_path: Path to the model (format: MSIReport or binary model folder).
+    :type model_path: str
+    :param clf: The classifier name.
+    :type clf: str
+    :param method_name: The name of the method storing lengths distributions and where the status are set.
+    :type method_name: str
+    :param random_seed: The seed used by the random number generator in the classifier.
+    :type random_seed: int
+    :param min_depth: The minimum numbers of reads or fragments to determine the status.
+    :type min_depth: int
+    :param estimators_path: Path to the classifiers pre-fitted on model (format: pickle).
+    :type estimators_path: str
+    :param threads: Number of processes used to fit and predict loci.
+    :type threads: int
+    :return: Status and score by sample and locus (see baselineScripts.getStatus()).
+    :rtype: dict
+    """
+    test_dataset = setArrayLengths(getEvaluatedSamples(method_name))
+    sklearnClassifier.setLociStatus(
+        test_dataset, model_path, getModelChecksum(model_path), method_name, method_name, min_depth,
+        clf, {"random_state": random_seed}, random_seed, estimators_path, threads
+    )
+    setSamplesStatus(test_dataset, method_name)
+    return getStatus(test_dataset, method_name)
+
+
+########################################################################
+#
+# CLASSES
+#
+########################################################################
+class TestSetLociStatus(unittest.TestCase):
+    def setUp(self):
+        warnings.simplefilter("ignore", FutureWarning)  # SVC(probability=True) is deprecated in recent scikit-learn
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def testBaselineParity(self):
+        binary_model_path = os.path.join(self.tmp_dir.name, "model_bin")
+        writeBinaryModel(MODEL_PATH, binary_model_path)
+        for clf in CLASSIFIERS:
+            expected = getStatus(getSklearnSamples(clf, clf, RANDOM_SEED), clf)
+            self.assertEqual(getMinitiStatus(MODEL_PATH, clf, clf), expected, "JSON model with " + clf)
+            self.assertEqual(getMinitiStatus(binary_model_path, clf, clf), expected, "binary model with " + clf)
+
+    def testPreFitted(self):
+        estimators_path = os.path.join(self.tmp_dir.name, "estimators.pkl")
+        loci_ids = getModelLociIds(MODEL_PATH)
+        classifier_by_key = {
+            sklearnClassifier.getEstimatorKey(locus_id, "SVC", {"random_state": RANDOM_SEED}, RANDOM_SEED): locus_clf
+            for locus_id, locus_clf in sklearnClassifier.fitClassifiers(MODEL_PATH, loci_ids, "SVC", {"random_state": RANDOM_SEED}).items()
+        }
+        sklearnClassifier.writeEstimators(estimators_path, classifier_by_key, loci_ids, getModelChecksum(MODEL_PATH))
+        self.assertEqual(
+            getMinitiStatus(MODEL_PATH, "SVC", "SVC", estimators_path=estimators_path),
+            getStatus(getSklearnSamples("SVC", "SVC", RANDOM_SEED), "SVC")
+        )
+
+    def testThreads(self):
+        self.assertEqual(
+            getMinitiStatus(MODEL_PATH, "RandomForest", "RandomForest", threads=2),
+            getStatus(getSklearnSamples("RandomForest", "RandomForest", RANDOM_SEED), "RandomForest")
+        )
+
+    def testPredictLengths(self):
+        locus_id = getModelLociIds(MODEL_PATH)[0]
+        locus_clf = sklearnClassifier.fitClassifiers(MODEL_PATH, [locus_id], "SVC", {"random_state": RANDOM_SEED})[locus_id]
+        lengths = [spl.loci[locus_id].results["SVC"].data["lengths"] for spl in getEvaluatedSamples("SVC")]
+        labels, scores = locus_clf.predictLengths(lengths)
+        self.assertEqual(labels, [str(label) for label in locus_clf.classifier.predict(locus_clf._getFeatures(lengths))])
+        self.assertEqual(scores, [round(score, 6) for score in scores])
+        self.assertTrue(all(0 <= score <= 1 for score in scores))
+
+
+########################################################################
+#
+# MAIN
+#
+########################################################################
+if __name__ == "__main__":
+    unittest.main()